@@ -1,10 +1,13 @@
 # agents/orchestrator.py
 """Implementação do Agente Orquestrador Acadêmico com triagem Maestro e gerenciamento de estado."""
 
-from typing import Generator, List, Optional
+from typing import Any, AsyncGenerator, Callable, Generator, List, Optional, Tuple, Union
+from dataclasses import dataclass, field
 import os
+import asyncio
 import re
 import json
+import time
 import traceback
 
 from langchain_core.prompts import ChatPromptTemplate
@@ -15,6 +18,49 @@ from agents.prompts import (
 )
 from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
 from services.google_docs import exceptions as gdocs_exceptions
+from services.chat_stream import (
+    EventoChat, textos, MENSAGEM_ERRO_LLM,
+    AGENT_CHANGED, DOC_LINK, ERROR, RETRIEVAL_DONE, SECTION_PENDING, STATUS
+)
+
+MENSAGEM_DOCUMENTO_COMPLETO = "\n\n🎉 **Todas as seções foram finalizadas!** O documento está completo no Google Docs.\n"
+MENSAGEM_SEM_SECAO_PENDENTE = "⚠️ Nenhuma seção pendente para reescrever.\n"
+
+
+# Passos pedidos pelos fluxos do Orquestrador. Cada fluxo é um gerador escrito
+# uma vez só: emite EventoChat e, para LLM ou E/S, emite um passo e recebe o
+# resultado; `_executar` (síncrono) e `_aexecutar` (asyncio) executam os passos.
+
+@dataclass
+class _Invocacao:
+    """Chamada única ao LLM (`invoke`/`ainvoke`); o fluxo recebe o texto da resposta."""
+    entrada: Any
+
+
+@dataclass
+class _Stream:
+    """Stream da chain (`stream`/`astream`): tokens viram eventos, o fluxo recebe o texto completo."""
+    chain: Any
+    payload: dict
+
+
+@dataclass
+class _Etapa:
+    """Método público com par assíncrono (`metodo` / `a` + `metodo`)."""
+    metodo: str
+    args: tuple = ()
+
+
+@dataclass
+class _Bloqueante:
+    """Chamada síncrona de E/S (Chroma, Google Docs): em thread no caminho assíncrono."""
+    funcao: Callable
+    args: tuple = ()
+    kwargs: dict = field(default_factory=dict)
+
+
+Fluxo = Generator[Union[EventoChat, _Invocacao, _Stream, _Etapa, _Bloqueante], Any, Any]
+
 
 class OrchestratorAgent:
     """Agente Maestro que orquestra a triagem e delegação para especialistas."""
@@ -65,13 +111,8 @@ class OrchestratorAgent:
         print("[GOOGLE DOCS] docs_manager é None! Verifique se credentials.json existe.") # Log when docs_manager is None
         return None
 
-    def extrair_estrutura_da_mensagem(self, mensagem_ai: str) -> dict:
-        """Usa o LLM para converter o texto em JSON de estrutura."""
-        ss = self.mm.session_state
-        if not self.llm:
-            return None
-            
-        prompt = f"""Analise a proposta de estrutura acadêmica abaixo e extraia o título e as seções principais.
+    def _prompt_extracao_estrutura(self, mensagem_ai: str) -> str:
+        return f"""Analise a proposta de estrutura acadêmica abaixo e extraia o título e as seções principais.
 
 PROPOSTA:
 {mensagem_ai}
@@ -84,25 +125,50 @@ REGRAS DE EXTRAÇÃO:
 5. Retorne APENAS o JSON.
 
 JSON:"""
+
+    def _estrutura_da_resposta_llm(self, res: str) -> Optional[dict]:
+        """Interpreta o JSON devolvido pelo parser LLM; None se não houver seções válidas."""
+        match = re.search(r'\{.*\}', res, re.DOTALL)
+        if match:
+            data = json.loads(match.group())
+            valido = [s for s in data.get("secoes", []) if s.get("key") and s.get("titulo")]
+            if valido:
+                data["secoes"] = valido
+                print(f"[ESTRUTURA] Parser LLM extraiu {len(valido)} seções.")
+                self.mm.session_state['current_structure'] = data
+                return data
+            else:
+                print(f"[ESTRUTURA] LLM retornou JSON mas sem seções válidas: {res[:200]}")
+        else:
+            print(f"[ESTRUTURA] LLM não retornou JSON válido: {res[:200]}")
+        return None
+
+    def extrair_estrutura_da_mensagem(self, mensagem_ai: str) -> dict:
+        """Usa o LLM para converter o texto em JSON de estrutura."""
+        return self._resolver(self._fluxo_extracao_estrutura(mensagem_ai))
+
+    async def aextrair_estrutura_da_mensagem(self, mensagem_ai: str) -> dict:
+        """Versão assíncrona de extrair_estrutura_da_mensagem (usa `ainvoke`)."""
+        return await self._aresolver(self._fluxo_extracao_estrutura(mensagem_ai))
+
+    def _fluxo_extracao_estrutura(self, mensagem_ai: str) -> Fluxo:
+        if not self.llm:
+            return None
+
         # Tenta extrair da mensagem direta
         try:
-            res = self.llm.invoke(prompt).content.strip()
-            match = re.search(r'\{.*\}', res, re.DOTALL)
-            if match:
-                data = json.loads(match.group())
-                valido = [s for s in data.get("secoes", []) if s.get("key") and s.get("titulo")]
-                if valido:
-                    data["secoes"] = valido
-                    print(f"[ESTRUTURA] Parser LLM extraiu {len(valido)} seções.")
-                    ss['current_structure'] = data
-                    return data
-                else:
-                    print(f"[ESTRUTURA] LLM retornou JSON mas sem seções válidas: {res[:200]}")
-            else:
-                print(f"[ESTRUTURA] LLM não retornou JSON válido: {res[:200]}")
+            res = (yield _Invocacao(self._prompt_extracao_estrutura(mensagem_ai))).strip()
+            data = self._estrutura_da_resposta_llm(res)
+            if data:
+                return data
         except Exception as e:
             print(f"[ESTRUTURA] Erro no parsing LLM: {e}")
 
+        return self._estrutura_por_heuristica(mensagem_ai)
+
+    def _estrutura_por_heuristica(self, mensagem_ai: str) -> Optional[dict]:
+        """Fallback sem LLM: seções a partir de headers e listas numeradas."""
+        ss = self.mm.session_state
         # Heurística de regex: Busca por ### Nome da Seção ou 1. Nome da Seção
         print("[ESTRUTURA] Falha no Parser LLM. Tentando heurística de regex...")
         secoes = []
@@ -193,62 +259,41 @@ JSON:"""
                 return True
         return False
 
-    def route_request(self, input_usuario: str) -> Generator[str, None, None]:
-        """Realiza a triagem, troca de estado se necessário e delega para o especialista."""
-        if not self.llm:
-            raise ValueError("LLM não inicializado no ModelManager.")
-
+    def _desfecho_triagem(self, triage_result: Optional[str]) -> Optional[Tuple[Optional[EventoChat], Optional[str]]]:
+        """
+        Traduz resultados especiais da triagem em (evento, continuação), onde a
+        continuação é PROXIMA_SECAO, REESCREVER_SECAO ou None. Retorna None quando
+        a requisição segue para o agente ativo.
+        """
         ss = self.mm.session_state
-        
-        # 1. Classificação de Intenção (Centralizada)
-        triage_result = self.classificar_e_atualizar_estado(input_usuario)
-        
         if triage_result == "ERROR_FAIL_DOC":
-            yield "⚠️ **Atenção**: Não consegui extrair a estrutura proposta ou criar o documento no Google Docs. \n\nPor favor, garanta que a estrutura proposta use títulos claros (###) ou listas numeradas.\n\n---\n\n"
-            return
+            return EventoChat(ERROR, {"codigo": "ERROR_FAIL_DOC"}, "⚠️ **Atenção**: Não consegui extrair a estrutura proposta ou criar o documento no Google Docs. \n\nPor favor, garanta que a estrutura proposta use títulos claros (###) ou listas numeradas.\n\n---\n\n"), None
         elif triage_result == "AUTH_REVOKED":
-            yield self._get_reauth_message()
-            return
+            return EventoChat(ERROR, {"codigo": "AUTH_REVOKED"}, self._get_reauth_message()), None
         elif triage_result == "CONTENT_APPROVED":
-            # Conteúdo da seção foi aprovado e escrito no doc
+            # Conteúdo da seção foi aprovado e escrito no doc; avança para próxima seção
             pending = ss.get('pending_section')
+            evento = None
             if pending:
-                yield f"✅ Seção **{pending.get('titulo', '')}** aprovada e salva no Google Docs!\n\n"
-            # Avança para próxima seção
-            yield from self._generate_next_section()
-            return
+                evento = EventoChat(STATUS, {"codigo": "SECAO_APROVADA", "key": pending.get('key')},
+                                    f"✅ Seção **{pending.get('titulo', '')}** aprovada e salva no Google Docs!\n\n")
+            return evento, "PROXIMA_SECAO"
         elif triage_result == "CONTENT_REJECTED":
             # Reescreve a seção corrente
-            yield "🔄 Entendido! Vou reescrever a seção com as suas considerações.\n\n---\n\n"
-            yield from self._rewrite_current_section(input_usuario)
-            return
+            return EventoChat(STATUS, {"codigo": "REESCREVENDO_SECAO"}, "🔄 Entendido! Vou reescrever a seção com as suas considerações.\n\n---\n\n"), "REESCREVER_SECAO"
         elif triage_result and triage_result not in ("ORCHESTRATOR", "ESCRITA", "CONSULTA", "ESTRUTURADOR", "QA"):
             # É um doc_id retornado pela aprovação da estrutura
             link = f"https://docs.google.com/document/d/{triage_result}"
             msg_confirmacao = f"✅ **Estrutura Aprovada!**\n\n📄 Documento criado com sucesso: [Abrir no Google Docs]({link})\n\nIniciando a redação do conteúdo...\n\n---\n\n"
-            yield msg_confirmacao
             print(f"[ORCHESTRATOR] Estrutura aprovada. Iniciando geração da primeira seção...")
             # Inicia a escrita da primeira seção automaticamente
-            yield from self._generate_next_section()
-            return
+            return EventoChat(DOC_LINK, {"doc_id": triage_result, "url": link}, msg_confirmacao), "PROXIMA_SECAO"
+        return None
 
-        # 2. Seleção do Prompt baseado no Estado Atual
-        agente_atual = ss.get('agente_ativo', 'ORCHESTRATOR')
-        print(f"[ORCHESTRATOR] Agente ativo selecionado: {agente_atual}")
+    def _montar_chain_resposta(self, input_usuario: str, agente_atual: str, is_global: bool, contexto_rag: str):
+        """Chain do agente ativo e o payload (input enriquecido + histórico)."""
+        ss = self.mm.session_state
         prompt_sistema = self._get_prompt_por_agente(agente_atual)
-
-        # 3. Detecção de Necessidade de Cobertura Total (Global)
-        is_global = self._is_global_query(input_usuario, agente_atual)
-
-        # 4. Recuperação de Contexto (RAG)
-        print(f"[ORCHESTRATOR] Buscando contexto RAG (global={is_global})...")
-        contexto_rag = self.mm.rag_manager.get_contexto_para_prompt(
-            input_usuario,
-            cobertura_total=is_global
-        )
-        print(f"[ORCHESTRATOR] Contexto RAG recuperado ({len(contexto_rag or '')} chars).")
-        
-        # 5. Execução da Chain
         template = ChatPromptTemplate.from_messages([
             ('system', prompt_sistema),
             ('placeholder', '{chat_history}'),
@@ -262,37 +307,214 @@ JSON:"""
              label = "CONTEXTO GLOBAL (Todos os docs)" if is_global else "CONTEXTO DOS DOCUMENTOS"
              input_rich = f"{label}:\n{contexto_rag}\n\nSOLICITAÇÃO: {input_usuario}"
 
-        # 5b. Injeção da Estrutura no contexto para o Estruturador
+        # Injeção da Estrutura no contexto para o Estruturador
         current_struct = ss.get('current_structure')
         if current_struct and agente_atual == 'ESTRUTURADOR':
             secoes_str = "\n".join([f"  - {s['key']}: {s['titulo']}" for s in current_struct.get('secoes', [])])
             input_rich = f"ESTRUTURA APROVADA (RESPEITAR RIGOROSAMENTE):\n{secoes_str}\n\n{input_rich}"
 
-        full_response = ""
+        return chain, {
+            'input': input_rich,
+            'chat_history': self.mm.get_historico_langchain()
+        }
+
+    def _evento_recuperacao(self, contexto_rag: str, is_global: bool, agente: str, inicio: float) -> EventoChat:
+        print(f"[ORCHESTRATOR] Contexto RAG recuperado ({len(contexto_rag or '')} chars).")
+        return EventoChat(RETRIEVAL_DONE, {
+            "chars": len(contexto_rag or ''),
+            "cobertura_total": is_global,
+            "agente": agente,
+            "segundos": round(time.perf_counter() - inicio, 3),
+        })
+
+    @staticmethod
+    def _evento_erro_llm(e: Exception) -> EventoChat:
+        print(f"[ORCHESTRATOR] ERRO no stream do LLM: {e}")
+        return EventoChat(ERROR, {"codigo": "ERRO_LLM", "mensagem": MENSAGEM_ERRO_LLM}, f"\n\n⚠️ Erro na comunicação com a IA: {str(e)}")
+
+    def _deve_detectar_estrutura(self, agente_atual: str) -> bool:
+        return agente_atual in ['ESTRUTURADOR', 'ORCHESTRATOR'] and not self.mm.session_state.get('active_doc_id')
+
+    def _registrar_estrutura_detectada(self, estrutura: Optional[dict]) -> None:
+        if estrutura:
+            self.mm.session_state['agente_ativo'] = 'AGUARDANDO_APROVACAO'
+            print(f"[ORCHESTRATOR] Estrutura detectada e estado -> AGUARDANDO_APROVACAO")
+        else:
+            print(f"[ORCHESTRATOR] Nenhuma estrutura detectada na resposta da IA.")
+
+    def _mudanca_de_agente(self, anterior: Optional[str]) -> Tuple[Optional[str], Optional[EventoChat]]:
+        atual = self.mm.session_state.get('agente_ativo')
+        if atual == anterior:
+            return atual, None
+        return atual, EventoChat(AGENT_CHANGED, {"de": anterior, "para": atual})
+
+    def route_request(self, input_usuario: str) -> Generator[str, None, None]:
+        """Realiza a triagem, troca de estado se necessário e delega para o especialista."""
+        for evento in self.eventos(input_usuario):
+            if evento.texto:
+                yield evento.texto
+
+    async def aroute_request(self, input_usuario: str) -> AsyncGenerator[str, None]:
+        """Versão assíncrona de route_request (texto puro)."""
+        async for texto in textos(self.aeventos(input_usuario)):
+            yield texto
+
+    def eventos(self, input_usuario: str) -> Generator[EventoChat, None, None]:
+        """Mesmo fluxo de route_request como eventos tipados, incluindo trocas de agente."""
+        agente = self.mm.session_state.get('agente_ativo')
+        for evento in self._executar(self._fluxo_eventos(input_usuario)):
+            agente, mudanca = self._mudanca_de_agente(agente)
+            if mudanca:
+                yield mudanca
+            yield evento
+        _, mudanca = self._mudanca_de_agente(agente)
+        if mudanca:
+            yield mudanca
+
+    async def aeventos(self, input_usuario: str) -> AsyncGenerator[EventoChat, None]:
+        """Versão assíncrona de eventos."""
+        agente = self.mm.session_state.get('agente_ativo')
+        async for evento in self._aexecutar(self._fluxo_eventos(input_usuario)):
+            agente, mudanca = self._mudanca_de_agente(agente)
+            if mudanca:
+                yield mudanca
+            yield evento
+        _, mudanca = self._mudanca_de_agente(agente)
+        if mudanca:
+            yield mudanca
+
+    def _executar(self, fluxo: Fluxo, resultado: Optional[list] = None) -> Generator[EventoChat, None, None]:
+        """
+        Roda um fluxo no caminho síncrono: repassa os eventos e executa os passos
+        com chamadas bloqueantes. O valor de retorno do fluxo vai para `resultado`.
+        """
+        resposta, erro = None, None
+        while True:
+            try:
+                passo = fluxo.throw(erro) if erro is not None else fluxo.send(resposta)
+            except StopIteration as fim:
+                if resultado is not None:
+                    resultado.append(fim.value)
+                return
+            resposta, erro = None, None
+            if isinstance(passo, EventoChat):
+                yield passo
+                continue
+            try:
+                if isinstance(passo, _Stream):
+                    partes: List[str] = []
+                    for chunk in passo.chain.stream(passo.payload):
+                        partes.append(chunk.content)
+                        yield EventoChat.token(chunk.content)
+                    resposta = "".join(partes)
+                elif isinstance(passo, _Invocacao):
+                    resposta = self.llm.invoke(passo.entrada).content
+                elif isinstance(passo, _Etapa):
+                    resposta = getattr(self, passo.metodo)(*passo.args)
+                else:
+                    resposta = passo.funcao(*passo.args, **passo.kwargs)
+            except Exception as e:
+                erro = e
+
+    async def _aexecutar(self, fluxo: Fluxo, resultado: Optional[list] = None) -> AsyncGenerator[EventoChat, None]:
+        """
+        Versão assíncrona de `_executar`: triagem, stream e extração de estrutura
+        usam `ainvoke`/`astream`; recuperação (Chroma/embeddings) e escritas no
+        Google Docs rodam em threads, sem bloquear o event loop.
+        """
+        resposta, erro = None, None
+        while True:
+            try:
+                passo = fluxo.throw(erro) if erro is not None else fluxo.send(resposta)
+            except StopIteration as fim:
+                if resultado is not None:
+                    resultado.append(fim.value)
+                return
+            resposta, erro = None, None
+            if isinstance(passo, EventoChat):
+                yield passo
+                continue
+            try:
+                if isinstance(passo, _Stream):
+                    partes: List[str] = []
+                    async for chunk in passo.chain.astream(passo.payload):
+                        partes.append(chunk.content)
+                        yield EventoChat.token(chunk.content)
+                    resposta = "".join(partes)
+                elif isinstance(passo, _Invocacao):
+                    resposta = (await self.llm.ainvoke(passo.entrada)).content
+                elif isinstance(passo, _Etapa):
+                    resposta = await getattr(self, 'a' + passo.metodo)(*passo.args)
+                else:
+                    resposta = await asyncio.to_thread(passo.funcao, *passo.args, **passo.kwargs)
+            except Exception as e:
+                erro = e
+
+    def _resolver(self, fluxo: Fluxo):
+        """Valor final de um fluxo sem eventos (triagem, extração de estrutura)."""
+        resultado: list = []
+        for _ in self._executar(fluxo, resultado):
+            pass
+        return resultado[0]
+
+    async def _aresolver(self, fluxo: Fluxo):
+        resultado: list = []
+        async for _ in self._aexecutar(fluxo, resultado):
+            pass
+        return resultado[0]
+
+    def _fluxo_eventos(self, input_usuario: str) -> Fluxo:
+        if not self.llm:
+            raise ValueError("LLM não inicializado no ModelManager.")
+
+        ss = self.mm.session_state
+        
+        # 1. Classificação de Intenção (Centralizada)
+        triage_result = yield _Etapa('classificar_e_atualizar_estado', (input_usuario,))
+        desfecho = self._desfecho_triagem(triage_result)
+        if desfecho:
+            evento, continuacao = desfecho
+            if evento:
+                yield evento
+            if continuacao == "PROXIMA_SECAO":
+                yield from self._fluxo_proxima_secao()
+            elif continuacao == "REESCREVER_SECAO":
+                yield from self._fluxo_reescrita_secao(input_usuario)
+            return
+
+        # 2. Seleção do Agente baseado no Estado Atual
+        agente_atual = ss.get('agente_ativo', 'ORCHESTRATOR')
+        print(f"[ORCHESTRATOR] Agente ativo selecionado: {agente_atual}")
+
+        # 3. Detecção de Necessidade de Cobertura Total (Global)
+        is_global = self._is_global_query(input_usuario, agente_atual)
+
+        # 4. Recuperação de Contexto (RAG)
+        print(f"[ORCHESTRATOR] Buscando contexto RAG (global={is_global})...")
+        inicio = time.perf_counter()
+        contexto_rag = yield _Bloqueante(
+            self.mm.rag_manager.get_contexto_para_prompt,
+            (input_usuario,),
+            {'cobertura_total': is_global, 'agente': agente_atual}
+        )
+        yield self._evento_recuperacao(contexto_rag, is_global, agente_atual, inicio)
+        
+        # 5. Execução da Chain
+        chain, payload = self._montar_chain_resposta(input_usuario, agente_atual, is_global, contexto_rag)
+
         print(f"[ORCHESTRATOR] Iniciando stream da resposta do LLM...")
         try:
-            for chunk in chain.stream({
-                'input': input_rich,
-                'chat_history': self.mm.get_historico_langchain()
-            }):
-                full_response += chunk.content
-                yield chunk.content
-            print(f"[ORCHESTRATOR] Stream finalizado ({len(full_response)} chars).")
+            full_response = yield _Stream(chain, payload)
         except Exception as e:
-            print(f"[ORCHESTRATOR] ERRO no stream do LLM: {e}")
-            yield f"\n\n⚠️ Erro na comunicação com a IA: {str(e)}"
+            yield self._evento_erro_llm(e)
             return
+        print(f"[ORCHESTRATOR] Stream finalizado ({len(full_response)} chars).")
         
         # 6. Detecção de estrutura proposta (transição para AGUARDANDO_APROVACAO)
-        doc_id = ss.get('active_doc_id')
-        if agente_atual in ['ESTRUTURADOR', 'ORCHESTRATOR'] and not doc_id:
+        if self._deve_detectar_estrutura(agente_atual):
             print(f"[ORCHESTRATOR] Analisando resposta para detectar estrutura... (len={len(full_response)})")
-            estrutura = self.extrair_estrutura_da_mensagem(full_response)
-            if estrutura:
-                ss['agente_ativo'] = 'AGUARDANDO_APROVACAO'
-                print(f"[ORCHESTRATOR] Estrutura detectada e estado -> AGUARDANDO_APROVACAO")
-            else:
-                print(f"[ORCHESTRATOR] Nenhuma estrutura detectada na resposta da IA.")
+            estrutura = yield _Etapa('extrair_estrutura_da_mensagem', (full_response,))
+            self._registrar_estrutura_detectada(estrutura)
 
     def _detect_section_key(self, user_text: str, ai_text: str = "") -> str:
         """Heurística robusta para detectar qual seção está sendo referenciada."""
@@ -534,43 +756,35 @@ JSON:"""
             ss['agente_ativo'] = 'ORCHESTRATOR'
             return "CONTENT_REJECTED"
 
-    def _generate_next_section(self) -> Generator[str, None, None]:
-        """Gera o conteúdo da próxima seção na fila e exibe no chat."""
+    def _proxima_secao(self) -> Optional[dict]:
+        """Retira a próxima seção da fila (com numeração); None quando a fila acabou."""
         ss = self.mm.session_state
         queue = ss.get('sections_queue', [])
         
         if not queue:
-            yield "\n\n🎉 **Todas as seções foram finalizadas!** O documento está completo no Google Docs.\n"
             ss['agente_ativo'] = 'ORCHESTRATOR'
-            return
+            return None
         
         # Pega a próxima seção da fila
         next_section = queue.pop(0)
         ss['sections_queue'] = queue
         
-        section_key = next_section['key']
-        section_titulo = next_section['titulo']
         total = len(ss.get('completed_sections', [])) + len(queue) + 1
         current_num = len(ss.get('completed_sections', [])) + 1
-        
-        print(f"[ESCRITA] Gerando seção {current_num}/{total}: {section_titulo}")
-        
-        # Prepara o contexto RAG
-        contexto_rag = self.mm.rag_manager.get_contexto_para_prompt(
-            section_titulo, 
-            cobertura_total=True
-        )
-        
-        # Monta o prompt de escrita acadêmica
-        current_struct = ss.get('current_structure', {})
+        print(f"[ESCRITA] Gerando seção {current_num}/{total}: {next_section['titulo']}")
+        return {'key': next_section['key'], 'titulo': next_section['titulo'], 'num': current_num, 'total': total}
+
+    def _prompt_escrita(self, secao: dict, contexto_rag: str) -> str:
+        current_struct = self.mm.session_state.get('current_structure', {})
         secoes_str = "\n".join([f"  - {s['titulo']}" for s in current_struct.get('secoes', [])])
+        section_titulo = secao['titulo']
         
-        prompt_escrita = f"""Você é um redator acadêmico especialista. Escreva APENAS o conteúdo da seção abaixo.
+        return f"""Você é um redator acadêmico especialista. Escreva APENAS o conteúdo da seção abaixo.
 
 ESTRUTURA COMPLETA DO TRABALHO:
 {secoes_str}
 
-SEÇÃO A ESCREVER AGORA ({current_num}/{total}): {section_titulo}
+SEÇÃO A ESCREVER AGORA ({secao['num']}/{secao['total']}): {section_titulo}
 
 REGRAS:
 - Primeira linha: ### {section_titulo}
@@ -580,111 +794,126 @@ REGRAS:
 
 CONTEXTO DOS DOCUMENTOS:
 {contexto_rag}"""
-        
-        template = ChatPromptTemplate.from_messages([
-            ('system', ESTRUTURADOR_SYSTEM_PROMPT),
-            ('placeholder', '{chat_history}'),
-            ('user', '{input}')
-        ])
-        
-        chain = template | self.llm
-        full_response = ""
-        
-        for chunk in chain.stream({
-            'input': prompt_escrita,
-            'chat_history': self.mm.get_historico_langchain()
-        }):
-            full_response += chunk.content
-            yield chunk.content
-        
-        # Salva o conteúdo pendente para aprovação
-        ss['pending_section'] = {
-            'key': section_key,
-            'titulo': section_titulo,
-            'content': full_response
-        }
-        ss['agente_ativo'] = 'AGUARDANDO_APROVACAO_CONTEUDO'
-        print(f"[ESCRITA] Seção '{section_titulo}' gerada. Estado -> AGUARDANDO_APROVACAO_CONTEUDO")
 
-    def _rewrite_current_section(self, feedback: str) -> Generator[str, None, None]:
-        """Reescreve a seção atual com o feedback do usuário."""
-        ss = self.mm.session_state
-        pending = ss.get('pending_section')
-        
-        if not pending:
-            yield "⚠️ Nenhuma seção pendente para reescrever.\n"
-            return
-        
-        section_titulo = pending['titulo']
-        section_key = pending['key']
-        previous_content = pending['content']
-        
-        contexto_rag = self.mm.rag_manager.get_contexto_para_prompt(
-            section_titulo, 
-            cobertura_total=True
-        )
-        
-        prompt_reescrita = f"""Você já escreveu esta seção anteriormente, mas o usuário solicitou alterações.
+    def _prompt_reescrita(self, pending: dict, feedback: str, contexto_rag: str) -> str:
+        return f"""Você já escreveu esta seção anteriormente, mas o usuário solicitou alterações.
 
-SEÇÃO: {section_titulo}
+SEÇÃO: {pending['titulo']}
 
 VERSÃO ANTERIOR:
-{previous_content[:2000]}
+{pending['content'][:2000]}
 
 FEEDBACK DO USUÁRIO:
 {feedback}
 
 REGRAS:
-- Primeira linha: ### {section_titulo}
+- Primeira linha: ### {pending['titulo']}
 - Reescreva incorporando o feedback.
 - Tom formal e impessoal, norma ABNT.
 - Ao finalizar, pergunte: "Você aprova esta seção e posso prosseguir para a próxima?"
 
 CONTEXTO DOS DOCUMENTOS:
 {contexto_rag}"""
-        
+
+    def _chain_escrita(self):
         template = ChatPromptTemplate.from_messages([
             ('system', ESTRUTURADOR_SYSTEM_PROMPT),
             ('placeholder', '{chat_history}'),
             ('user', '{input}')
         ])
-        
-        chain = template | self.llm
-        full_response = ""
-        
-        for chunk in chain.stream({
-            'input': prompt_reescrita,
-            'chat_history': self.mm.get_historico_langchain()
-        }):
-            full_response += chunk.content
-            yield chunk.content
-        
-        # Atualiza o conteúdo pendente
+        return template | self.llm
+
+    def _contexto_secao(self, section_titulo: str) -> str:
+        return self.mm.rag_manager.get_contexto_para_prompt(
+            section_titulo, 
+            cobertura_total=True,
+            agente='ESCRITA'
+        )
+
+    def _definir_secao_pendente(self, section_key: str, section_titulo: str, conteudo: str, acao: str) -> EventoChat:
+        """Guarda o conteúdo gerado aguardando aprovação do usuário."""
+        ss = self.mm.session_state
         ss['pending_section'] = {
             'key': section_key,
             'titulo': section_titulo,
-            'content': full_response
+            'content': conteudo
         }
         ss['agente_ativo'] = 'AGUARDANDO_APROVACAO_CONTEUDO'
-        print(f"[ESCRITA] Seção '{section_titulo}' reescrita. Estado -> AGUARDANDO_APROVACAO_CONTEUDO")
+        print(f"[ESCRITA] Seção '{section_titulo}' {acao}. Estado -> AGUARDANDO_APROVACAO_CONTEUDO")
+        return EventoChat(SECTION_PENDING, {"key": section_key, "titulo": section_titulo, "acao": acao})
+
+    def _fluxo_proxima_secao(self) -> Fluxo:
+        """Gera o conteúdo da próxima seção na fila e exibe no chat."""
+        secao = self._proxima_secao()
+        if not secao:
+            yield EventoChat(STATUS, {"codigo": "DOCUMENTO_COMPLETO"}, MENSAGEM_DOCUMENTO_COMPLETO)
+            return
+        
+        contexto_rag = yield _Bloqueante(self._contexto_secao, (secao['titulo'],))
+        full_response = yield _Stream(self._chain_escrita(), {
+            'input': self._prompt_escrita(secao, contexto_rag),
+            'chat_history': self.mm.get_historico_langchain()
+        })
+        
+        yield self._definir_secao_pendente(secao['key'], secao['titulo'], full_response, "gerada")
+
+    def _fluxo_reescrita_secao(self, feedback: str) -> Fluxo:
+        """Reescreve a seção atual com o feedback do usuário."""
+        pending = self.mm.session_state.get('pending_section')
+        
+        if not pending:
+            yield EventoChat(ERROR, {"codigo": "SEM_SECAO_PENDENTE"}, MENSAGEM_SEM_SECAO_PENDENTE)
+            return
+        
+        contexto_rag = yield _Bloqueante(self._contexto_secao, (pending['titulo'],))
+        full_response = yield _Stream(self._chain_escrita(), {
+            'input': self._prompt_reescrita(pending, feedback, contexto_rag),
+            'chat_history': self.mm.get_historico_langchain()
+        })
+        
+        yield self._definir_secao_pendente(pending['key'], pending['titulo'], full_response, "reescrita")
 
     def classificar_e_atualizar_estado(self, input_usuario: str) -> Optional[str]:
         """Classifica a intenção e atualiza o agente ativo no session_state. Retorna doc_id se criado."""
+        return self._resolver(self._fluxo_classificacao(input_usuario))
+
+    async def aclassificar_e_atualizar_estado(self, input_usuario: str) -> Optional[str]:
+        """
+        Versão assíncrona da triagem: o classificador usa `ainvoke`; os fluxos de
+        aprovação (criação e escrita no Google Docs) rodam em thread.
+        """
+        return await self._aresolver(self._fluxo_classificacao(input_usuario))
+
+    def _fluxo_classificacao(self, input_usuario: str) -> Fluxo:
         ss = self.mm.session_state
         estado_atual = ss.get('agente_ativo')
         
         # 1. Atalho: Estado AGUARDANDO_APROVACAO_CONTEUDO (aprovação de conteúdo de seção)
         if estado_atual == 'AGUARDANDO_APROVACAO_CONTEUDO':
-            return self._handle_content_approval(input_usuario)
+            return (yield _Bloqueante(self._handle_content_approval, (input_usuario,)))
         
         # 2. Atalho: Aprovação da estrutura
         if estado_atual == 'AGUARDANDO_APROVACAO' and self._is_approval(input_usuario):
-            return self._handle_approval_flow()
+            return (yield _Bloqueante(self._handle_approval_flow))
 
         last_classified = ss.get('last_input_classified')
         if last_classified == input_usuario:
             return None
 
+        try:
+            resposta_raw = (yield _Invocacao(self._mensagens_classificacao(input_usuario))).strip().upper()
+            ss['last_input_classified'] = input_usuario
+            
+            if "APROVACAO" in resposta_raw:
+                return (yield _Bloqueante(self._handle_approval_flow))
+            self._aplicar_classificacao(input_usuario, resposta_raw)
+            
+        except Exception as e:
+            print(f"Erro na classificação: {e}")
+            ss['agente_ativo'] = 'ORCHESTRATOR'
+        return None
+
+    def _mensagens_classificacao(self, input_usuario: str) -> list:
         prompt_classificador = """Analise o último input do usuário e classifique a intenção em uma única palavra:
 - APROVACAO: O usuário está concordando, aprovando, confirmando ou aceitando uma sugestão (ex: "sim", "pode ser", "ok", "aprovado", "fechado").
 - ESCRITA: O usuário quer criar, escrever, estruturar, PRODUZIR OU EDITAR um novo documento.
@@ -696,57 +925,50 @@ Resposta (apenas a palavra):"""
         
         historico_resumo = "\n".join([f"{m['role']}: {m['content'][:150]}..." for m in self.mm.mensagens[-3:]])
         
-        mensagens = [
+        return [
             SystemMessage(content=prompt_classificador),
             HumanMessage(content=f"Histórico Recente:\n{historico_resumo}\n\nÚltimo Input: {input_usuario}")
         ]
+
+    def _aplicar_classificacao(self, input_usuario: str, resposta_raw: str) -> None:
+        """Define o agente ativo a partir da resposta do classificador e das heurísticas."""
+        ss = self.mm.session_state
+        if "ESCRITA" in resposta_raw:
+            novo_estado = 'ESTRUTURADOR'
+        elif "CONSULTA" in resposta_raw:
+            novo_estado = 'QA'
+        else:
+            novo_estado = 'ORCHESTRATOR'
+
+        input_lower = input_usuario.lower()
         
-        try:
-            resposta_raw = self.llm.invoke(mensagens).content.strip().upper()
-            ss['last_input_classified'] = input_usuario
-            
-            if "APROVACAO" in resposta_raw:
-                return self._handle_approval_flow()
-            elif "ESCRITA" in resposta_raw:
-                novo_estado = 'ESTRUTURADOR'
-            elif "CONSULTA" in resposta_raw:
+        # Heurística 1: Palavras-chave expandidas
+        keywords_escrita = [
+            "escrever", "criar", "estruturar", "produzir", "redigir", "editar", 
+            "mudar", "alterar", "melhorar", "corrigir", "atualizar", "revisar",
+            "alteração", "correção", "edição", "mudança", "atualização", "revisão",
+            "incluir", "inclusão", "texto", "seção", "capítulo", "artigo", "trabalho",
+            "monografia", "tese", "dissertação", "acadêmico", "fazer"
+        ]
+        
+        if any(kw in input_lower for kw in keywords_escrita):
+            novo_estado = 'ESTRUTURADOR'
+        elif any(kw in input_lower for kw in ["pergunta", "dúvida", "quem", "o que", "onde", "quando", "resuma"]):
+            if novo_estado == 'ORCHESTRATOR':
                 novo_estado = 'QA'
-            else:
-                novo_estado = 'ORCHESTRATOR'
+        
+        # Heurística 2: Menção direta a Seções do Documento Ativo
+        active_doc = ss.get('active_doc_id')
+        current_struct = ss.get('current_structure')
+        if active_doc and current_struct:
+            for s in current_struct.get('secoes', []):
+                if s['titulo'].lower() in input_lower:
+                    print(f"[TRIAGEM] Menção à seção '{s['titulo']}' detectada. Forçando ESTRUTURADOR.")
+                    novo_estado = 'ESTRUTURADOR'
+                    break
 
-            input_lower = input_usuario.lower()
-            
-            # Heurística 1: Palavras-chave expandidas
-            keywords_escrita = [
-                "escrever", "criar", "estruturar", "produzir", "redigir", "editar", 
-                "mudar", "alterar", "melhorar", "corrigir", "atualizar", "revisar",
-                "alteração", "correção", "edição", "mudança", "atualização", "revisão",
-                "incluir", "inclusão", "texto", "seção", "capítulo", "artigo", "trabalho",
-                "monografia", "tese", "dissertação", "acadêmico", "fazer"
-            ]
-            
-            if any(kw in input_lower for kw in keywords_escrita):
-                novo_estado = 'ESTRUTURADOR'
-            elif any(kw in input_lower for kw in ["pergunta", "dúvida", "quem", "o que", "onde", "quando", "resuma"]):
-                if novo_estado == 'ORCHESTRATOR':
-                    novo_estado = 'QA'
-            
-            # Heurística 2: Menção direta a Seções do Documento Ativo
-            active_doc = ss.get('active_doc_id')
-            current_struct = ss.get('current_structure')
-            if active_doc and current_struct:
-                for s in current_struct.get('secoes', []):
-                    if s['titulo'].lower() in input_lower:
-                        print(f"[TRIAGEM] Menção à seção '{s['titulo']}' detectada. Forçando ESTRUTURADOR.")
-                        novo_estado = 'ESTRUTURADOR'
-                        break
-
-            print(f"[TRIAGEM] Input: {input_usuario[:30]}... | Resposta: {resposta_raw} | Estado Final: {novo_estado}")
-            ss['agente_ativo'] = novo_estado
-            
-        except Exception as e:
-            print(f"Erro na classificação: {e}")
-            ss['agente_ativo'] = 'ORCHESTRATOR'
+        print(f"[TRIAGEM] Input: {input_usuario[:30]}... | Resposta: {resposta_raw} | Estado Final: {novo_estado}")
+        ss['agente_ativo'] = novo_estado
 
     def _get_prompt_por_agente(self, agente: str) -> str:
         if agente == 'ESTRUTURADOR':
@@ -29,6 +29,7 @@ class UploadConfig:
     MAX_SIZE_MB: int = 10
     MAX_SIZE_BYTES: int = field(init=False)
     MAX_ARQUIVOS: int = 10
+    BLOCO_UPLOAD_BYTES: int = 1024 * 1024  # Leitura do upload em blocos (memória limitada)
     EXTENSOES: Dict[TipoArquivo, List[str]] = field(default_factory=dict)
 
     def __post_init__(self):
@@ -44,11 +45,89 @@ class UploadConfig:
 class RAGConfig:
     """Configurações do RAG."""
     embedding_model: str = "all-MiniLM-L6-v2"
+    embedding_device: str = "cpu"
+    embedding_cache: bool = True          # Cache em disco dos embeddings por hash de chunk
+    embedding_cache_dtype: str = "float16"
+    vector_backend: str = "chroma"        # "chroma" (HNSW) | "flat" (NumPy memmap, busca exata)
+    modo_busca_global: str = "agrupada"   # Top-k por documento em um único passo vetorizado
+    cache_queries_max: int = 256          # LRU de embeddings de consulta (por modelo)
+    cache_resultados_max: int = 128       # LRU de resultados de busca (por sessão)
+    modo_busca: str = "vetorial"          # "vetorial" | "hibrida" (BM25/FTS5 + vetores via RRF, opt-in)
+    atalho_lexical: bool = False          # Só no modo híbrido: k acertos exatos dispensam o embedding
+    rrf_k: int = 60                       # Constante do Reciprocal Rank Fusion
+    max_tokens_contexto: int = 6000       # Orçamento de tokens do contexto RAG no prompt
+    max_tokens_por_agente: Dict[str, int] = field(default_factory=lambda: {
+        "ORCHESTRATOR": 4000,
+        "ESTRUTURADOR": 6000,
+        "ESCRITA": 8000,                  # Redação de seções (cobertura global)
+    })
     collection_name: str = "oraculo_docs"
     top_k: int = 10         # Aumentado para melhor cobertura (Fase 7)
     chunk_size: int = 1200   # Levemente maior para manter contexto acadêmico (Fase 7)
     chunk_overlap: int = 300 # Mais sobreposição para não perder conexões entre chunks (Fase 7)
 
+@dataclass
+class JobsConfig:
+    """Configurações da fila de indexação em background."""
+    max_workers: int = 2      # Jobs de indexação simultâneos
+    max_pendentes: int = 32   # Acima disso, novos uploads são recusados (HTTP 429)
+    max_pendentes_por_sessao: int = 8  # Jobs aguardando da mesma sessão (despacho em rodízio entre sessões)
+    max_historico: int = 200  # Jobs finalizados mantidos para consulta
+
+@dataclass
+class IngestionConfig:
+    """Configurações do pool de workers de extração de texto."""
+    usar_pool: bool = True             # False: um subprocess por arquivo (comportamento antigo)
+    tamanho_pool: int = 2              # Workers aquecidos simultâneos
+    timeout_segundos: float = 120.0    # Por pedido; o worker é morto e substituído
+    max_jobs_por_worker: int = 50      # Reciclagem periódica dos workers
+
+@dataclass
+class UrlFetchConfig:
+    """Configurações da ingestão de URLs (cliente HTTP compartilhado)."""
+    max_conexoes: int = 20          # Pool de conexões keep-alive
+    limite_por_host: int = 4        # Requisições simultâneas por host
+    timeout_segundos: float = 20.0
+    tentativas: int = 4
+    backoff_base: float = 0.5       # Atraso da 1ª retentativa (dobra a cada falha)
+    backoff_max: float = 8.0
+
+@dataclass
+class SessionConfig:
+    """Configurações do armazenamento de sessões da API."""
+    backend: str = "memoria"           # "memoria" | "sqlite" (persiste histórico e documentos)
+    max_sessoes: int = 200             # Acima disso, a menos usada recentemente é expulsa
+    ttl_segundos: float = 6 * 3600     # Sessão sem acesso por mais tempo é expirada
+    caminho_sqlite: str = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '.tmp', 'sessions.db'))
+
+@dataclass
+class JanitorConfig:
+    """Limpeza periódica de .tmp/ em thread de fundo (fora das requisições)."""
+    intervalo_segundos: float = 3600.0
+    max_idade_conteudo_segundos: float = 48 * 3600  # Textos extraídos (.tmp/content)
+    max_idade_spool_segundos: float = 6 * 3600      # Uploads órfãos no spool (.tmp/uploads)
+    max_idade_extracao_segundos: float = 48 * 3600  # Referências do cache de extração (.tmp/extraction)
+    max_idade_paginas_pdf_segundos: float = 48 * 3600  # Páginas de PDF já extraídas (.tmp/pdf_pages)
+    max_idade_http_cache_segundos: float = 7 * 24 * 3600  # Respostas revalidáveis de URLs (.tmp/http_cache)
+    max_idade_embedding_cache_segundos: float = 7 * 24 * 3600  # Namespaces sem uso (.tmp/embedding_cache)
+    max_bytes_embedding_cache: int = 1024 * 1024 * 1024  # Por namespace; acima disso o namespace é zerado
+
+@dataclass
+class StreamConfig:
+    """Configurações do stream SSE do chat."""
+    max_chars_token: int = 128        # Tokens acumulados até este tamanho viram um único evento
+    intervalo_flush_segundos: float = 0.05  # ...ou são enviados após este intervalo
+    heartbeat_segundos: float = 15.0  # Comentário SSE enviado em períodos ociosos
+
+@dataclass
+class SchedulerConfig:
+    """Controle de admissão dos streams de LLM (acima dos limites: HTTP 429 com Retry-After)."""
+    llm_max_execucao: int = 8           # Streams simultâneos no processo
+    llm_max_execucao_por_sessao: int = 1
+    llm_max_fila: int = 32              # Aguardando a vez, somando todas as sessões
+    llm_max_fila_por_sessao: int = 2
+    llm_max_espera_segundos: float = 10.0  # Espera máxima na fila antes de recusar
+
 # Parâmetros padrão dos modelos
 DEFAULT_MODEL_PARAMS = {
     'temperature': 0.3, # Reduzido para respostas mais precisas e menos criativas (Fase 7)
@@ -97,4 +176,11 @@ A saída deve ser estruturada em Markdown, primando pela clareza e organização
 
 # Instâncias globais
 UPLOAD_CONFIG = UploadConfig()
-RAG_CONFIG = RAGConfig()
\ No newline at end of file
+RAG_CONFIG = RAGConfig()
+JOBS_CONFIG = JobsConfig()
+INGESTION_CONFIG = IngestionConfig()
+URL_FETCH_CONFIG = UrlFetchConfig()
+SESSION_CONFIG = SessionConfig()
+JANITOR_CONFIG = JanitorConfig()
+STREAM_CONFIG = StreamConfig()
+SCHEDULER_CONFIG = SchedulerConfig()
\ No newline at end of file
@@ -8,8 +8,15 @@ Independente do Streamlit e da camada de serviços.
 import os
 import sys
 import io
+import csv
+import codecs
+import json
+import signal
+import time
+import hashlib
 import argparse
 import tempfile
+import threading
 from typing import Optional, List
 from time import sleep
 from dotenv import load_dotenv
@@ -24,6 +31,29 @@ if sys.stdout.encoding != 'utf-8':
 # Loaders do LangChain are now imported lazily inside functions
 import docx2txt
 
+# Extração de PDF por página (paralela, com cache e timeout por página)
+PDF_PAGES_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '.tmp', 'pdf_pages'))
+VERSAO_PAGINAS = 1
+PDF_WORKERS = int(os.getenv("INGESTAO_PDF_WORKERS", "0")) or min(4, os.cpu_count() or 1)
+PDF_TIMEOUT_PAGINA = float(os.getenv("INGESTAO_TIMEOUT_PAGINA", "20"))
+PDF_PAGINAS_POR_FAIXA = int(os.getenv("INGESTAO_PAGINAS_POR_FAIXA", "16"))
+
+# Modo lote
+SUFIXOS_SUPORTADOS = ('.pdf', '.csv', '.txt', '.docx')
+LOTE_WORKERS = int(os.getenv("INGESTAO_LOTE_WORKERS", "0")) or (os.cpu_count() or 1)
+
+# Detecção de encoding (TXT/CSV): quantos bytes do início do arquivo são inspecionados
+AMOSTRA_ENCODING_BYTES = int(os.getenv("INGESTAO_AMOSTRA_ENCODING", str(64 * 1024)))
+BOMS = [
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+]
+# Bytes 0x80-0x9F sem caractere no cp1252 (em latin-1 são controles C1)
+INDEFINIDOS_CP1252 = {0x81, 0x8D, 0x8F, 0x90, 0x9D}
+
 def extract_from_url(url: str) -> str:
     from fake_useragent import UserAgent
     from langchain_community.document_loaders import WebBaseLoader
@@ -43,72 +73,437 @@ def extract_from_url(url: str) -> str:
                 raise RuntimeError(f"Falha ao carregar site: {e}")
     return ""
 
+def _com_timeout(fn, segundos: float):
+    """Executa fn com limite de tempo via SIGALRM (Unix, thread principal); sem limite nos demais casos."""
+    if not segundos or not hasattr(signal, "setitimer") or threading.current_thread() is not threading.main_thread():
+        return fn()
+
+    def _estouro(signum, frame):
+        raise TimeoutError(f"excedeu {segundos:.0f}s")
+
+    anterior = signal.signal(signal.SIGALRM, _estouro)
+    signal.setitimer(signal.ITIMER_REAL, segundos)
+    try:
+        return fn()
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, anterior)
+
+def _hash_arquivo(file_path: str) -> str:
+    sha = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for bloco in iter(lambda: f.read(1024 * 1024), b''):
+            sha.update(bloco)
+    return sha.hexdigest()
+
+def _caminho_pagina(cache_dir: str, pagina: int) -> str:
+    return os.path.join(cache_dir, f"{pagina:05d}.txt")
+
+def _extrair_faixa(file_path: str, paginas: List[int], cache_dir: str, timeout_pagina: float) -> List[tuple]:
+    """
+    Extrai as páginas informadas (executado em processo do pool).
+    Cada página concluída é gravada no cache imediatamente; páginas com erro
+    ou acima do timeout são devolvidas com um aviso e não entram no cache.
+    """
+    import pypdf
+
+    reader = pypdf.PdfReader(file_path)
+    resultados = []
+    for pagina in paginas:
+        try:
+            texto = _com_timeout(lambda: reader.pages[pagina].extract_text() or "", timeout_pagina)
+        except Exception as e:
+            resultados.append((pagina, None, f"página {pagina + 1} ignorada: {e}"))
+            continue
+        destino = _caminho_pagina(cache_dir, pagina)
+        with open(f"{destino}.tmp", 'w', encoding='utf-8') as f:
+            f.write(texto)
+        os.replace(f"{destino}.tmp", destino)
+        resultados.append((pagina, texto, None))
+    return resultados
+
+def extract_pdf_paginas(
+    file_path: str,
+    workers: int = None,
+    timeout_pagina: float = None,
+    paginas_por_faixa: int = None,
+    cache_dir: str = None,
+    metadados: dict = None
+) -> str:
+    """
+    Extrai um PDF página a página.
+
+    - Páginas já extraídas deste arquivo (hash dos bytes + número) vêm do cache.
+    - As pendentes são divididas em faixas e extraídas em um pool de processos
+      (em sequência, no próprio processo, se couberem em uma única faixa).
+    - Uma página que falha ou excede `timeout_pagina` é pulada com aviso no
+      stderr, sem derrubar o documento inteiro.
+    - Se `metadados` for informado, recebe "paginas" (total do arquivo).
+    """
+    import pypdf
+    import multiprocessing
+
+    workers = workers or PDF_WORKERS
+    timeout_pagina = timeout_pagina or PDF_TIMEOUT_PAGINA
+    paginas_por_faixa = paginas_por_faixa or PDF_PAGINAS_POR_FAIXA
+    cache_dir = os.path.join(cache_dir or PDF_PAGES_DIR, f"v{VERSAO_PAGINAS}_{_hash_arquivo(file_path)}")
+    os.makedirs(cache_dir, exist_ok=True)
+
+    total = len(pypdf.PdfReader(file_path).pages)
+    textos = {}
+    for pagina in range(total):
+        caminho = _caminho_pagina(cache_dir, pagina)
+        if os.path.exists(caminho):
+            with open(caminho, 'r', encoding='utf-8') as f:
+                textos[pagina] = f.read()
+    pendentes = [p for p in range(total) if p not in textos]
+    faixas = [pendentes[i:i + paginas_por_faixa] for i in range(0, len(pendentes), paginas_por_faixa)]
+
+    avisos = []
+    if len(faixas) == 1 or (faixas and workers <= 1):
+        for faixa in faixas:
+            for pagina, texto, aviso in _extrair_faixa(file_path, faixa, cache_dir, timeout_pagina):
+                textos[pagina] = texto
+                if aviso:
+                    avisos.append(aviso)
+    elif faixas:
+        with multiprocessing.Pool(min(workers, len(faixas))) as pool:
+            tarefas = [(faixa, pool.apply_async(_extrair_faixa, (file_path, faixa, cache_dir, timeout_pagina))) for faixa in faixas]
+            for faixa, tarefa in tarefas:
+                try:
+                    for pagina, texto, aviso in tarefa.get(timeout=timeout_pagina * len(faixa) + 5):
+                        textos[pagina] = texto
+                        if aviso:
+                            avisos.append(aviso)
+                except Exception as e:
+                    # Processo travado (timeout não aplicável) ou morto: as páginas não concluídas são puladas
+                    for pagina in faixa:
+                        caminho = _caminho_pagina(cache_dir, pagina)
+                        if pagina not in textos and os.path.exists(caminho):
+                            with open(caminho, 'r', encoding='utf-8') as f:
+                                textos[pagina] = f.read()
+                        elif pagina not in textos:
+                            avisos.append(f"página {pagina + 1} ignorada: {str(e) or type(e).__name__}")
+            # O __exit__ do pool encerra (terminate) workers ainda travados
+
+    for aviso in avisos:
+        print(f"AVISO: {os.path.basename(file_path)}: {aviso}", file=sys.stderr)
+    if metadados is not None:
+        metadados["paginas"] = total
+    return '\n\n'.join(textos[p] for p in range(total) if textos.get(p) is not None)
+
+def detectar_encoding(amostra: bytes, completa: bool = False) -> str:
+    """
+    Escolhe o encoding a partir de um prefixo do arquivo:
+    BOM > padrão de bytes nulos (UTF-16 sem BOM) > validade UTF-8 > cp1252/latin-1.
+    `completa` indica que a amostra é o arquivo inteiro (sem sequência cortada no fim).
+    """
+    for bom, encoding in BOMS:
+        if amostra.startswith(bom):
+            return encoding
+
+    if amostra:
+        pares, impares = amostra[0::2], amostra[1::2]
+        # Texto ocidental em UTF-16: um dos bytes de cada par é quase sempre 0
+        if impares and impares.count(0) > 0.3 * len(impares) and pares.count(0) < 0.05 * len(pares):
+            return 'utf-16-le'
+        if pares and pares.count(0) > 0.3 * len(pares) and impares.count(0) < 0.05 * len(impares):
+            return 'utf-16-be'
+
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(amostra, final=completa)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        pass
+
+    altos = set(amostra) & set(range(0x80, 0xA0))
+    if altos and not altos & INDEFINIDOS_CP1252:
+        return 'cp1252'
+    return 'latin-1'
+
+def ler_texto(file_path: str) -> tuple:
+    """
+    Lê o arquivo uma única vez e decodifica com o encoding detectado no prefixo.
+    Retorna (texto, encoding). Se um trecho inválido aparecer depois da amostra,
+    os mesmos bytes (já em memória) são decodificados em cp1252/latin-1, sem reler o disco.
+    """
+    with open(file_path, 'rb') as f:
+        dados = f.read()
+    encoding = detectar_encoding(dados[:AMOSTRA_ENCODING_BYTES], completa=len(dados) <= AMOSTRA_ENCODING_BYTES)
+    try:
+        texto = dados.decode(encoding)
+    except UnicodeDecodeError:
+        # Sequência inválida depois da amostra: encoding de um byte sobre os mesmos bytes
+        encoding = 'latin-1' if set(dados) & INDEFINIDOS_CP1252 else 'cp1252'
+        texto = dados.decode(encoding)
+    # Mesma normalização de quebras de linha da leitura em modo texto
+    return texto.replace('\r\n', '\n').replace('\r', '\n'), encoding
+
+def _csv_normalizado(texto: str) -> str:
+    """
+    Regrava o CSV decodificado em forma canônica (UTF-8, vírgula, aspas mínimas, sem
+    linhas vazias). O cabeçalho é preservado: o chunking agrupa registros inteiros
+    e repete o cabeçalho em cada chunk (TextProcessor.criar_chunks_csv).
+    """
+    try:
+        dialeto = csv.Sniffer().sniff(texto[:AMOSTRA_ENCODING_BYTES], delimiters=',;\t|')
+    except csv.Error:
+        dialeto = csv.excel
+    saida = io.StringIO()
+    escritor = csv.writer(saida, lineterminator='\n')
+    for celulas in csv.reader(io.StringIO(texto, newline=''), dialeto):
+        if any(c.strip() for c in celulas):
+            escritor.writerow([c.strip() for c in celulas])
+    return saida.getvalue()
+
+def extrair_arquivo(file_path: str, suffix: str) -> tuple:
+    """Como extract_from_file, mas retorna (texto, metadados) — ex.: {"encoding": "cp1252"}, {"paginas": 12}."""
+    suffix = suffix.lower()
+    if suffix == '.pdf':
+        metadados = {}
+        return extract_pdf_paginas(file_path, metadados=metadados), metadados
+    if suffix in ('.txt', '.csv'):
+        texto, encoding = ler_texto(file_path)
+        return (_csv_normalizado(texto) if suffix == '.csv' else texto), {"encoding": encoding}
+    return extract_from_file(file_path, suffix), {}
+
 def extract_from_file(file_path: str, suffix: str) -> str:
     """Extrai texto de arquivo local baseado na extensão."""
     suffix = suffix.lower()
     
     if suffix == '.pdf':
-        from langchain_community.document_loaders import PyPDFLoader
         try:
             import pypdf
         except ImportError:
             raise ImportError("Biblioteca 'pypdf' não encontrada. Instale com 'pip install pypdf'.")
-            
-        loader = PyPDFLoader(file_path)
-        docs = loader.load()
-        if not docs:
-            return ""
-        return '\n\n'.join([doc.page_content for doc in docs])
+        return extract_pdf_paginas(file_path)
     
     elif suffix == '.csv':
-        from langchain_community.document_loaders import CSVLoader
-        # Tenta múltiplos encodings para CSV
-        encodings = ['utf-8', 'utf-8-sig', 'latin-1', 'cp1252']
-        last_err = None
-        for enc in encodings:
-            try:
-                loader = CSVLoader(file_path, encoding=enc)
-                docs = loader.load()
-                return '\n\n'.join([doc.page_content for doc in docs])
-            except Exception as e:
-                last_err = e
-                continue
-        raise RuntimeError(f"Não foi possível ler o arquivo CSV com nenhum dos encodings {encodings}. Erro final: {last_err}")
+        texto, _ = ler_texto(file_path)
+        return _csv_normalizado(texto)
 
-    
     elif suffix == '.txt':
-        from langchain_community.document_loaders import TextLoader
-        # Tenta múltiplos encodings
-        encodings = ['utf-8', 'utf-8-sig', 'latin-1', 'cp1252', 'utf-16']
-        last_err = None
-        for enc in encodings:
-            try:
-                loader = TextLoader(file_path, encoding=enc)
-                docs = loader.load()
-                return '\n\n'.join([doc.page_content for doc in docs])
-            except Exception as e:
-                last_err = e
-                continue
-        raise RuntimeError(f"Não foi possível ler o arquivo TXT com nenhum dos encodings {encodings}. Erro final: {last_err}")
-
+        texto, _ = ler_texto(file_path)
+        return texto
 
-    
     elif suffix == '.docx':
         return docx2txt.process(file_path)
     
     else:
         raise ValueError(f"Extensão {suffix} não suportada.")
 
+def executar_pedido(pedido: dict) -> tuple:
+    """
+    Executa um pedido de extração ({"url": ...} ou {"file": ..., "suffix": ...}).
+    Retorna (conteudo, metadados).
+    """
+    metadados = {}
+    if pedido.get("url"):
+        content = extract_from_url(pedido["url"])
+    else:
+        file_path = pedido["file"]
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(f"Arquivo não encontrado: {file_path}")
+        content, metadados = extrair_arquivo(file_path, pedido.get("suffix") or os.path.splitext(file_path)[1])
+    if not content:
+        raise RuntimeError("Nenhum conteúdo extraído.")
+    return content, metadados
+
+def aquecer():
+    """Pré-carrega os loaders (o custo de import fica fora do primeiro pedido)."""
+    from langchain_community.document_loaders import PyPDFLoader, WebBaseLoader  # noqa: F401
+    import pypdf  # noqa: F401
+
+def servir():
+    """
+    Modo worker: atende pedidos em sequência até o stdin fechar.
+    Protocolo: uma linha JSON por pedido no stdin e uma linha JSON por
+    resposta ({"ok": true, "conteudo": ..., "metadados": {...}} ou {"ok": false, "erro": ...}) no stdout.
+    """
+    # O stdout fica reservado ao protocolo; prints de bibliotecas vão para o stderr
+    canal = sys.stdout.buffer
+    sys.stdout = sys.stderr
+    try:
+        aquecer()
+    except Exception as e:
+        print(f"[INGESTAO] Aviso no aquecimento: {e}", file=sys.stderr)
+
+    for linha in sys.stdin.buffer:
+        if not linha.strip():
+            continue
+        try:
+            conteudo, metadados = executar_pedido(json.loads(linha))
+            resposta = {"ok": True, "conteudo": conteudo, "metadados": metadados}
+        except Exception as e:
+            resposta = {"ok": False, "erro": str(e)}
+        canal.write(json.dumps(resposta, ensure_ascii=False).encode('utf-8') + b"\n")
+        canal.flush()
+
+# ==================== MODO LOTE ====================
+
+def _servicos():
+    """
+    Armazém de conteúdo e cache de extração da camada de serviços. Só o modo lote
+    os usa (para pré-carregar o corpus); os modos --file/--url seguem independentes.
+    """
+    raiz = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    if raiz not in sys.path:
+        sys.path.insert(0, raiz)
+    from services.content_store import get_content_store
+    from services.extraction_cache import get_extraction_cache
+    return get_content_store, get_extraction_cache
+
+def entradas_lote(origem: str) -> List[dict]:
+    """
+    Entradas de um lote: um diretório (arquivos suportados, recursivamente) ou
+    um manifesto JSONL com uma entrada por linha ({"file": ..., "suffix"?: ...} ou {"url": ...}).
+    """
+    if os.path.isdir(origem):
+        return [
+            {"file": os.path.join(pasta, nome)}
+            for pasta, _, nomes in sorted(os.walk(origem))
+            for nome in sorted(nomes)
+            if os.path.splitext(nome)[1].lower() in SUFIXOS_SUPORTADOS
+        ]
+    base = os.path.dirname(os.path.abspath(origem))
+    entradas = []
+    with open(origem, 'r', encoding='utf-8') as f:
+        for numero, linha in enumerate(f, 1):
+            if not linha.strip():
+                continue
+            entrada = json.loads(linha)
+            if not (entrada.get("file") or entrada.get("url")):
+                raise ValueError(f"{origem}:{numero}: entrada sem 'file' nem 'url'.")
+            if entrada.get("file") and not os.path.isabs(entrada["file"]):
+                entrada["file"] = os.path.join(base, entrada["file"])
+            entradas.append(entrada)
+    return entradas
+
+def _iniciar_worker_lote():
+    # Processos do pool são daemon e não podem abrir o pool de páginas:
+    # no lote o paralelismo é entre arquivos
+    global PDF_WORKERS
+    PDF_WORKERS = 1
+
+def _extrair_entrada_lote(pedido: tuple) -> dict:
+    """Extrai uma entrada do lote (em processo do pool) e grava o texto no armazém."""
+    entrada, content_dir = pedido
+    get_content_store, get_extraction_cache = _servicos()
+    inicio = time.perf_counter()
+    resultado = {
+        "entrada": entrada.get("file") or entrada.get("url"),
+        "caminho_texto": None, "hash": None, "encoding": None, "paginas": None,
+        "segundos": 0.0, "erro": None, "do_cache": False,
+    }
+    try:
+        store = get_content_store(content_dir)
+        metadados = {}
+        if entrada.get("url"):
+            texto = extract_from_url(entrada["url"])
+        else:
+            file_path = entrada["file"]
+            if not os.path.exists(file_path):
+                raise FileNotFoundError(f"Arquivo não encontrado: {file_path}")
+            suffix = (entrada.get("suffix") or os.path.splitext(file_path)[1]).lower()
+            hash_bytes = _hash_arquivo(file_path)
+            resultado.update(_suffix=suffix, _hash_bytes=hash_bytes)
+            em_cache = get_extraction_cache(content_dir).get(hash_bytes, suffix)
+            if em_cache:
+                caminho, metadados = em_cache
+                resultado.update(
+                    caminho_texto=caminho, hash=os.path.splitext(os.path.basename(caminho))[0],
+                    encoding=metadados.get("encoding"), paginas=metadados.get("paginas"), do_cache=True
+                )
+                return resultado
+            texto, metadados = extrair_arquivo(file_path, suffix)
+        if not texto:
+            raise RuntimeError("Nenhum conteúdo extraído.")
+        content_hash = store.gravar(texto)
+        resultado.update(
+            caminho_texto=store.caminho(content_hash), hash=content_hash,
+            encoding=metadados.get("encoding"), paginas=metadados.get("paginas"), _metadados=metadados
+        )
+    except Exception as e:
+        resultado["erro"] = str(e) or type(e).__name__
+    finally:
+        resultado["segundos"] = round(time.perf_counter() - inicio, 3)
+    return resultado
+
+def processar_lote(origem: str, saida: str = None, workers: int = None, content_dir: str = None) -> dict:
+    """
+    Extrai um diretório ou manifesto em paralelo, gravando os textos no armazém de
+    conteúdo (.tmp/content) e uma linha JSON por entrada em `saida` (ou no stdout).
+
+    Retomável: entradas já concluídas em `saida` são puladas, e arquivos cujos bytes
+    já estão no cache de extração não são reextraídos (saem com "do_cache": true).
+    """
+    get_content_store, get_extraction_cache = _servicos()
+    content_dir = content_dir or get_content_store().dir
+    cache = get_extraction_cache(content_dir)
+
+    entradas = entradas_lote(origem)
+    concluidas = set()
+    if saida and os.path.exists(saida):
+        with open(saida, 'r', encoding='utf-8') as f:
+            for linha in f:
+                try:
+                    registro = json.loads(linha)
+                except ValueError:
+                    continue  # Linha truncada por interrupção: a entrada é refeita
+                if not registro.get("erro"):
+                    concluidas.add(registro.get("entrada"))
+    pendentes = [e for e in entradas if (e.get("file") or e.get("url")) not in concluidas]
+
+    resumo = {"total": len(entradas), "puladas": len(entradas) - len(pendentes), "extraidas": 0, "do_cache": 0, "erros": 0}
+    destino = open(saida, 'a', encoding='utf-8') if saida else sys.stdout
+    try:
+        if pendentes:
+            import multiprocessing
+            workers = max(1, min(workers or LOTE_WORKERS, len(pendentes)))
+            with multiprocessing.Pool(workers, initializer=_iniciar_worker_lote) as pool:
+                for resultado in pool.imap_unordered(_extrair_entrada_lote, [(e, content_dir) for e in pendentes]):
+                    suffix, hash_bytes = resultado.pop("_suffix", None), resultado.pop("_hash_bytes", None)
+                    metadados = resultado.pop("_metadados", None)
+                    if resultado["erro"]:
+                        resumo["erros"] += 1
+                    elif resultado["do_cache"]:
+                        resumo["do_cache"] += 1
+                    else:
+                        resumo["extraidas"] += 1
+                        if hash_bytes:
+                            cache.put(hash_bytes, suffix, resultado["hash"], metadados)
+                    destino.write(json.dumps(resultado, ensure_ascii=False) + "\n")
+                    destino.flush()
+    finally:
+        if saida:
+            destino.close()
+    return resumo
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Extração determinística de texto.")
     group = parser.add_mutually_exclusive_group(required=True)
     group.add_argument("--url", help="URL para processar")
     group.add_argument("--file", help="Caminho do arquivo local")
+    group.add_argument("--servir", action="store_true", help="Modo worker persistente (pedidos JSON via stdin)")
+    group.add_argument("--lote", help="Diretório ou manifesto JSONL para extração em lote")
     parser.add_argument("--suffix", help="Sufixo do arquivo (se --file for usado)", default=None)
-    parser.add_argument("--output", help="Arquivo de saída (opcional)", default=None)
+    parser.add_argument("--output", help="Arquivo de saída (opcional; no lote, resultados JSONL)", default=None)
+    parser.add_argument("--workers", type=int, help="Processos paralelos no modo lote", default=None)
 
     args = parser.parse_args()
 
+    if args.servir:
+        servir()
+        sys.exit(0)
+
+    if args.lote:
+        if not os.path.exists(args.lote):
+            print(f"ERRO: Lote não encontrado: {args.lote}", file=sys.stderr)
+            sys.exit(1)
+        resumo = processar_lote(args.lote, args.output, args.workers)
+        print(f"LOTE: {json.dumps(resumo)}", file=sys.stderr)
+        sys.exit(1 if resumo["erros"] else 0)
+
     try:
         content = ""
         if args.url:
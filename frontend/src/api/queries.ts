@@ -1,6 +1,6 @@
 import { useMutation, useQuery } from '@tanstack/react-query';
 import { apiClient } from './client';
-import type { SessionInfo } from '../types';
+import type { JobEvent, ResultadoArquivo, SessionInfo } from '../types';
 
 export const useSession = (sessionId?: string) => {
     return useQuery({
@@ -17,6 +17,34 @@ export const useSession = (sessionId?: string) => {
     });
 };
 
+// Acompanha o stream NDJSON de progresso do job de indexação até a conclusão
+const acompanharJob = async (jobId: string, onProgress?: (evento: JobEvent) => void) => {
+    const response = await fetch(`${apiClient.defaults.baseURL}/jobs/${jobId}/stream`);
+    if (!response.ok || !response.body) throw new Error('Falha ao acompanhar o processamento');
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let ultimo: JobEvent | null = null;
+
+    while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        const linhas = buffer.split('\n');
+        buffer = linhas.pop() ?? '';
+        for (const linha of linhas) {
+            if (!linha.trim()) continue;
+            ultimo = JSON.parse(linha) as JobEvent;
+            onProgress?.(ultimo);
+        }
+    }
+
+    if (!ultimo) throw new Error('Processamento encerrado sem resposta');
+    if (ultimo.status === 'erro') throw new Error(ultimo.erro || 'Falha no processamento');
+    return { job_id: jobId, ...ultimo.resultado };
+};
+
 export const useUploadDocument = () => {
     return useMutation({
         mutationFn: async ({ sessionId, file }: { sessionId: string; file: File }) => {
@@ -28,11 +56,31 @@ export const useUploadDocument = () => {
                     'Content-Type': 'multipart/form-data',
                 },
             });
+            // O upload apenas enfileira o processamento; o resultado vem pelo stream do job
+            if (data.job_id) return acompanharJob(data.job_id);
             return data;
         },
     });
 };
 
+// Vários arquivos em um único job: extração concorrente e uma só indexação
+export const useUploadLote = () => {
+    return useMutation({
+        mutationFn: async ({ sessionId, files }: { sessionId: string; files: File[] }) => {
+            const formData = new FormData();
+            formData.append('session_id', sessionId);
+            files.forEach((file) => formData.append('files', file));
+            const { data } = await apiClient.post('/upload/lote', formData, {
+                headers: {
+                    'Content-Type': 'multipart/form-data',
+                },
+            });
+            const resultado = await acompanharJob(data.job_id);
+            return resultado as typeof resultado & { resultados?: ResultadoArquivo[] };
+        },
+    });
+};
+
 export const useChat = () => {
     return useMutation({
         mutationFn: async ({ sessionId, message }: { sessionId: string; message: string }) => {
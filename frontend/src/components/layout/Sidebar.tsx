@@ -10,11 +10,12 @@ import {
     Cpu
 } from 'lucide-react';
 import { useAppStore } from '../../store/useAppStore';
-import { useUploadDocument } from '../../api/queries';
+import { useUploadDocument, useUploadLote } from '../../api/queries';
 
 export const Sidebar: React.FC = () => {
     const { documentos, sessionId, removeDocumento, addDocumento, ragStats, setRagStats, incrementUpload, decrementUpload } = useAppStore();
     const uploadMutation = useUploadDocument();
+    const uploadLoteMutation = useUploadLote();
 
     interface UploadCallbackProps {
         // eslint-disable-next-line @typescript-eslint/no-explicit-any
@@ -61,6 +62,48 @@ export const Sidebar: React.FC = () => {
         }
     };
 
+    // Seleção múltipla: um único envio para o endpoint de lote
+    const handleUploadLote = async (files: File[]) => {
+        if (!sessionId) return;
+
+        const hide = message.loading(`Enviando ${files.length} arquivos...`, 0);
+        incrementUpload();
+
+        try {
+            const result = await uploadLoteMutation.mutateAsync({ sessionId, files });
+            if (result.rag_stats) {
+                setRagStats(result.rag_stats);
+            }
+            const porNome = new Map(files.map((file) => [file.name, file]));
+            for (const r of result.resultados ?? []) {
+                const file = porNome.get(r.arquivo);
+                if (!r.success || !file) {
+                    message.error(`Falha ao carregar ${r.arquivo}: ${r.message}`);
+                    continue;
+                }
+                addDocumento({
+                    id: Math.random().toString(36),
+                    nome: file.name,
+                    tipo: 'PDF',
+                    tamanho_bytes: file.size,
+                    tamanho_chars: 0,
+                    data_upload: new Date().toISOString()
+                });
+            }
+            hide();
+            if (result.rag_error) {
+                message.warning(`Documentos salvos, mas erro ao indexar: ${result.rag_error}`);
+            } else {
+                message.success(`${files.length} arquivos processados.`);
+            }
+        } catch {
+            hide();
+            message.error(`Falha ao carregar os ${files.length} arquivos.`);
+        } finally {
+            decrementUpload();
+        }
+    };
+
     const getIcon = (tipo: string) => {
         switch (tipo) {
             case 'SITE': return <Globe size={16} />;
@@ -168,8 +211,14 @@ export const Sidebar: React.FC = () => {
             <div className="p-6 bg-slate-50/50 border-t border-slate-100 mt-auto">
                 <Upload
                     customRequest={handleUpload}
+                    beforeUpload={(file, fileList) => {
+                        if (fileList.length < 2) return true;
+                        // Dispara o lote uma vez (no primeiro arquivo) e cancela os envios individuais
+                        if (file === fileList[0]) handleUploadLote(fileList as unknown as File[]);
+                        return false;
+                    }}
                     showUploadList={false}
-                    disabled={uploadMutation.isPending}
+                    disabled={uploadMutation.isPending || uploadLoteMutation.isPending}
                     multiple
                 >
                     <Button
@@ -177,9 +226,9 @@ export const Sidebar: React.FC = () => {
                         icon={<Plus size={16} />}
                         block
                         className="h-10 font-bold rounded-xl shadow-lg shadow-primary-600/20"
-                        loading={uploadMutation.isPending}
+                        loading={uploadMutation.isPending || uploadLoteMutation.isPending}
                     >
-                        {uploadMutation.isPending ? 'Enviando...' : 'Adicionar Documento'}
+                        {uploadMutation.isPending || uploadLoteMutation.isPending ? 'Enviando...' : 'Adicionar Documento'}
                     </Button>
                 </Upload>
             </div>
@@ -69,6 +69,22 @@ export interface SessionInfo {
     [key: string]: any;
 }
 
+export interface JobEvent {
+    job_id: string;
+    status: 'na_fila' | 'executando' | 'concluido' | 'erro';
+    progresso: number;
+    mensagem: string;
+    // eslint-disable-next-line @typescript-eslint/no-explicit-any
+    resultado?: { rag_stats?: SessionInfo['rag_stats']; rag_error?: string; [key: string]: any } | null;
+    erro?: string | null;
+}
+
+export interface ResultadoArquivo {
+    arquivo: string;
+    success: boolean;
+    message: string;
+}
+
 export type OrdemOpcao = 'recentes' | 'antigos' | 'nome-az' | 'nome-za' | 'etapa';
 export type ViewMode = 'grid' | 'lista';
 
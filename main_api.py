@@ -1,19 +1,34 @@
 import os
+import json
 import uuid
+import asyncio
 from typing import List, Optional, Dict, Any
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 
 from dotenv import load_dotenv
 load_dotenv()
 from api.v2.routers.auth import router as auth_router_v2
 from core.config import settings
 
-from services.upload_manager import UploadManager, DocumentoCarregado
+from services.upload_manager import UploadManager, DocumentoCarregado, ArquivoRecebido, ArquivoGrandeDemaisError, MARGEM_MULTIPART_BYTES
 from services.model_manager import ModelManager
-from config.settings import TipoArquivo
+from services.rag_manager import liberar_colecao
+from services.indexing_jobs import INDEXING_QUEUE, FilaCheiaError
+from services.embedding_registry import EMBEDDING_REGISTRY
+from services.ingestion_pool import get_ingestion_pool
+from services.url_fetcher import URL_FETCHER, DEFAULT_HTTP_CACHE_DIR
+from services.session_store import criar_session_store
+from services.content_store import DEFAULT_CONTENT_DIR
+from services.janitor import JANITOR, remover_antigos, remover_subdiretorios_antigos
+from services.extraction_cache import DEFAULT_EXTRACTION_DIR
+from services.embedding_cache import limitar_embedding_cache
+from services.chat_stream import EventoChat, ERROR, stream_sse, textos
+from services.scheduler import ESCALONADOR_LLM, AdmissaoNegadaError, Permissao
+from config.settings import TipoArquivo, UPLOAD_CONFIG, RAG_CONFIG, INGESTION_CONFIG, SESSION_CONFIG, JANITOR_CONFIG, STREAM_CONFIG
 
 app = FastAPI(title="Oráculo Acadêmico API", version="1.0.0")
 app.include_router(auth_router_v2)
@@ -27,24 +42,131 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Gerenciador de Sessões (Em memória para este exemplo/MVP)
-# Em produção, usar Redis ou Banco de Dados
-sessions: Dict[str, Dict[str, Any]] = {}
+@app.middleware("http")
+async def limitar_tamanho_upload(request, call_next):
+    """Recusa uploads acima do limite pelo Content-Length, antes de ler o corpo."""
+    from fastapi.responses import JSONResponse
+    limites = {
+        "/api/v1/upload": UPLOAD_CONFIG.MAX_SIZE_BYTES,
+        "/api/v1/upload/lote": UPLOAD_CONFIG.MAX_SIZE_BYTES * UPLOAD_CONFIG.MAX_ARQUIVOS,
+    }
+    if request.url.path in limites:
+        tamanho = request.headers.get("content-length")
+        if tamanho and tamanho.isdigit() and int(tamanho) > limites[request.url.path] + MARGEM_MULTIPART_BYTES:
+            return JSONResponse(
+                status_code=413,
+                content={"detail": f"Arquivo muito grande. Limite: {UPLOAD_CONFIG.MAX_SIZE_MB}MB."}
+            )
+    return await call_next(request)
+
+@app.on_event("startup")
+async def warmup_embeddings():
+    """Carrega o modelo de embeddings uma única vez, fora do caminho das requisições."""
+    loop = asyncio.get_running_loop()
+    # Executa em thread para não bloquear o event loop durante o carregamento
+    loop.run_in_executor(
+        None,
+        EMBEDDING_REGISTRY.warmup,
+        RAG_CONFIG.embedding_model,
+        RAG_CONFIG.embedding_device
+    )
+
+@app.on_event("startup")
+async def warmup_ingestion_pool():
+    """Sobe os workers de extração antes do primeiro upload."""
+    pool = get_ingestion_pool()
+    if pool is not None:
+        asyncio.get_running_loop().run_in_executor(None, pool.iniciar)
+
+@app.on_event("shutdown")
+async def shutdown_ingestion_pool():
+    # Jobs na fila são cancelados; os em execução terminam antes de o pool fechar
+    await asyncio.to_thread(INDEXING_QUEUE.shutdown)
+    pool = get_ingestion_pool()
+    if pool is not None:
+        pool.encerrar()
+    await URL_FETCHER.fechar()
+
+@app.on_event("startup")
+async def iniciar_janitor():
+    """Limpeza de .tmp/ e expiração de sessões em thread de fundo, fora das requisições."""
+    spool_dir = UploadManager().spool_dir
+    # Mesmo caminho de PDF_PAGES_DIR (execution/document_ingestion.py, que a API não importa)
+    pdf_pages_dir = os.path.join(os.path.dirname(DEFAULT_CONTENT_DIR), 'pdf_pages')
+    JANITOR.registrar("conteudo", lambda: remover_antigos(DEFAULT_CONTENT_DIR, JANITOR_CONFIG.max_idade_conteudo_segundos))
+    JANITOR.registrar("spool", lambda: remover_antigos(spool_dir, JANITOR_CONFIG.max_idade_spool_segundos))
+    JANITOR.registrar("extracao", lambda: remover_antigos(DEFAULT_EXTRACTION_DIR, JANITOR_CONFIG.max_idade_extracao_segundos))
+    JANITOR.registrar("paginas_pdf", lambda: remover_subdiretorios_antigos(pdf_pages_dir, JANITOR_CONFIG.max_idade_paginas_pdf_segundos))
+    JANITOR.registrar("http_cache", lambda: remover_antigos(DEFAULT_HTTP_CACHE_DIR, JANITOR_CONFIG.max_idade_http_cache_segundos))
+    JANITOR.registrar("embedding_cache", lambda: limitar_embedding_cache(
+        JANITOR_CONFIG.max_bytes_embedding_cache, JANITOR_CONFIG.max_idade_embedding_cache_segundos
+    ))
+    JANITOR.registrar("sessoes", SESSION_STORE.expirar)
+    JANITOR.iniciar()
+
+@app.on_event("shutdown")
+async def shutdown_sessions():
+    JANITOR.parar()
+    SESSION_STORE.salvar_todas()
+
+def _recusar(e: AdmissaoNegadaError):
+    """Falha rápida quando o limite de concorrência/fila foi atingido."""
+    raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+@app.get("/api/v1/health/ready")
+async def readiness():
+    """Sinal de prontidão: o modelo de embeddings já foi carregado."""
+    ready = EMBEDDING_REGISTRY.is_ready
+    if not ready:
+        raise HTTPException(status_code=503, detail="Modelo de embeddings ainda carregando.")
+    return {"ready": True, "embedding_models": EMBEDDING_REGISTRY.carregados()}
+
+# Sessões limitadas por quantidade (LRU) e inatividade (TTL); backend em SESSION_CONFIG
+SESSION_STORE = criar_session_store(SESSION_CONFIG)
+sessions = SESSION_STORE  # Nome antigo (testes e depuração)
+
+# Recursos pesados da sessão: recriados sob demanda (chat/upload) se ela voltar
+RECURSOS_PESADOS = (
+    '_model_manager', 'llm', 'chain', '_rag_manager', '_docs_manager', '_retrieval_cache',
+    'vector_store', 'rag_chunks', 'embedding_model', 'chroma_client',
+)
+
+def _liberar_recursos_sessao(session_id: str, state: Dict[str, Any], motivo: str):
+    """Hook de expulsão: solta os objetos pesados da sessão e, se ela não volta, apaga seus índices."""
+    cache = state.get('_retrieval_cache')
+    if cache is not None:
+        cache.limpar()
+    for chave in RECURSOS_PESADOS:
+        state.pop(chave, None)
+    # Removida, ou expulsa de um backend sem persistência: os documentos não voltam
+    apagar = motivo == "removida" or not SESSION_STORE.persistente
+    try:
+        liberar_colecao(session_id, apagar=apagar)
+    except Exception as e:
+        print(f"[SESSOES] Erro ao liberar índices de {session_id}: {e}")
+    print(f"[SESSOES] Sessão {session_id} expulsa ({motivo}).")
+
+def _sessao_em_uso(session_id: str) -> bool:
+    """Sessões com job de indexação ou stream de chat (permissão do LLM) não são expulsas."""
+    return INDEXING_QUEUE.sessao_ocupada(session_id) or ESCALONADOR_LLM.sessao_ocupada(session_id)
+
+SESSION_STORE.protegida = _sessao_em_uso
+SESSION_STORE.ao_expulsar(_liberar_recursos_sessao)
+
+def _nova_sessao(session_id: str) -> Dict[str, Any]:
+    return {
+        'session_id': session_id,
+        'mensagens': [],
+        'documentos': [],
+        'chain': None,
+        'llm': None,
+        'usar_rag': True,
+        'agente_ativo': 'ORCHESTRATOR',
+        'active_doc_id': None
+    }
 
 def get_session(session_id: str):
-    if session_id not in sessions:
-        # Inicializa estado da sessão
-        state = {
-            'mensagens': [],
-            'documentos': [],
-            'chain': None,
-            'llm': None,
-            'usar_rag': True,
-            'agente_ativo': 'ORCHESTRATOR',
-            'active_doc_id': None
-        }
-        sessions[session_id] = state
-    return sessions[session_id]
+    return SESSION_STORE.obter(session_id, _nova_sessao)
 
 class ChatRequest(BaseModel):
     session_id: str
@@ -55,6 +177,11 @@ class ChatResponse(BaseModel):
     agent: str
     active_doc_id: Optional[str] = None
 
+class UrlUploadRequest(BaseModel):
+    session_id: str
+    url: str
+    nome: Optional[str] = None
+
 class SessionInfo(BaseModel):
     session_id: str
     total_docs: int
@@ -80,29 +207,85 @@ async def get_session_info(session_id: str):
         rag_stats=state.get('rag_stats')
     )
 
-@app.post("/api/v1/upload")
-async def upload_document(
-    session_id: str = Form(...),
-    file: UploadFile = File(...)
-):
+@app.get("/api/v1/stats/extracao")
+async def get_extraction_stats():
+    """Acertos do cache de extração por hash dos bytes (processo inteiro)."""
+    return UploadManager().extraction_cache.get_stats()
+
+@app.get("/api/v1/stats/escalonador")
+async def get_scheduler_stats():
+    """Ocupação e profundidade das filas de LLM e de indexação (por sessão), recusas e esperas."""
+    return {"llm": ESCALONADOR_LLM.get_metricas(), "indexacao": INDEXING_QUEUE.fila.get_metricas()}
+
+@app.get("/api/v1/stats/sessoes")
+async def get_session_stats():
+    """Sessões vivas, expulsões (LRU/TTL) e bytes aproximados por sessão."""
+    return SESSION_STORE.get_metricas()
+
+@app.get("/api/v1/session/{session_id}/cache")
+async def get_session_cache_stats(session_id: str):
+    """Contadores de acerto dos caches de busca (para dimensionamento)."""
     state = get_session(session_id)
+    rag_manager = state.get('_rag_manager')
+    if not rag_manager:
+        raise HTTPException(status_code=404, detail="RAG ainda não inicializado nesta sessão.")
+    return rag_manager.get_cache_stats()
+
+def _processar_upload(state: Dict[str, Any], tipo: TipoArquivo, recebido: ArquivoRecebido, progress_callback=None) -> Dict[str, Any]:
+    """Extração + indexação de um upload (executado em worker da fila de indexação)."""
     up_manager = UploadManager(external_state=state['documentos'])
-    
-    content = await file.read()
-    tipo = up_manager.detectar_tipo_arquivo(file.filename)
-    if not tipo:
-        raise HTTPException(status_code=400, detail="Tipo de arquivo não suportado.")
-    
-    success, message = up_manager.carregar_documento_de_dados(tipo, content, file.filename)
+
+    if progress_callback:
+        progress_callback(0.0, f"Extraindo texto de {recebido.nome}...")
+    success, message = up_manager.carregar_documento_recebido(tipo, recebido)
     if not success:
-        raise HTTPException(status_code=500, detail=message)
+        raise RuntimeError(message)
     
+    rag_stats, rag_error = _indexar_sessao(state, progress_callback)
+
+    return {
+        "success": True, 
+        "message": message, 
+        "total_docs": len(state['documentos']),
+        "rag_stats": rag_stats,
+        "rag_error": rag_error
+    }
+
+def _processar_lote(state: Dict[str, Any], itens: List[tuple], progress_callback=None) -> Dict[str, Any]:
+    """Extração concorrente de vários uploads seguida de uma única indexação."""
+    up_manager = UploadManager(external_state=state['documentos'])
+
+    def progresso_extracao(fracao, mensagem):
+        if progress_callback:
+            progress_callback(0.1 * fracao, mensagem)
+
+    resultados = up_manager.carregar_lote(
+        itens,
+        max_paralelo=INGESTION_CONFIG.tamanho_pool,
+        progress_callback=progresso_extracao
+    )
+    if not any(r["success"] for r in resultados):
+        raise RuntimeError(" | ".join(f"{r['arquivo']}: {r['message']}" for r in resultados))
+
+    # Um único passo de sincronização: os chunks novos de todos os arquivos são embutidos juntos
+    rag_stats, rag_error = _indexar_sessao(state, progress_callback)
+
+    return {
+        "success": True,
+        "resultados": resultados,
+        "total_docs": len(state['documentos']),
+        "rag_stats": rag_stats,
+        "rag_error": rag_error
+    }
+
+def _indexar_sessao(state: Dict[str, Any], progress_callback=None) -> tuple:
+    """Indexa os documentos da sessão (com purge & retry em corrupção do Chroma)."""
     # Se documentos carregados, inicializamos a chain RAG no ModelManager
-    mm = ModelManager(session_state=state)
+    mm = ModelManager.da_sessao(state)
     rag_stats = None
     rag_error = None
     try:
-        rag_stats = mm.criar_chain_rag(state['documentos'])
+        rag_stats = mm.criar_chain_rag(state['documentos'], progress_callback=progress_callback)
     except Exception as e:
         error_msg = str(e)
         # Verifica se é erro de corrupção do Vector DB (HNSW/Compaction)
@@ -110,9 +293,9 @@ async def upload_document(
             print(f"⚠️ Corrupção detectada no ChromaDB: {error_msg}")
             print("♻️  Iniciando protocolo de auto-recuperação (Purge & Retry)...")
             try:
-                # Tenta limpar tudo e reindexar
-                mm.rag_manager.purgar_fisicamente()
-                rag_stats = mm.criar_chain_rag(state['documentos'])
+                # Limpa só a coleção desta sessão e reindexa (textos dos documentos atuais ficam)
+                mm.rag_manager.purgar_fisicamente(manter_conteudo=[d.hash for d in state['documentos']])
+                rag_stats = mm.criar_chain_rag(state['documentos'], progress_callback=progress_callback)
                 print("✅ Auto-recuperação concluída com sucesso!")
                 rag_error = None
             except Exception as retry_e:
@@ -122,59 +305,264 @@ async def upload_document(
             print(f"Erro ao criar chain RAG: {error_msg}")
             rag_error = error_msg
 
+    SESSION_STORE.salvar(state['session_id'])
+    return rag_stats, rag_error
+
+def _schema_upload(campo_arquivo: str, varios: bool) -> dict:
+    """Corpo multipart documentado no OpenAPI (os endpoints leem `request.stream()` direto)."""
+    arquivo = {"type": "string", "format": "binary"}
+    return {"requestBody": {"required": True, "content": {"multipart/form-data": {"schema": {
+        "type": "object",
+        "required": ["session_id", campo_arquivo],
+        "properties": {
+            "session_id": {"type": "string"},
+            campo_arquivo: {"type": "array", "items": arquivo} if varios else arquivo,
+        },
+    }}}}}
+
+async def _receber_formulario(request: Request, max_arquivos: int, recusar_excedente: bool):
+    """Lê o multipart gravando os arquivos direto no spool; retorna (sessão, formulário)."""
+    tamanho = request.headers.get("content-length", "")
+    try:
+        form = await UploadManager().receber_multipart(
+            request.stream(),
+            request.headers.get("content-type"),
+            max_arquivos=max_arquivos,
+            recusar_excedente=recusar_excedente,
+            tamanho_declarado=int(tamanho) if tamanho.isdigit() else None
+        )
+    except ArquivoGrandeDemaisError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    session_id = form.campos.get("session_id")
+    if not session_id:
+        form.descartar()
+        raise HTTPException(status_code=422, detail="Campo 'session_id' obrigatório.")
+    return session_id, form
+
+@app.post("/api/v1/upload", openapi_extra=_schema_upload("file", varios=False))
+async def upload_document(request: Request):
+    """Enfileira a extração e indexação do arquivo e retorna o job imediatamente."""
+    # Streaming da conexão para o spool: hash e limite de tamanho calculados durante a leitura
+    session_id, form = await _receber_formulario(request, max_arquivos=1, recusar_excedente=False)
+    if not form.arquivos:
+        detalhe = form.recusados[0]["message"] if form.recusados else "Nenhum arquivo enviado."
+        raise HTTPException(status_code=400, detail=detalhe)
+    recebido = form.arquivos[0]
+    filename = recebido.nome
+
+    state = get_session(session_id)
+    up_manager = UploadManager(external_state=state['documentos'])
+    tipo = up_manager.detectar_tipo_arquivo(filename)
+
+    try:
+        job = INDEXING_QUEUE.submit(
+            session_id,
+            lambda progress_callback: _processar_upload(state, tipo, recebido, progress_callback),
+            descricao=filename
+        )
+    except FilaCheiaError as e:
+        recebido.descartar()
+        _recusar(e)
+
     return {
-        "success": True, 
-        "message": message, 
-        "total_docs": len(state['documentos']),
-        "rag_stats": rag_stats,
-        "rag_error": rag_error
+        "success": True,
+        "job_id": job.id,
+        "status": job.status,
+        "message": f"'{filename}' recebido. Processamento em andamento.",
+        "total_docs": len(state['documentos'])
+    }
+
+@app.post("/api/v1/upload/lote", openapi_extra=_schema_upload("files", varios=True))
+async def upload_lote(request: Request):
+    """Recebe vários arquivos e enfileira um único job (extração concorrente + uma indexação)."""
+    # Arquivos inválidos ou grandes demais são recusados um a um, sem interromper o lote
+    session_id, form = await _receber_formulario(
+        request, max_arquivos=UPLOAD_CONFIG.MAX_ARQUIVOS, recusar_excedente=True
+    )
+    recusados = form.recusados
+    if not form.arquivos:
+        raise HTTPException(status_code=400, detail={"resultados": recusados})
+
+    state = get_session(session_id)
+    up_manager = UploadManager(external_state=state['documentos'])
+    itens = [(up_manager.detectar_tipo_arquivo(recebido.nome), recebido) for recebido in form.arquivos]
+
+    def tarefa(progress_callback):
+        resultado = _processar_lote(state, itens, progress_callback)
+        resultado["resultados"] += recusados
+        return resultado
+
+    try:
+        job = INDEXING_QUEUE.submit(session_id, tarefa, descricao=f"{len(itens)} arquivos")
+    except FilaCheiaError as e:
+        form.descartar()
+        _recusar(e)
+
+    return {
+        "success": True,
+        "job_id": job.id,
+        "status": job.status,
+        "aceitos": [recebido.nome for _, recebido in itens],
+        "recusados": recusados,
+        "message": f"{len(itens)} arquivo(s) recebido(s). Processamento em andamento.",
+        "total_docs": len(state['documentos'])
+    }
+
+@app.post("/api/v1/upload/url")
+async def upload_url(request: UrlUploadRequest):
+    """Busca a URL no event loop (cliente HTTP compartilhado) e enfileira a indexação."""
+    state = get_session(request.session_id)
+    up_manager = UploadManager(external_state=state['documentos'])
+
+    success, message = await up_manager.carregar_url(request.url, request.nome)
+    if not success:
+        raise HTTPException(status_code=502, detail=message)
+
+    def tarefa(progress_callback):
+        rag_stats, rag_error = _indexar_sessao(state, progress_callback)
+        return {
+            "success": True,
+            "message": message,
+            "total_docs": len(state['documentos']),
+            "rag_stats": rag_stats,
+            "rag_error": rag_error
+        }
+
+    try:
+        job = INDEXING_QUEUE.submit(request.session_id, tarefa, descricao=request.url)
+    except FilaCheiaError as e:
+        _recusar(e)
+
+    return {
+        "success": True,
+        "job_id": job.id,
+        "status": job.status,
+        "message": message,
+        "total_docs": len(state['documentos'])
     }
 
+@app.get("/api/v1/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = INDEXING_QUEUE.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job não encontrado.")
+    return job.snapshot()
+
+@app.get("/api/v1/jobs/{job_id}/stream")
+async def stream_job(job_id: str):
+    """Progresso do job em NDJSON (uma linha por atualização) até a conclusão."""
+    if not INDEXING_QUEUE.get(job_id):
+        raise HTTPException(status_code=404, detail="Job não encontrado.")
+
+    async def eventos():
+        async for snapshot in INDEXING_QUEUE.acompanhar(job_id):
+            yield json.dumps(snapshot, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(eventos(), media_type="application/x-ndjson")
+
+async def _preparar_chat(state: dict, mm: ModelManager) -> Optional[EventoChat]:
+    """Garante o LLM da sessão; retorna um evento de erro se o chat ainda não pode responder."""
+    if state.get('llm'):
+        return None
+    # LLM não está pronto. Tenta re-inicializar se houver documentos no estado.
+    if not state['documentos']:
+        return EventoChat(ERROR, {"codigo": "SEM_DOCUMENTOS"},
+                          "⚠️ Nenhum documento carregado ainda. Por favor, faça o upload de documentos primeiro.")
+    try:
+        # Reconstrói o índice em thread: embeddings e Chroma são bloqueantes
+        await asyncio.to_thread(mm.criar_chain_rag, state['documentos'])
+    except Exception as e:
+        print(f"[API] Erro ao criar chain RAG sob demanda: {e}")
+        return EventoChat(ERROR, {"codigo": "DOCUMENTOS_PROCESSANDO"},
+                          "⏳ Os documentos ainda estão sendo processados. Aguarde a conclusão do carregamento e tente novamente.")
+    return None
+
+async def _responder(session_id: str, mm: ModelManager, mensagem: str, permissao: Permissao):
+    """Eventos da resposta; ao final grava a resposta (como texto) no histórico e salva a sessão."""
+    try:
+        mm.adicionar_mensagem("human", mensagem)
+        partes = []
+        async for evento in mm.aeventos_resposta(mensagem):
+            partes.append(evento.texto)
+            yield evento
+        mm.adicionar_mensagem("ai", "".join(partes))
+        await asyncio.to_thread(SESSION_STORE.salvar, session_id)
+    finally:
+        permissao.liberar()
+
+async def _admitir_chat(session_id: str) -> Permissao:
+    """Vaga no escalonador de LLM (justo entre sessões) ou HTTP 429 com Retry-After."""
+    try:
+        return await ESCALONADOR_LLM.adquirir(session_id)
+    except AdmissaoNegadaError as e:
+        _recusar(e)
+
 @app.post("/api/v1/chat")
 async def chat(request: ChatRequest):
     state = get_session(request.session_id)
-    mm = ModelManager(session_state=state)
+    mm = ModelManager.da_sessao(state)
+    permissao = await _admitir_chat(request.session_id)
     
-    if not state.get('llm'):
-        # LLM não está pronto. Tenta re-inicializar se houver documentos no estado.
-        if state['documentos']:
-            try:
-                mm.criar_chain_rag(state['documentos'])
-            except Exception as e:
-                print(f"[API] Erro ao criar chain RAG sob demanda: {e}")
-                return StreamingResponse(
-                    iter(["⏳ Os documentos ainda estão sendo processados. Aguarde a conclusão do carregamento e tente novamente."]),
-                    media_type="text/plain"
-                )
-        else:
-            return StreamingResponse(
-                iter(["⚠️ Nenhum documento carregado ainda. Por favor, faça o upload de documentos primeiro."]),
-                media_type="text/plain"
-            )
+    erro = await _preparar_chat(state, mm)
+    if erro:
+        permissao.liberar()
+        return StreamingResponse(iter([erro.texto]), media_type="text/plain")
 
-    mm.adicionar_mensagem("human", request.message)
-
-    def stream_response():
-        full_reply = ""
+    async def stream_response():
         try:
-            for chunk in mm.gerar_resposta_rag(request.message):
-                full_reply += chunk
+            async for chunk in textos(_responder(request.session_id, mm, request.message, permissao)):
                 yield chunk
-            mm.adicionar_mensagem("ai", full_reply)
         except Exception as e:
             error_msg = f"\n\n⚠️ Ocorreu um erro durante a geração da resposta: {str(e)}"
             print(f"[API] Erro no stream: {e}")
             yield error_msg
 
+    # A vaga também é devolvida se o stream nem chegar a começar (cliente desconectou)
     return StreamingResponse(
         stream_response(), 
-        media_type="text/plain"
+        media_type="text/plain",
+        background=BackgroundTask(permissao.liberar)
+    )
+
+@app.post("/api/v1/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """
+    Chat via Server-Sent Events com eventos tipados: token (coalescidos por tamanho
+    ou intervalo), agent_changed, retrieval_done, section_pending, doc_link, status,
+    error e done; heartbeats em períodos ociosos.
+    """
+    state = get_session(request.session_id)
+    mm = ModelManager.da_sessao(state)
+    permissao = await _admitir_chat(request.session_id)
+
+    erro = await _preparar_chat(state, mm)
+    if erro:
+        permissao.liberar()
+        async def so_o_erro():
+            yield erro
+        eventos = so_o_erro()
+    else:
+        eventos = _responder(request.session_id, mm, request.message, permissao)
+
+    return StreamingResponse(
+        stream_sse(
+            eventos,
+            max_chars=STREAM_CONFIG.max_chars_token,
+            intervalo_flush=STREAM_CONFIG.intervalo_flush_segundos,
+            heartbeat=STREAM_CONFIG.heartbeat_segundos,
+        ),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(permissao.liberar)
     )
 
 @app.get("/api/v1/auth/google/url")
 async def get_google_auth_url(session_id: str):
     state_obj = get_session(session_id)
-    mm = ModelManager(session_state=state_obj)
+    mm = ModelManager.da_sessao(state_obj)
     if not mm.auth_manager:
         raise HTTPException(status_code=400, detail="Google Docs não configurado (credentials.json ausente).")
     
@@ -191,7 +579,7 @@ async def google_auth_callback(code: str, state: Optional[str] = None, session_i
         raise HTTPException(status_code=400, detail="session_id ou state ausente.")
     
     session_state = get_session(target_session_id)
-    mm = ModelManager(session_state=session_state)
+    mm = ModelManager.da_sessao(session_state)
     if not mm.auth_manager:
         raise HTTPException(status_code=400, detail="Google Docs não configurado.")
     
@@ -200,7 +588,7 @@ async def google_auth_callback(code: str, state: Optional[str] = None, session_i
         mm.auth_manager.save_credentials_from_code(code, redirect_uri=redirect_uri)
         
         # Opcional: reiniciar clientes que possam estar em cache no ModelManager
-        mm._init_google_docs()
+        mm.recarregar_google_docs()
         
         return {
             "success": True, 
@@ -211,10 +599,11 @@ async def google_auth_callback(code: str, state: Optional[str] = None, session_i
 
 @app.post("/api/v1/clear")
 async def clear_session(session_id: str):
-    if session_id in sessions:
-        state = sessions[session_id]
-        mm = ModelManager(session_state=state)
+    state = SESSION_STORE.get(session_id)
+    if state is not None:
+        mm = ModelManager.da_sessao(state)
         mm.reset_completo()
+        SESSION_STORE.salvar(session_id)
         return {"success": True}
     return {"success": False, "detail": "Sessão não encontrada"}
 
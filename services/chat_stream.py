@@ -0,0 +1,132 @@
+# services/chat_stream.py
+"""Eventos tipados do chat e sua entrega como Server-Sent Events, com coalescência de tokens."""
+
+import json
+import time
+import asyncio
+import traceback
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+
+# Tipos de evento
+TOKEN = "token"
+AGENT_CHANGED = "agent_changed"
+RETRIEVAL_DONE = "retrieval_done"
+SECTION_PENDING = "section_pending"
+DOC_LINK = "doc_link"
+STATUS = "status"
+ERROR = "error"
+DONE = "done"
+
+HEARTBEAT = ": ping\n\n"
+
+MENSAGEM_ERRO_INTERNO = "Ocorreu um erro durante a geração da resposta."
+MENSAGEM_ERRO_LLM = "Erro na comunicação com a IA."
+
+
+@dataclass
+class EventoChat:
+    """
+    Evento emitido pelo pipeline do chat.
+
+    `dados` é o payload estruturado enviado no SSE; `texto` é como o evento aparece
+    no stream em texto puro (/api/v1/chat) — vazio para eventos só de estado.
+    """
+    tipo: str
+    dados: Dict[str, Any] = field(default_factory=dict)
+    texto: str = ""
+
+    @classmethod
+    def token(cls, texto: str) -> "EventoChat":
+        return cls(TOKEN, {"texto": texto}, texto)
+
+
+def formatar_sse(evento: EventoChat) -> str:
+    return f"event: {evento.tipo}\ndata: {json.dumps(evento.dados, ensure_ascii=False)}\n\n"
+
+
+async def textos(eventos: AsyncIterator[EventoChat]) -> AsyncIterator[str]:
+    """Projeção em texto puro do stream de eventos."""
+    async for evento in eventos:
+        if evento.texto:
+            yield evento.texto
+
+
+_FIM = object()
+
+
+async def stream_sse(
+    eventos: AsyncIterator[EventoChat],
+    max_chars: int = 128,
+    intervalo_flush: float = 0.05,
+    heartbeat: float = 15.0,
+) -> AsyncIterator[str]:
+    """
+    Converte eventos em frames SSE.
+
+    Tokens consecutivos são acumulados e enviados num único evento `token` quando
+    somam `max_chars` caracteres ou quando o mais antigo espera `intervalo_flush`
+    segundos. Qualquer outro evento descarrega o acumulado antes, preservando a
+    ordem. Sem eventos por `heartbeat` segundos, envia um comentário SSE para
+    manter a conexão viva. O stream termina com um evento `done`.
+    """
+    fila: asyncio.Queue = asyncio.Queue()
+
+    async def produzir():
+        try:
+            async for evento in eventos:
+                await fila.put(evento)
+        except Exception as e:
+            # O detalhe (caminhos, erros do Chroma/da API) fica só no log do servidor
+            print(f"[SSE] Erro no pipeline do chat: {e}")
+            traceback.print_exc()
+            await fila.put(EventoChat(ERROR, {"codigo": "ERRO_INTERNO", "mensagem": MENSAGEM_ERRO_INTERNO}))
+        finally:
+            await fila.put(_FIM)
+
+    produtor = asyncio.create_task(produzir())
+    pendentes: List[str] = []
+    n_pendentes = 0
+    prazo: Optional[float] = None
+    total_chars = 0
+
+    def descarregar() -> str:
+        nonlocal pendentes, n_pendentes, prazo
+        frame = formatar_sse(EventoChat.token("".join(pendentes)))
+        pendentes, n_pendentes, prazo = [], 0, None
+        return frame
+
+    try:
+        while True:
+            espera = heartbeat if prazo is None else max(0.0, prazo - time.monotonic())
+            try:
+                evento = await asyncio.wait_for(fila.get(), timeout=espera)
+            except asyncio.TimeoutError:
+                yield descarregar() if pendentes else HEARTBEAT
+                continue
+
+            if evento is _FIM:
+                if pendentes:
+                    yield descarregar()
+                yield formatar_sse(EventoChat(DONE, {"chars": total_chars}))
+                return
+
+            if evento.tipo == TOKEN:
+                texto = evento.dados.get("texto", "")
+                if not texto:
+                    continue
+                pendentes.append(texto)
+                n_pendentes += len(texto)
+                total_chars += len(texto)
+                if prazo is None:
+                    prazo = time.monotonic() + intervalo_flush
+                if n_pendentes >= max_chars:
+                    yield descarregar()
+                continue
+
+            if pendentes:
+                yield descarregar()
+            yield formatar_sse(evento)
+    finally:
+        produtor.cancel()
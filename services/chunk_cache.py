@@ -0,0 +1,148 @@
+# services/chunk_cache.py
+"""Cache persistente de chunks por (hash do documento, configuração de chunking)."""
+
+import os
+import json
+import hashlib
+import tempfile
+import threading
+from typing import Dict, Iterable, List, Optional
+
+from services.text_processor import TextProcessor, TextChunk, ChunkConfig, ValidacaoConteudo
+from services.retrieval_cache import LRUCache
+
+
+DEFAULT_CHUNKS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '.tmp', 'chunks'))
+
+# Incrementar quando a limpeza/validação do TextProcessor ou o formato da entrada mudar
+VERSAO_PROCESSAMENTO = 2
+
+
+class ChunkCache:
+    """
+    Guarda o resultado de validar + chunkar cada documento.
+
+    A entrada não depende do nome do arquivo (o mesmo conteúdo pode chegar
+    com nomes diferentes): o nome é associado aos chunks na leitura.
+    Formato da entrada:
+        {"valido": bool, "mensagem": str, "total_chars": int, "chunks": [str, ...], "tokens": [int, ...]}
+    """
+
+    def __init__(self, config: ChunkConfig, base_dir: str = None, memoria_max: int = 64):
+        self.config = config
+        self.dir = os.path.join(base_dir or DEFAULT_CHUNKS_DIR, self.chave_config(config))
+        self._memoria = LRUCache(memoria_max)
+        os.makedirs(self.dir, exist_ok=True)
+
+    @staticmethod
+    def chave_config(config: ChunkConfig) -> str:
+        """Identificador estável da configuração de chunking."""
+        assinatura = json.dumps(
+            [VERSAO_PROCESSAMENTO, config.chunk_size, config.chunk_overlap, config.separators],
+            ensure_ascii=False
+        )
+        return f"{config.chunk_size}_{config.chunk_overlap}_{hashlib.sha1(assinatura.encode('utf-8')).hexdigest()[:10]}"
+
+    def _caminho(self, doc_hash: str) -> str:
+        return os.path.join(self.dir, f"{doc_hash}.json")
+
+    def get(self, doc_hash: str) -> Optional[dict]:
+        """Retorna a entrada do documento (memória, depois disco) ou None."""
+        if not doc_hash:
+            return None
+        entrada = self._memoria.get(doc_hash)
+        if entrada is not None:
+            return entrada
+        caminho = self._caminho(doc_hash)
+        if not os.path.exists(caminho):
+            return None
+        try:
+            with open(caminho, 'r', encoding='utf-8') as f:
+                entrada = json.load(f)
+        except (OSError, ValueError):
+            return None
+        self._memoria.put(doc_hash, entrada)
+        return entrada
+
+    def processar(self, doc_hash: str, conteudo: str, text_processor: TextProcessor) -> dict:
+        """Valida e chunka o conteúdo, persistindo o resultado."""
+        is_valid, msg = text_processor.validar_conteudo_extraido(conteudo)
+        chunks = text_processor.criar_chunks(conteudo, "") if is_valid else []
+        return self._salvar(doc_hash, is_valid, msg, chunks)
+
+    def processar_csv(self, doc_hash: str, linhas: Iterable[str], text_processor: TextProcessor) -> dict:
+        """
+        Chunka um CSV por registros (linhas lidas sob demanda). Cada chunk vai para
+        o arquivo do cache assim que o gerador o emite, sem acumular a lista, e o
+        conteúdo passa pela mesma validação de `processar`.
+        """
+        validacao = ValidacaoConteudo(text_processor)
+        tokens: List[int] = []
+        total_chars = 0
+        fd, tmp_path = tempfile.mkstemp(suffix=".tmp", dir=self.dir)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write('{"chunks": [')
+                for chunk in text_processor.criar_chunks_csv(linhas, ""):
+                    if tokens:
+                        f.write(', ')
+                    json.dump(chunk.conteudo, f, ensure_ascii=False)
+                    tokens.append(chunk.tokens)
+                    total_chars += chunk.total_chars
+                    validacao.adicionar(chunk.conteudo)
+                is_valid, msg = validacao.resultado() if tokens else (False, "CSV sem registros.")
+                f.write(f'], "tokens": {json.dumps(tokens)}, "total_chars": {total_chars}, '
+                        f'"valido": {json.dumps(is_valid)}, "mensagem": {json.dumps(msg, ensure_ascii=False)}}}')
+            if not is_valid:
+                return self._salvar(doc_hash, False, msg, [])
+            if not doc_hash:
+                with open(tmp_path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            os.replace(tmp_path, self._caminho(doc_hash))
+        finally:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+        return self.get(doc_hash)
+
+    def _salvar(self, doc_hash: str, is_valid: bool, msg: str, chunks: List[TextChunk]) -> dict:
+        entrada = {
+            "valido": is_valid,
+            "mensagem": msg,
+            "total_chars": sum(c.total_chars for c in chunks),
+            "chunks": [c.conteudo for c in chunks],
+            "tokens": [c.tokens for c in chunks],
+        }
+        if doc_hash:
+            self._memoria.put(doc_hash, entrada)
+            caminho = self._caminho(doc_hash)
+            tmp_path = f"{caminho}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(entrada, f, ensure_ascii=False)
+            os.replace(tmp_path, caminho)
+        return entrada
+
+    @staticmethod
+    def chunks_para(entrada: dict, nome: str) -> List[TextChunk]:
+        """Materializa os TextChunks da entrada para o documento `nome`."""
+        tokens = entrada.get("tokens") or [0] * len(entrada["chunks"])
+        return [
+            TextChunk(conteudo=texto, indice=i, documento_origem=nome, total_chars=len(texto), tokens=n)
+            for i, (texto, n) in enumerate(zip(entrada["chunks"], tokens))
+        ]
+
+    def limpar(self) -> None:
+        """Descarta a camada em memória (os arquivos em disco permanecem)."""
+        self._memoria.limpar()
+
+
+_caches: Dict[str, ChunkCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_chunk_cache(config: ChunkConfig) -> ChunkCache:
+    """Cache de chunks compartilhado pelo processo para a configuração dada."""
+    chave = ChunkCache.chave_config(config)
+    with _caches_lock:
+        if chave not in _caches:
+            _caches[chave] = ChunkCache(config)
+        return _caches[chave]
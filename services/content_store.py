@@ -0,0 +1,171 @@
+# services/content_store.py
+"""Armazém endereçado por conteúdo dos textos extraídos, comprimido em blocos independentes."""
+
+import os
+import json
+import mmap
+import zlib
+import bisect
+import struct
+import hashlib
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional
+
+
+DEFAULT_CONTENT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '.tmp', 'content'))
+
+EXTENSAO = ".blk"
+MAGIC = b"TXZ1"
+RODAPE = struct.Struct(">Q4s")  # tamanho do índice + magic
+BLOCO_CHARS = 64 * 1024
+NIVEL_ZLIB = 6
+
+
+class TextoComprimido:
+    """
+    Leitor de um arquivo do armazém.
+
+    Layout: MAGIC | bloco zlib 0 | bloco zlib 1 | ... | índice JSON | rodapé.
+    O índice guarda (offset, tamanho, primeiro caractere) de cada bloco; cada
+    bloco é um frame zlib próprio, então uma leitura por intervalo descomprime
+    apenas os blocos que o cobrem. O arquivo é lido via mmap.
+    """
+
+    def __init__(self, caminho: str):
+        self.caminho = caminho
+        with open(caminho, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            tamanho_indice, magic = RODAPE.unpack(mm[-RODAPE.size:])
+            if mm[:len(MAGIC)] != MAGIC or magic != MAGIC:
+                raise ValueError(f"Arquivo de conteúdo inválido: {caminho}")
+            fim_indice = len(mm) - RODAPE.size
+            indice = json.loads(mm[fim_indice - tamanho_indice:fim_indice])
+        self.total_chars: int = indice["total_chars"]
+        self._blocos: List[list] = indice["blocos"]  # [offset, tamanho, char_inicio]
+        self._inicios = [b[2] for b in self._blocos]
+
+    def _descomprimir(self, mm, i: int) -> str:
+        offset, tamanho, _ = self._blocos[i]
+        return zlib.decompress(mm[offset:offset + tamanho]).decode('utf-8')
+
+    def iter_blocos(self, inicio: int = 0, fim: Optional[int] = None) -> Iterator[str]:
+        """Texto em [inicio, fim) emitido bloco a bloco (um bloco descomprimido por vez)."""
+        fim = self.total_chars if fim is None else min(fim, self.total_chars)
+        if inicio >= fim:
+            return
+        primeiro = bisect.bisect_right(self._inicios, inicio) - 1
+        with open(self.caminho, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for i in range(primeiro, len(self._blocos)):
+                base = self._inicios[i]
+                if base >= fim:
+                    break
+                yield self._descomprimir(mm, i)[max(0, inicio - base):fim - base]
+
+    def ler(self) -> str:
+        return ''.join(self.iter_blocos())
+
+    def ler_intervalo(self, inicio: int, fim: int) -> str:
+        """Caracteres [inicio, fim) do texto, descomprimindo só os blocos necessários."""
+        return ''.join(self.iter_blocos(inicio, fim))
+
+    def linhas(self) -> Iterator[str]:
+        """Linhas do texto (com o '\\n'), em streaming: serve de entrada para csv.reader."""
+        resto = ''
+        for bloco in self.iter_blocos():
+            partes = (resto + bloco).split('\n')
+            resto = partes.pop()
+            for parte in partes:
+                yield parte + '\n'
+        if resto:
+            yield resto
+
+
+class ContentStore:
+    """
+    Textos extraídos endereçados pelo MD5 do conteúdo (o mesmo `hash` dos
+    documentos), em `<dir>/<hash>.blk`. A gravação aceita o texto em partes,
+    comprime blocos à medida que enchem e publica o arquivo atomicamente.
+    """
+
+    def __init__(self, base_dir: str = None, bloco_chars: int = BLOCO_CHARS):
+        self.dir = base_dir or DEFAULT_CONTENT_DIR
+        self.bloco_chars = bloco_chars
+        os.makedirs(self.dir, exist_ok=True)
+
+    def caminho(self, content_hash: str) -> str:
+        return os.path.join(self.dir, f"{content_hash}{EXTENSAO}")
+
+    def existe(self, content_hash: str) -> bool:
+        return os.path.exists(self.caminho(content_hash))
+
+    def gravar(self, partes: Iterable[str]) -> str:
+        """Grava o texto (string ou iterável de partes) e retorna o hash do conteúdo."""
+        if isinstance(partes, str):
+            partes = [partes]
+        md5 = hashlib.md5()
+        tmp_path = os.path.join(self.dir, f".gravando.{os.getpid()}.{threading.get_ident()}")
+        blocos, total_chars = [], 0
+        pendentes: List[str] = []
+        n_pendentes = 0
+
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(MAGIC)
+
+                def descarregar(texto: str):
+                    nonlocal total_chars
+                    dados = zlib.compress(texto.encode('utf-8'), NIVEL_ZLIB)
+                    blocos.append([f.tell(), len(dados), total_chars])
+                    f.write(dados)
+                    total_chars += len(texto)
+
+                for parte in partes:
+                    md5.update(parte.encode('utf-8'))
+                    pendentes.append(parte)
+                    n_pendentes += len(parte)
+                    if n_pendentes >= self.bloco_chars:
+                        texto = ''.join(pendentes)
+                        i = 0
+                        while len(texto) - i >= self.bloco_chars:
+                            descarregar(texto[i:i + self.bloco_chars])
+                            i += self.bloco_chars
+                        pendentes = [texto[i:]]
+                        n_pendentes = len(texto) - i
+                if n_pendentes or not blocos:
+                    descarregar(''.join(pendentes))
+
+                indice = json.dumps({"total_chars": total_chars, "blocos": blocos}).encode('utf-8')
+                f.write(indice)
+                f.write(RODAPE.pack(len(indice), MAGIC))
+
+            content_hash = md5.hexdigest()
+            destino = self.caminho(content_hash)
+            if os.path.exists(destino):
+                os.unlink(tmp_path)
+            else:
+                os.replace(tmp_path, destino)
+            return content_hash
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def abrir(self, content_hash: str) -> TextoComprimido:
+        return TextoComprimido(self.caminho(content_hash))
+
+    def remover(self, content_hash: str) -> None:
+        caminho = self.caminho(content_hash)
+        if os.path.exists(caminho):
+            os.unlink(caminho)
+
+
+_stores: Dict[str, ContentStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_content_store(base_dir: str = None) -> ContentStore:
+    """Armazém compartilhado pelo processo para o diretório dado."""
+    chave = base_dir or DEFAULT_CONTENT_DIR
+    with _stores_lock:
+        if chave not in _stores:
+            _stores[chave] = ContentStore(chave)
+        return _stores[chave]
@@ -0,0 +1,106 @@
+# services/context_packer.py
+"""Montagem do contexto do prompt dentro de um orçamento de tokens."""
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from services.text_processor import contar_tokens
+
+
+# Sobreposições menores que isso não são tratadas como texto repetido
+MIN_SOBREPOSICAO = 20
+
+
+@dataclass
+class Trecho:
+    """Bloco contínuo de um documento (um ou mais chunks adjacentes fundidos)."""
+    source: str
+    conteudo: str
+    tokens: int
+    rank: int                      # Melhor posição entre os chunks que o compõem
+    indices: List[int] = field(default_factory=list)
+
+
+def sobreposicao(anterior: str, seguinte: str, max_chars: int) -> int:
+    """Tamanho do maior sufixo de `anterior` que é prefixo de `seguinte` (até max_chars)."""
+    if not anterior or not seguinte:
+        return 0
+    inicio = max(0, len(anterior) - max_chars)
+    pos = anterior.find(seguinte[0], inicio)
+    while pos != -1:
+        if seguinte.startswith(anterior[pos:]):
+            return len(anterior) - pos
+        pos = anterior.find(seguinte[0], pos + 1)
+    return 0
+
+
+def _tokens_do(doc) -> int:
+    """Contagem gravada na indexação; documentos sem ela (ex.: BM25) são contados aqui."""
+    return doc.metadata.get('tokens') or contar_tokens(doc.page_content)
+
+
+def fundir_trechos(docs: List, max_sobreposicao: int) -> List[Trecho]:
+    """
+    Agrupa os chunks por documento, remove duplicatas e funde os que são
+    adjacentes por chunk_index, descartando o texto repetido pelo overlap.
+    Retorna os trechos ordenados pela melhor posição no ranking original.
+    """
+    vistos = set()
+    por_documento: Dict[Tuple, List[Tuple[int, int, object]]] = {}
+    for rank, doc in enumerate(docs):
+        meta = doc.metadata
+        chave = (meta.get('source'), meta.get('hash'), meta.get('chunk_index'))
+        if chave in vistos or (chave[2] is None and doc.page_content in vistos):
+            continue
+        vistos.add(chave)
+        vistos.add(doc.page_content)
+        indice = meta.get('chunk_index')
+        por_documento.setdefault(chave[:2], []).append((indice if indice is not None else -1, rank, doc))
+
+    trechos: List[Trecho] = []
+    for (source, _), itens in por_documento.items():
+        itens.sort(key=lambda t: t[0])
+        atual: Optional[Trecho] = None
+        for indice, rank, doc in itens:
+            tokens = _tokens_do(doc)
+            if atual is not None and indice >= 0 and indice == atual.indices[-1] + 1:
+                repetido = sobreposicao(atual.conteudo, doc.page_content, max_sobreposicao)
+                if repetido >= MIN_SOBREPOSICAO:
+                    atual.conteudo += doc.page_content[repetido:]
+                    atual.tokens += tokens - contar_tokens(doc.page_content[:repetido])
+                else:
+                    atual.conteudo += "\n" + doc.page_content
+                    atual.tokens += tokens
+                atual.rank = min(atual.rank, rank)
+                atual.indices.append(indice)
+                continue
+            atual = Trecho(source=source or 'Desconhecido', conteudo=doc.page_content, tokens=tokens, rank=rank, indices=[indice])
+            trechos.append(atual)
+
+    trechos.sort(key=lambda t: t.rank)
+    return trechos
+
+
+def empacotar_contexto(docs: List, max_tokens: int, max_sobreposicao: int = 1000) -> List[Trecho]:
+    """
+    Seleciona os trechos mais bem ranqueados que cabem em `max_tokens`.
+    Trechos que não cabem são pulados (um menor, mais abaixo, ainda pode caber);
+    se nem o primeiro couber, ele é truncado para o contexto não ficar vazio.
+    """
+    trechos = fundir_trechos(docs, max_sobreposicao)
+    if not max_tokens or max_tokens <= 0:
+        return trechos
+
+    selecionados, usados = [], 0
+    for trecho in trechos:
+        if usados + trecho.tokens <= max_tokens:
+            selecionados.append(trecho)
+            usados += trecho.tokens
+
+    if not selecionados and trechos:
+        primeiro = trechos[0]
+        proporcao = max_tokens / max(primeiro.tokens, 1)
+        primeiro.conteudo = primeiro.conteudo[:int(len(primeiro.conteudo) * proporcao)]
+        primeiro.tokens = contar_tokens(primeiro.conteudo)
+        selecionados.append(primeiro)
+    return selecionados
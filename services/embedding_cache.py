@@ -0,0 +1,287 @@
+# services/embedding_cache.py
+"""Cache persistente de embeddings endereçado pelo hash do conteúdo do chunk."""
+
+import os
+import json
+import time
+import shutil
+import hashlib
+import threading
+from typing import Dict, List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+
+DEFAULT_CACHE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '.tmp', 'embedding_cache'))
+
+
+def hash_texto(texto: str) -> str:
+    """Hash estável usado como chave do chunk no cache."""
+    return hashlib.sha256(texto.encode('utf-8')).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Armazena embeddings em disco de forma compacta.
+
+    Layout de um namespace (modelo + configuração de chunking):
+        vectors.bin  -> matriz float16/float32 append-only (lida via memmap)
+        index.tsv    -> linhas "<hash>\\t<linha>" apontando para a matriz
+        meta.json    -> dimensão e dtype dos vetores
+
+    Os vetores são gravados (e sincronizados) antes do índice. Depois de uma
+    queda, a carga descarta a linha parcial no fim de vectors.bin e a última
+    linha do índice sem '\\n'; gravações seguintes partem sempre de uma linha
+    inteira da matriz, então nenhuma entrada aponta para o vetor errado.
+    """
+
+    def __init__(self, namespace: str, base_dir: str = None, dtype: str = "float16"):
+        self.namespace = namespace
+        self.dir = os.path.join(base_dir or DEFAULT_CACHE_DIR, namespace)
+        self.dtype = dtype
+        self.dim: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+
+        self._vectors_path = os.path.join(self.dir, 'vectors.bin')
+        self._index_path = os.path.join(self.dir, 'index.tsv')
+        self._meta_path = os.path.join(self.dir, 'meta.json')
+        self._index: Dict[str, int] = {}
+        self._mmap = None
+        self._lock = threading.Lock()
+
+        os.makedirs(self.dir, exist_ok=True)
+        self._carregar()
+
+    @staticmethod
+    def namespace_para(model_name: str, chunk_size: int, chunk_overlap: int) -> str:
+        """Deriva o namespace a partir do modelo e da configuração de chunking."""
+        chave = f"{model_name}|{chunk_size}|{chunk_overlap}"
+        slug = model_name.replace('/', '_')
+        return f"{slug}_{hashlib.sha1(chave.encode('utf-8')).hexdigest()[:12]}"
+
+    def _carregar(self):
+        """Lê meta e índice do disco, descartando linhas sem vetor gravado."""
+        if not os.path.exists(self._meta_path):
+            return
+        with open(self._meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        self.dim = meta['dim']
+        self.dtype = meta.get('dtype', self.dtype)
+
+        linhas_validas = self._alinhar_vetores()
+        if os.path.exists(self._index_path):
+            with open(self._index_path, 'rb') as f:
+                conteudo = f.read()
+            completo = conteudo[:conteudo.rfind(b'\n') + 1]
+            if len(completo) != len(conteudo):
+                # Última linha sem '\n' (queda durante a escrita): pode estar truncada ("h\t1" de "h\t12")
+                with open(self._index_path, 'r+b') as f:
+                    f.truncate(len(completo))
+            for linha in completo.decode('utf-8', errors='replace').splitlines():
+                partes = linha.split('\t')
+                if len(partes) != 2 or not partes[1].isdigit():
+                    continue
+                row = int(partes[1])
+                if row < linhas_validas:
+                    self._index[partes[0]] = row
+
+    def _linhas_gravadas(self) -> int:
+        import numpy as np
+        if not self.dim or not os.path.exists(self._vectors_path):
+            return 0
+        itemsize = np.dtype(self.dtype).itemsize
+        return os.path.getsize(self._vectors_path) // (self.dim * itemsize)
+
+    def _alinhar_vetores(self) -> int:
+        """Trunca vectors.bin na última linha inteira (remove a parcial de uma queda); retorna as linhas."""
+        import numpy as np
+        if not self.dim or not os.path.exists(self._vectors_path):
+            return 0
+        tamanho_linha = self.dim * np.dtype(self.dtype).itemsize
+        tamanho = os.path.getsize(self._vectors_path)
+        if tamanho % tamanho_linha:
+            with open(self._vectors_path, 'r+b') as f:
+                f.truncate(tamanho - tamanho % tamanho_linha)
+        return tamanho // tamanho_linha
+
+    def arredondar(self, vetores: List[List[float]]) -> List[List[float]]:
+        """Vetores com a precisão do armazenamento: iguais aos que um acerto do cache retornaria."""
+        import numpy as np
+        return np.asarray(vetores, dtype=self.dtype).astype('float32').tolist()
+
+    def _matriz(self):
+        """Matriz memory-mapped (somente leitura) com todos os vetores."""
+        import numpy as np
+        if self._mmap is None:
+            n = self._linhas_gravadas()
+            if n == 0:
+                return None
+            self._mmap = np.memmap(self._vectors_path, dtype=self.dtype, mode='r', shape=(n, self.dim))
+        return self._mmap
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, chave: str) -> bool:
+        return chave in self._index
+
+    def get_many(self, chaves: List[str]) -> Dict[str, List[float]]:
+        """Retorna os vetores encontrados para as chaves (ausentes são omitidas)."""
+        encontrados = {}
+        with self._lock:
+            matriz = self._matriz()
+            for chave in chaves:
+                row = self._index.get(chave)
+                if row is None or matriz is None:
+                    self.misses += 1
+                    continue
+                self.hits += 1
+                encontrados[chave] = matriz[row].astype('float32').tolist()
+        return encontrados
+
+    def put_many(self, chaves: List[str], vetores: List[List[float]]) -> None:
+        """Anexa novos vetores ao cache (chaves já presentes são ignoradas)."""
+        import numpy as np
+        if not chaves:
+            return
+        with self._lock:
+            novos = [(c, v) for c, v in zip(chaves, vetores) if c not in self._index]
+            if not novos:
+                return
+            matriz = np.asarray([v for _, v in novos], dtype=self.dtype)
+            if self.dim is None:
+                self.dim = int(matriz.shape[1])
+                with open(self._meta_path, 'w', encoding='utf-8') as f:
+                    json.dump({'dim': self.dim, 'dtype': self.dtype}, f)
+            elif matriz.shape[1] != self.dim:
+                raise ValueError(f"Dimensão incompatível com o cache ({matriz.shape[1]} != {self.dim}).")
+
+            inicio = self._alinhar_vetores()
+            with open(self._vectors_path, 'ab') as f:
+                matriz.tofile(f)
+                f.flush()
+                os.fsync(f.fileno())
+            with open(self._index_path, 'a', encoding='utf-8') as f:
+                f.write(''.join(f"{chave}\t{inicio + i}\n" for i, (chave, _) in enumerate(novos)))
+                f.flush()
+                os.fsync(f.fileno())
+            for i, (chave, _) in enumerate(novos):
+                self._index[chave] = inicio + i
+            # Força reabertura do memmap com o novo tamanho
+            self._mmap = None
+
+    def tamanho_bytes(self) -> int:
+        return sum(os.path.getsize(p) for p in (self._vectors_path, self._index_path) if os.path.exists(p))
+
+    def limpar(self) -> None:
+        """Esvazia o namespace (matriz append-only: não há remoção de entradas isoladas)."""
+        with self._lock:
+            self._mmap = None
+            self._index = {}
+            self.dim = None
+            for caminho in (self._index_path, self._vectors_path, self._meta_path):
+                if os.path.exists(caminho):
+                    os.remove(caminho)
+
+    def get_stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entradas": len(self._index),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Envolve um modelo de embeddings consultando caches antes da inferência.
+
+    - Documentos: EmbeddingCache em disco (apenas textos ausentes vão ao modelo).
+    - Consultas: LRU em memória, já que os mesmos títulos de seção são
+      buscados repetidamente durante a redação.
+    """
+
+    def __init__(self, base: Embeddings, cache: Optional[EmbeddingCache] = None, query_cache=None):
+        self.base = base
+        self.cache = cache
+        self.query_cache = query_cache
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if self.cache is None:
+            return self.base.embed_documents(texts)
+
+        chaves = [hash_texto(t) for t in texts]
+        encontrados = self.cache.get_many(chaves)
+
+        faltantes = {}
+        for chave, texto in zip(chaves, texts):
+            if chave not in encontrados and chave not in faltantes:
+                faltantes[chave] = texto
+
+        if faltantes:
+            # Arredondados à precisão do cache: acerto e falta retornam o mesmo vetor
+            vetores = self.cache.arredondar(self.base.embed_documents(list(faltantes.values())))
+            novos = dict(zip(faltantes.keys(), vetores))
+            self.cache.put_many(list(novos.keys()), list(novos.values()))
+            encontrados.update(novos)
+
+        return [list(encontrados[c]) for c in chaves]
+
+    def embed_query(self, text: str) -> List[float]:
+        if self.query_cache is None:
+            return self.base.embed_query(text)
+
+        vetor = self.query_cache.get(text)
+        if vetor is None:
+            vetor = self.base.embed_query(text)
+            self.query_cache.put(text, vetor)
+        return list(vetor)
+
+
+_caches: Dict[str, EmbeddingCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_embedding_cache(namespace: str, dtype: str = "float16") -> EmbeddingCache:
+    """Retorna o cache compartilhado do processo para o namespace."""
+    with _caches_lock:
+        if namespace not in _caches:
+            _caches[namespace] = EmbeddingCache(namespace, dtype=dtype)
+        return _caches[namespace]
+
+
+def limitar_embedding_cache(max_bytes: int, max_idade_segundos: float, base_dir: str = None) -> int:
+    """
+    Limpeza do janitor: apaga namespaces fechados sem gravação há mais de
+    `max_idade_segundos` (modelo ou chunking antigos) e zera os que passam de
+    `max_bytes`. Retorna quantos namespaces foram apagados ou zerados.
+    """
+    base = base_dir or DEFAULT_CACHE_DIR
+    if not os.path.isdir(base):
+        return 0
+    limite = time.time() - max_idade_segundos
+    with _caches_lock:
+        abertos = {os.path.abspath(c.dir): c for c in _caches.values()}
+    limpos = 0
+    with os.scandir(base) as entradas:
+        for entrada in entradas:
+            if not entrada.is_dir(follow_symlinks=False):
+                continue
+            try:
+                aberto = abertos.get(os.path.abspath(entrada.path))
+                if aberto is not None:
+                    if aberto.tamanho_bytes() > max_bytes:
+                        aberto.limpar()
+                        limpos += 1
+                    continue
+                arquivos = [a for a in os.scandir(entrada.path) if a.is_file()]
+                tamanho = sum(a.stat().st_size for a in arquivos)
+                recente = max((a.stat().st_mtime for a in arquivos), default=entrada.stat().st_mtime)
+                if tamanho > max_bytes or recente < limite:
+                    shutil.rmtree(entrada.path)
+                    limpos += 1
+            except OSError:
+                pass
+    return limpos
@@ -0,0 +1,87 @@
+# services/embedding_registry.py
+"""Registro de modelos de embedding compartilhado por todo o processo."""
+
+import threading
+from typing import Dict, Tuple, Any
+
+
+class EmbeddingRegistry:
+    """
+    Mantém uma única instância de cada modelo de embedding por processo.
+
+    As instâncias são indexadas por (nome do modelo, device), de modo que
+    todas as sessões (e seus RAGManagers) compartilham os mesmos pesos em
+    memória em vez de recarregá-los do disco.
+    """
+
+    def __init__(self):
+        self._modelos: Dict[Tuple[str, str], Any] = {}
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+
+    @staticmethod
+    def _carregar(model_name: str, device: str):
+        """Carrega o modelo HuggingFace (operação lenta, feita uma vez)."""
+        # Lazy import para evitar overhead na importação do módulo
+        from langchain_huggingface import HuggingFaceEmbeddings
+
+        # Bug fix: 'Cannot copy out of meta tensor' em versões recentes de torch/transformers
+        # Forçamos o carregamento direto no CPU sem usar meta tensors se possível
+        return HuggingFaceEmbeddings(
+            model_name=model_name,
+            model_kwargs={
+                'device': device,
+                'trust_remote_code': True
+            },
+            encode_kwargs={'normalize_embeddings': True}
+        )
+
+    def get(self, model_name: str, device: str = "cpu"):
+        """Retorna o modelo compartilhado, carregando-o na primeira chamada."""
+        key = (model_name, device)
+        modelo = self._modelos.get(key)
+        if modelo is not None:
+            return modelo
+
+        with self._lock:
+            # Double-checked: outra thread pode ter carregado enquanto esperávamos
+            modelo = self._modelos.get(key)
+            if modelo is None:
+                print(f"[EMBEDDINGS] Carregando modelo '{model_name}' ({device})...")
+                modelo = self._carregar(model_name, device)
+                self._modelos[key] = modelo
+        return modelo
+
+    def warmup(self, model_name: str, device: str = "cpu") -> None:
+        """Pré-carrega o modelo e sinaliza prontidão (usado no startup da API)."""
+        try:
+            modelo = self.get(model_name, device)
+        except Exception as e:
+            print(f"[EMBEDDINGS] ❌ Falha ao carregar '{model_name}': {e}")
+            return
+        # Um encode curto força a inicialização preguiçosa do tokenizer/pesos
+        try:
+            modelo.embed_query("warmup")
+        except Exception as e:
+            print(f"[EMBEDDINGS] Aviso no warmup: {e}")
+        self._ready.set()
+        print(f"[EMBEDDINGS] Modelo '{model_name}' pronto.")
+
+    @property
+    def is_ready(self) -> bool:
+        """Indica se o warmup foi concluído."""
+        return self._ready.is_set()
+
+    def carregados(self) -> list:
+        """Lista as chaves (modelo, device) já carregadas."""
+        return [f"{nome}@{device}" for nome, device in self._modelos]
+
+    def limpar(self) -> None:
+        """Descarta todos os modelos carregados (útil em testes)."""
+        with self._lock:
+            self._modelos.clear()
+            self._ready.clear()
+
+
+# Instância global do processo
+EMBEDDING_REGISTRY = EmbeddingRegistry()
@@ -0,0 +1,97 @@
+# services/extraction_cache.py
+"""Cache de extração por hash dos bytes originais do arquivo."""
+
+import os
+import json
+import threading
+from typing import Dict, Optional, Tuple
+
+from services.content_store import get_content_store
+
+
+DEFAULT_EXTRACTION_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '.tmp', 'extraction'))
+
+# Incrementar quando execution/document_ingestion.py mudar o texto produzido
+VERSAO_EXTRATOR = 4
+
+
+def diretorio_extracao(content_dir: str) -> str:
+    """Referências ao lado do armazém de conteúdo: `<pai>/extraction` (.tmp/extraction no padrão)."""
+    return os.path.join(os.path.dirname(os.path.abspath(content_dir)), 'extraction')
+
+
+class ExtractionCache:
+    """
+    Mapeia (versão do extrator, extensão, SHA-256 dos bytes) -> hash do texto extraído
+    e metadados da extração (ex.: encoding detectado).
+
+    O texto fica no ContentStore (`.tmp/content/<hash>.blk`, o mesmo usado pelo
+    UploadManager); aqui fica só a referência, um arquivo pequeno por chave,
+    gravado atomicamente no diretório irmão do armazém (`.tmp/extraction`).
+    Um arquivo idêntico reenviado não passa pela ingestão.
+    """
+
+    def __init__(self, content_dir: str, base_dir: str = None):
+        self.content_dir = content_dir
+        self.dir = base_dir or diretorio_extracao(content_dir)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(self.dir, exist_ok=True)
+
+    @staticmethod
+    def chave(hash_bytes: str, suffix: str) -> str:
+        return f"v{VERSAO_EXTRATOR}_{(suffix or '').lower().lstrip('.')}_{hash_bytes}"
+
+    def _caminho(self, hash_bytes: str, suffix: str) -> str:
+        return os.path.join(self.dir, f"{self.chave(hash_bytes, suffix)}.ref")
+
+    def get(self, hash_bytes: str, suffix: str) -> Optional[Tuple[str, dict]]:
+        """(caminho do texto já extraído, metadados) deste arquivo, ou None."""
+        encontrado = None
+        ref = self._caminho(hash_bytes, suffix)
+        if os.path.exists(ref):
+            try:
+                with open(ref, 'r', encoding='utf-8') as f:
+                    entrada = json.load(f)
+                candidato = get_content_store(self.content_dir).caminho(entrada['hash'])
+                # O texto pode ter sido purgado: referência órfã conta como miss
+                if os.path.exists(candidato):
+                    encontrado = (candidato, entrada.get("metadados") or {})
+            except (OSError, ValueError, KeyError):
+                pass
+        with self._lock:
+            if encontrado:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return encontrado
+
+    def put(self, hash_bytes: str, suffix: str, content_hash: str, metadados: dict = None) -> None:
+        ref = self._caminho(hash_bytes, suffix)
+        tmp_path = f"{ref}.tmp.{threading.get_ident()}"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"hash": content_hash, "metadados": metadados or {}}, f)
+        os.replace(tmp_path, ref)
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+                "versao_extrator": VERSAO_EXTRATOR,
+            }
+
+
+_caches: Dict[str, ExtractionCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_extraction_cache(content_dir: str) -> ExtractionCache:
+    """Cache de extração compartilhado pelo processo (contadores globais)."""
+    with _caches_lock:
+        if content_dir not in _caches:
+            _caches[content_dir] = ExtractionCache(content_dir)
+        return _caches[content_dir]
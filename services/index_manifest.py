@@ -0,0 +1,98 @@
+# services/index_manifest.py
+"""Manifesto local dos documentos indexados em cada coleção vetorial."""
+
+import os
+import json
+import threading
+from typing import Dict, Iterable, Set
+
+
+DEFAULT_MANIFEST_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '.tmp', 'vector_db', 'manifests'))
+
+
+class IndexManifest:
+    """
+    Registro persistente {hash: {source, chunks}} de uma coleção.
+
+    Permite sincronizar a coleção comparando hashes em memória, sem varrer
+    todos os metadados do vector store a cada upload. A gravação é atômica
+    (arquivo temporário + os.replace).
+    """
+
+    def __init__(self, collection_name: str, base_dir: str = None):
+        self.collection_name = collection_name
+        self.dir = base_dir or DEFAULT_MANIFEST_DIR
+        self.path = os.path.join(self.dir, f"{collection_name}.json")
+        self._docs: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self.existe = os.path.exists(self.path)
+        if self.existe:
+            self._carregar()
+
+    def _carregar(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self._docs = json.load(f).get('documentos', {})
+        except (OSError, ValueError) as e:
+            # Manifesto ilegível: tratado como ausente (reconstruído a partir da coleção)
+            print(f"[MANIFESTO] Aviso: manifesto '{self.path}' ilegível ({e}).")
+            self._docs = {}
+            self.existe = False
+
+    def salvar(self):
+        with self._lock:
+            os.makedirs(self.dir, exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'collection': self.collection_name, 'documentos': self._docs}, f)
+            os.replace(tmp_path, self.path)
+            self.existe = True
+
+    @property
+    def hashes(self) -> Set[str]:
+        return set(self._docs)
+
+    @property
+    def fontes(self) -> Set[str]:
+        return set(d.get('source') for d in self._docs.values() if d.get('source'))
+
+    def adicionar(self, doc_hash: str, source: str, chunks: int):
+        with self._lock:
+            self._docs[doc_hash] = {'source': source, 'chunks': chunks}
+
+    def remover(self, hashes: Iterable[str]):
+        with self._lock:
+            for h in hashes:
+                self._docs.pop(h, None)
+
+    def reconstruir(self, metadatas: Iterable[dict]):
+        """Reconstrói o manifesto a partir dos metadados da coleção (migração)."""
+        docs: Dict[str, dict] = {}
+        for m in metadatas:
+            h = (m or {}).get('hash')
+            if not h:
+                continue
+            entrada = docs.setdefault(h, {'source': m.get('source'), 'chunks': 0})
+            entrada['chunks'] += 1
+        with self._lock:
+            self._docs = docs
+
+    def apagar(self):
+        with self._lock:
+            self._docs = {}
+            self.existe = False
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+    @staticmethod
+    def apagar_todos(base_dir: str = None):
+        """Remove todos os manifestos (após reset físico do vector store)."""
+        base = base_dir or DEFAULT_MANIFEST_DIR
+        if not os.path.exists(base):
+            return
+        for f in os.listdir(base):
+            if f.endswith('.json'):
+                try:
+                    os.remove(os.path.join(base, f))
+                except OSError:
+                    pass
@@ -0,0 +1,193 @@
+# services/indexing_jobs.py
+"""Fila de jobs de indexação executados fora do event loop da API."""
+
+import time
+import uuid
+import asyncio
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, AsyncGenerator, Callable, Dict, Optional
+
+from config.settings import JOBS_CONFIG
+from services.scheduler import AdmissaoNegadaError, FilaJusta
+
+
+STATUS_FINAIS = ("concluido", "erro")
+
+
+class FilaCheiaError(AdmissaoNegadaError):
+    """Levantada quando a fila de indexação atingiu o limite de jobs pendentes."""
+    pass
+
+
+@dataclass
+class IndexingJob:
+    """Estado de um job de indexação (extração + chunking + embeddings)."""
+    id: str
+    session_id: str
+    descricao: str = ""
+    status: str = "na_fila"  # na_fila | executando | concluido | erro
+    progresso: float = 0.0
+    mensagem: str = "Aguardando na fila..."
+    resultado: Optional[Dict[str, Any]] = None
+    erro: Optional[str] = None
+    criado_em: float = field(default_factory=time.time)
+    finalizado_em: Optional[float] = None
+    versao: int = 0  # Incrementada a cada mudança (usada pelo streaming)
+
+    @property
+    def finalizado(self) -> bool:
+        return self.status in STATUS_FINAIS
+
+    def atualizar(self, **campos):
+        for chave, valor in campos.items():
+            setattr(self, chave, valor)
+        self.versao += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "session_id": self.session_id,
+            "descricao": self.descricao,
+            "status": self.status,
+            "progresso": round(self.progresso, 3),
+            "mensagem": self.mensagem,
+            "resultado": self.resultado,
+            "erro": self.erro,
+        }
+
+
+class IndexingQueue:
+    """
+    Pool limitado de workers (threads) para jobs de indexação.
+
+    - `max_workers` jobs executam em paralelo; o restante espera na fila.
+    - Acima de `max_pendentes` jobs não finalizados (ou `max_pendentes_por_sessao`
+      aguardando da mesma sessão), novos envios são recusados.
+    - Jobs da mesma sessão são serializados (compartilham o session_state) e as
+      sessões são atendidas em rodízio (FilaJusta): um lote grande de uma sessão
+      não segura os uploads das outras.
+    """
+
+    def __init__(self, max_workers: int = None, max_pendentes: int = None, max_historico: int = None,
+                 max_pendentes_por_sessao: int = None):
+        self.max_workers = max_workers or JOBS_CONFIG.max_workers
+        self.max_pendentes = max_pendentes or JOBS_CONFIG.max_pendentes
+        self.max_historico = max_historico or JOBS_CONFIG.max_historico
+        self.fila = FilaJusta(
+            "indexação",
+            max_execucao=self.max_workers,
+            max_execucao_por_sessao=1,
+            max_fila=max(0, self.max_pendentes - self.max_workers),
+            max_fila_por_sessao=max_pendentes_por_sessao or JOBS_CONFIG.max_pendentes_por_sessao,
+            duracao_inicial=30.0,
+        )
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="indexacao")
+        self._jobs: "OrderedDict[str, IndexingJob]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._encerrada = False
+
+    @property
+    def pendentes(self) -> int:
+        return sum(1 for j in self._jobs.values() if not j.finalizado)
+
+    def submit(self, session_id: str, tarefa: Callable[[Callable], Dict[str, Any]], descricao: str = "") -> IndexingJob:
+        """
+        Enfileira a tarefa. Ela recebe um `progress_callback(fracao, mensagem)`
+        compatível com o de RAGManager.indexar_documentos e retorna o resultado.
+        """
+        job = IndexingJob(id=str(uuid.uuid4()), session_id=session_id, descricao=descricao)
+        with self._lock:
+            if self._encerrada:
+                raise FilaCheiaError("Fila de indexação encerrada.")
+            try:
+                imediato = self.fila.admitir(session_id, (job, tarefa))
+            except AdmissaoNegadaError as e:
+                raise FilaCheiaError(str(e), e.retry_after) from e
+            self._jobs[job.id] = job
+            self._podar_historico()
+            if imediato:
+                self._executor.submit(self._executar, job, tarefa)
+        return job
+
+    def _podar_historico(self):
+        """Descarta os jobs finalizados mais antigos acima de max_historico."""
+        excedente = len(self._jobs) - self.max_historico
+        for job_id in [j.id for j in self._jobs.values() if j.finalizado][:max(0, excedente)]:
+            del self._jobs[job_id]
+
+    def _executar(self, job: IndexingJob, tarefa: Callable):
+        def progress_callback(fracao: float, mensagem: str = ""):
+            job.atualizar(progresso=max(job.progresso, min(float(fracao), 1.0)), mensagem=mensagem or job.mensagem)
+
+        inicio = time.monotonic()
+        job.atualizar(status="executando", mensagem="Iniciando processamento...")
+        try:
+            resultado = tarefa(progress_callback)
+            job.atualizar(
+                status="concluido",
+                progresso=1.0,
+                mensagem="Concluído!",
+                resultado=resultado,
+                finalizado_em=time.time()
+            )
+        except Exception as e:
+            print(f"[JOBS] Erro no job {job.id}: {e}")
+            job.atualizar(status="erro", mensagem="Falha no processamento.", erro=str(e), finalizado_em=time.time())
+        finally:
+            # O slot passa ao próximo job, escolhido em rodízio entre as sessões
+            despachados = self.fila.liberar(job.session_id, time.monotonic() - inicio)
+            with self._lock:
+                for sid, (proximo, proxima_tarefa) in despachados:
+                    if self._encerrada:
+                        self._cancelar(proximo)
+                        self.fila.liberar(sid)
+                    else:
+                        self._executor.submit(self._executar, proximo, proxima_tarefa)
+
+    @staticmethod
+    def _cancelar(job: IndexingJob):
+        job.atualizar(
+            status="erro",
+            mensagem="Cancelado: servidor encerrando.",
+            erro="Job cancelado no encerramento do servidor; envie o arquivo novamente.",
+            finalizado_em=time.time()
+        )
+
+    def get(self, job_id: str) -> Optional[IndexingJob]:
+        return self._jobs.get(job_id)
+
+    def sessao_ocupada(self, session_id: str) -> bool:
+        """Se a sessão tem job na fila ou em execução (o job usa o session_state)."""
+        return any(j.session_id == session_id and not j.finalizado for j in list(self._jobs.values()))
+
+    async def acompanhar(self, job_id: str, intervalo: float = 0.2) -> AsyncGenerator[Dict[str, Any], None]:
+        """Emite um snapshot a cada mudança do job, até ele finalizar."""
+        job = self.get(job_id)
+        if job is None:
+            return
+        versao_enviada = -1
+        while True:
+            if job.versao != versao_enviada:
+                versao_enviada = job.versao
+                yield job.snapshot()
+            if job.finalizado and job.versao == versao_enviada:
+                return
+            await asyncio.sleep(intervalo)
+
+    def shutdown(self, wait: bool = True):
+        """
+        Recusa novos envios e cancela os jobs que ainda aguardam na fila (ficam
+        com status "erro"); com `wait`, espera os jobs em execução terminarem.
+        """
+        with self._lock:
+            self._encerrada = True
+            for _, (job, _) in self.fila.esvaziar():
+                self._cancelar(job)
+        self._executor.shutdown(wait=wait)
+
+
+# Fila global do processo
+INDEXING_QUEUE = IndexingQueue()
@@ -0,0 +1,197 @@
+# services/ingestion_pool.py
+"""Pool de processos persistentes para extração de texto (document_ingestion.py --servir)."""
+
+import os
+import sys
+import json
+import queue
+import signal
+import threading
+import subprocess
+from typing import List, Optional, Tuple
+
+from config.settings import INGESTION_CONFIG
+
+
+SCRIPT_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'execution', 'document_ingestion.py'))
+
+
+class IngestionTimeoutError(RuntimeError):
+    """Levantada quando um pedido excede o timeout (o worker é descartado)."""
+    pass
+
+
+class _Worker:
+    """Processo de ingestão aquecido; as respostas são lidas por uma thread dedicada."""
+
+    def __init__(self):
+        self.jobs = 0
+        self.processo = subprocess.Popen(
+            [sys.executable, SCRIPT_PATH, "--servir"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            cwd=os.path.dirname(os.path.dirname(SCRIPT_PATH)),
+            # Grupo de processos próprio: `matar` alcança também o multiprocessing.Pool
+            # que a extração de PDFs abre dentro do worker
+            start_new_session=os.name != 'nt',
+        )
+        self._respostas: "queue.Queue[Optional[bytes]]" = queue.Queue()
+        # Leitura em thread: timeout portável (select não funciona com pipes no Windows)
+        threading.Thread(target=self._ler, daemon=True).start()
+
+    def _ler(self):
+        for linha in self.processo.stdout:
+            self._respostas.put(linha)
+        self._respostas.put(None)  # EOF: processo encerrou
+
+    @property
+    def vivo(self) -> bool:
+        return self.processo.poll() is None
+
+    def executar(self, pedido: dict, timeout: float) -> dict:
+        self.processo.stdin.write(json.dumps(pedido, ensure_ascii=False).encode('utf-8') + b"\n")
+        self.processo.stdin.flush()
+        try:
+            linha = self._respostas.get(timeout=timeout)
+        except queue.Empty:
+            raise IngestionTimeoutError(f"Extração excedeu {timeout:.0f}s.")
+        if linha is None:
+            raise RuntimeError(f"Worker de ingestão encerrou inesperadamente (código {self.processo.poll()}).")
+        self.jobs += 1
+        return json.loads(linha)
+
+    def encerrar(self, timeout: float = 5.0):
+        try:
+            self.processo.stdin.close()
+            self.processo.wait(timeout=timeout)
+        except Exception:
+            self.matar()
+
+    def matar(self):
+        """Mata o worker e os processos que ele criou (sem deixar netos órfãos extraindo)."""
+        try:
+            if os.name == 'nt':
+                subprocess.run(["taskkill", "/F", "/T", "/PID", str(self.processo.pid)], capture_output=True)
+            else:
+                os.killpg(self.processo.pid, signal.SIGKILL)
+        except (OSError, subprocess.SubprocessError):
+            pass  # Grupo já encerrado
+        self.processo.kill()
+        try:
+            self.processo.wait(timeout=5)
+        except Exception:
+            pass
+
+
+class IngestionPool:
+    """
+    Workers de extração de longa duração, com o mesmo isolamento de processo
+    do subprocess por arquivo, mas sem pagar interpretador + imports a cada upload.
+
+    - `tamanho` workers atendem pedidos em paralelo; os demais aguardam um livre.
+    - Um pedido acima de `timeout` mata o worker (que é substituído).
+    - Cada worker é reciclado após `max_jobs_por_worker` pedidos (limita vazamentos
+      de memória dos parsers).
+    """
+
+    def __init__(self, tamanho: int = None, timeout: float = None, max_jobs_por_worker: int = None):
+        self.tamanho = tamanho or INGESTION_CONFIG.tamanho_pool
+        self.timeout = timeout or INGESTION_CONFIG.timeout_segundos
+        self.max_jobs_por_worker = max_jobs_por_worker or INGESTION_CONFIG.max_jobs_por_worker
+        self._livres: "queue.Queue[Optional[_Worker]]" = queue.Queue()
+        self._todos: List[_Worker] = []
+        self._lock = threading.Lock()
+        self._encerrado = False
+        self.reciclados = 0
+
+    def iniciar(self):
+        """Sobe os workers que faltam (chamado no startup para aquecê-los)."""
+        with self._lock:
+            if self._encerrado:
+                return
+            while len(self._todos) < self.tamanho:
+                worker = _Worker()
+                self._todos.append(worker)
+                self._livres.put(worker)
+
+    def _substituir(self, worker: _Worker, matar: bool = False) -> None:
+        if matar:
+            worker.matar()
+        else:
+            worker.encerrar()
+        with self._lock:
+            if worker in self._todos:
+                self._todos.remove(worker)
+            self.reciclados += 1
+            if self._encerrado:
+                return
+            novo = _Worker()
+            self._todos.append(novo)
+        self._livres.put(novo)
+
+    def _devolver(self, worker: _Worker) -> None:
+        with self._lock:
+            ativo = worker in self._todos
+            if ativo:
+                self._livres.put(worker)
+        if not ativo:
+            worker.encerrar()  # Pool encerrado durante o pedido
+
+    def extrair(self, pedido: dict, timeout: float = None) -> str:
+        """Executa um pedido de extração e retorna o texto (RuntimeError em falha)."""
+        return self.extrair_com_metadados(pedido, timeout)[0]
+
+    def extrair_com_metadados(self, pedido: dict, timeout: float = None) -> Tuple[str, dict]:
+        """Como extrair, retornando também os metadados do worker (ex.: encoding detectado)."""
+        if self._encerrado:
+            raise RuntimeError("Pool de ingestão encerrado.")
+        if not self._todos:
+            self.iniciar()
+        timeout = timeout or self.timeout
+        livres = self._livres
+        worker = livres.get()
+        if worker is None:
+            livres.put(None)  # Repassa a sentinela ao próximo que espera nesta fila
+            raise RuntimeError("Pool de ingestão encerrado.")
+        try:
+            if not worker.vivo:
+                raise RuntimeError("Worker de ingestão indisponível.")
+            resposta = worker.executar(pedido, timeout)
+        except Exception:
+            self._substituir(worker, matar=True)
+            raise
+
+        if worker.jobs >= self.max_jobs_por_worker:
+            self._substituir(worker)
+        else:
+            self._devolver(worker)
+
+        if not resposta.get("ok"):
+            raise RuntimeError(f"Erro no script de ingestão: {resposta.get('erro', 'Nenhuma mensagem de erro capturada.')}")
+        return resposta["conteudo"], resposta.get("metadados") or {}
+
+    def encerrar(self):
+        with self._lock:
+            self._encerrado = True
+            workers, self._todos = self._todos, []
+            livres, self._livres = self._livres, queue.Queue()
+            self._livres.put(None)  # Pedidos que já passaram pela checagem também desistem
+        # Sentinela: quem aguarda um worker livre na fila antiga desiste em vez de travar
+        livres.put(None)
+        for worker in workers:
+            worker.encerrar()
+
+
+_pool: Optional[IngestionPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_ingestion_pool() -> Optional[IngestionPool]:
+    """Pool global do processo, ou None se desabilitado (usa subprocess por arquivo)."""
+    global _pool
+    if not INGESTION_CONFIG.usar_pool:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = IngestionPool()
+        return _pool
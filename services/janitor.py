@@ -0,0 +1,97 @@
+# services/janitor.py
+"""Tarefas de limpeza periódicas executadas em thread de fundo, fora do caminho das requisições."""
+
+import os
+import time
+import shutil
+import threading
+from typing import Any, Callable, Dict
+
+from config.settings import JANITOR_CONFIG
+
+
+def remover_antigos(diretorio: str, max_idade_segundos: float) -> int:
+    """Remove arquivos de `diretorio` (sem recursão) modificados há mais de `max_idade_segundos`."""
+    if not os.path.isdir(diretorio):
+        return 0
+    limite = time.time() - max_idade_segundos
+    removidos = 0
+    with os.scandir(diretorio) as entradas:
+        for entrada in entradas:
+            try:
+                if entrada.is_file() and entrada.stat().st_mtime < limite:
+                    os.remove(entrada.path)
+                    removidos += 1
+            except OSError:
+                pass  # Removido por outro processo ou em uso
+    return removidos
+
+
+def remover_subdiretorios_antigos(diretorio: str, max_idade_segundos: float) -> int:
+    """Remove as subpastas de `diretorio` (com o conteúdo) modificadas há mais de `max_idade_segundos`."""
+    if not os.path.isdir(diretorio):
+        return 0
+    limite = time.time() - max_idade_segundos
+    removidos = 0
+    with os.scandir(diretorio) as entradas:
+        for entrada in entradas:
+            try:
+                if entrada.is_dir(follow_symlinks=False) and entrada.stat().st_mtime < limite:
+                    shutil.rmtree(entrada.path)
+                    removidos += 1
+            except OSError:
+                pass
+    return removidos
+
+
+class Janitor:
+    """
+    Executa as tarefas registradas a cada `intervalo_segundos` em uma thread daemon.
+    Uma tarefa que falha é registrada e não interrompe as demais.
+    """
+
+    def __init__(self, intervalo_segundos: float = None):
+        self.intervalo_segundos = intervalo_segundos or JANITOR_CONFIG.intervalo_segundos
+        self._tarefas: Dict[str, Callable[[], Any]] = {}
+        self._parar = threading.Event()
+        self._thread = None
+        self.execucoes = 0
+        self.ultimos_resultados: Dict[str, Any] = {}
+
+    def registrar(self, nome: str, tarefa: Callable[[], Any]) -> None:
+        """Registra (ou substitui, pelo nome) uma tarefa."""
+        self._tarefas[nome] = tarefa
+
+    def executar_agora(self) -> Dict[str, Any]:
+        resultados = {}
+        for nome, tarefa in list(self._tarefas.items()):
+            try:
+                resultados[nome] = tarefa()
+            except Exception as e:
+                print(f"[JANITOR] Erro na tarefa '{nome}': {e}")
+                resultados[nome] = f"erro: {e}"
+        self.execucoes += 1
+        self.ultimos_resultados = resultados
+        return resultados
+
+    def _loop(self):
+        while not self._parar.is_set():
+            self.executar_agora()
+            self._parar.wait(self.intervalo_segundos)
+
+    def iniciar(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._parar.clear()
+        self._thread = threading.Thread(target=self._loop, name="janitor", daemon=True)
+        self._thread.start()
+
+    def parar(self, timeout: float = 5.0) -> None:
+        self._parar.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+
+# Janitor global do processo (tarefas registradas na inicialização da API)
+JANITOR = Janitor()
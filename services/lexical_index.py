@@ -0,0 +1,165 @@
+# services/lexical_index.py
+"""Índice lexical (SQLite FTS5/BM25) mantido ao lado da coleção vetorial."""
+
+import os
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Set, Tuple
+
+from services.text_processor import TextChunk
+
+
+DEFAULT_LEXICAL_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '.tmp', 'lexical'))
+
+
+def termos_da_consulta(query: str) -> List[str]:
+    """Extrai os termos da consulta (sem operadores FTS5, que seriam interpretados)."""
+    return re.findall(r'\w+', query.lower())
+
+
+def fusao_rrf(listas: Iterable[List], chave, k: int = 60) -> List:
+    """
+    Reciprocal Rank Fusion: score(d) = Σ 1 / (k + posição de d em cada lista).
+
+    Args:
+        listas: Rankings a combinar (melhor primeiro)
+        chave: Função que identifica o mesmo item em listas diferentes
+        k: Constante de suavização do RRF
+    """
+    scores: Dict = {}
+    itens: Dict = {}
+    for lista in listas:
+        for posicao, item in enumerate(lista, 1):
+            c = chave(item)
+            scores[c] = scores.get(c, 0.0) + 1.0 / (k + posicao)
+            itens.setdefault(c, item)
+    ordenadas = sorted(scores, key=lambda c: scores[c], reverse=True)
+    return [itens[c] for c in ordenadas]
+
+
+class LexicalIndex:
+    """
+    Índice BM25 de uma coleção, em um arquivo SQLite próprio.
+
+    Tabelas:
+        chunks      -> FTS5 (conteudo indexado; source/hash/chunk_index como payload)
+        documentos  -> hashes presentes no índice (sincronização sem varrer o FTS)
+    """
+
+    def __init__(self, collection_name: str, base_dir: str = None):
+        self.collection_name = collection_name
+        self.dir = base_dir or DEFAULT_LEXICAL_DIR
+        self.path = os.path.join(self.dir, f"{collection_name}.db")
+        self._lock = threading.Lock()
+        self.disponivel = True
+        try:
+            os.makedirs(self.dir, exist_ok=True)
+            with self._conectar() as conn:
+                conn.execute(
+                    "CREATE VIRTUAL TABLE IF NOT EXISTS chunks USING fts5("
+                    "conteudo, source UNINDEXED, hash UNINDEXED, chunk_index UNINDEXED, "
+                    "tokenize='unicode61 remove_diacritics 2')"
+                )
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS documentos ("
+                    "hash TEXT PRIMARY KEY, source TEXT, chunks INTEGER)"
+                )
+        except sqlite3.Error as e:
+            # SQLite sem FTS5: a busca segue apenas vetorial
+            print(f"[LEXICAL] Índice lexical indisponível: {e}")
+            self.disponivel = False
+
+    @contextmanager
+    def _conectar(self):
+        """Conexão curta (commit ao final e fechamento explícito)."""
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def hashes(self) -> Set[str]:
+        if not self.disponivel:
+            return set()
+        with self._conectar() as conn:
+            return set(r[0] for r in conn.execute("SELECT hash FROM documentos"))
+
+    def adicionar(self, doc_hash: str, chunks: List[TextChunk]) -> None:
+        """Indexa os chunks de um documento (substitui versão anterior do mesmo hash)."""
+        if not self.disponivel or not chunks:
+            return
+        with self._lock, self._conectar() as conn:
+            conn.execute("DELETE FROM chunks WHERE hash = ?", (doc_hash,))
+            conn.executemany(
+                "INSERT INTO chunks (conteudo, source, hash, chunk_index) VALUES (?, ?, ?, ?)",
+                [(c.conteudo, c.documento_origem, doc_hash, c.indice) for c in chunks]
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO documentos (hash, source, chunks) VALUES (?, ?, ?)",
+                (doc_hash, chunks[0].documento_origem, len(chunks))
+            )
+
+    def remover(self, hashes: Iterable[str]) -> None:
+        hashes = list(hashes)
+        if not self.disponivel or not hashes:
+            return
+        marcadores = ",".join("?" * len(hashes))
+        with self._lock, self._conectar() as conn:
+            conn.execute(f"DELETE FROM chunks WHERE hash IN ({marcadores})", hashes)
+            conn.execute(f"DELETE FROM documentos WHERE hash IN ({marcadores})", hashes)
+
+    def limpar(self) -> None:
+        if not self.disponivel:
+            return
+        with self._lock, self._conectar() as conn:
+            conn.execute("DELETE FROM chunks")
+            conn.execute("DELETE FROM documentos")
+
+    def apagar(self) -> None:
+        """Remove o arquivo do índice (coleção descartada)."""
+        with self._lock:
+            for caminho in (self.path, f"{self.path}-journal"):
+                if os.path.exists(caminho):
+                    os.remove(caminho)
+
+    def _consultar(self, expressao: str, k: int) -> List[Tuple[str, dict, float]]:
+        with self._conectar() as conn:
+            linhas = conn.execute(
+                "SELECT conteudo, source, hash, chunk_index, bm25(chunks) AS score "
+                "FROM chunks WHERE chunks MATCH ? ORDER BY score LIMIT ?",
+                (expressao, k)
+            ).fetchall()
+        return [
+            (conteudo, {"source": source, "hash": doc_hash, "chunk_index": int(indice)}, -score)
+            for conteudo, source, doc_hash, indice, score in linhas
+        ]
+
+    def buscar(self, query: str, k: int) -> List[Tuple[str, dict, float]]:
+        """Top-k por BM25 com qualquer termo da consulta: [(conteudo, metadata, score)]."""
+        termos = termos_da_consulta(query)
+        if not self.disponivel or not termos:
+            return []
+        return self._consultar(" OR ".join(f'"{t}"' for t in termos), k)
+
+    def buscar_exata(self, query: str, k: int) -> List[Tuple[str, dict, float]]:
+        """Top-k dos chunks que contêm a consulta inteira como frase."""
+        termos = termos_da_consulta(query)
+        if not self.disponivel or not termos:
+            return []
+        return self._consultar('"' + " ".join(termos) + '"', k)
+
+    @staticmethod
+    def apagar_todos(base_dir: str = None) -> None:
+        """Remove todos os índices lexicais (após reset físico do vector store)."""
+        base = base_dir or DEFAULT_LEXICAL_DIR
+        if not os.path.exists(base):
+            return
+        for f in os.listdir(base):
+            if f.endswith('.db'):
+                try:
+                    os.remove(os.path.join(base, f))
+                except OSError:
+                    pass
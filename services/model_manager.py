@@ -1,14 +1,18 @@
 # services/model_manager.py
 """Gerenciador de modelos e chains com suporte a RAG."""
 
-from typing import Dict, Any, Optional, List
+from typing import AsyncGenerator, Dict, Any, Optional, List
 import os
+import time
+import asyncio
+import threading
 
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.messages import HumanMessage, AIMessage
 
 from config.settings import CONFIG_MODELOS, DEFAULT_MODEL_PARAMS, PROMPTS
 from services.rag_manager import RAGManager
+from services.chat_stream import EventoChat, RETRIEVAL_DONE, textos
 from services.google_docs.auth import AuthManager
 from services.google_docs.client import GoogleDocsClient
 from services.google_docs.formatter import AcademicFormatter
@@ -51,6 +55,29 @@ class ModelManager:
         
         self.orchestrator = OrchestratorAgent(self, docs_manager=self.docs_manager)
 
+    @classmethod
+    def da_sessao(cls, session_state: Dict[str, Any]) -> "ModelManager":
+        """
+        Contêiner de serviços da sessão: construído uma vez (RAGManager, Google Docs,
+        orquestrador) e reutilizado pelas requisições seguintes.
+        """
+        mm = session_state.get('_model_manager')
+        if mm is not None:
+            return mm
+        # setdefault é atômico: requisições simultâneas da mesma sessão usam a mesma trava
+        with session_state.setdefault('_model_manager_lock', threading.Lock()):
+            mm = session_state.get('_model_manager')
+            if mm is None:
+                mm = cls(session_state=session_state)
+                session_state['_model_manager'] = mm
+        return mm
+
+
+    def recarregar_google_docs(self):
+        """Refaz a integração com o Google Docs (ex.: após autorizar) no contêiner já criado."""
+        self._init_google_docs()
+        self.session_state['_docs_manager'] = self.docs_manager
+        self.orchestrator.docs_manager = self.docs_manager
 
     def _init_google_docs(self):
         """Inicializa componentes do Google Docs."""
@@ -117,20 +144,10 @@ class ModelManager:
         if not api_key:
             raise ValueError(f"API key não fornecida para {provedor}.")
         
-        # Converte objetos DocumentoCarregado (ou similares) para tuplas (nome, conteudo, doc_hash)
-        # Isso garante compatibilidade com o RAGManager que espera tuplas
-        docs_para_indexar = []
-        for d in documentos:
-            if hasattr(d, 'get_conteudo'):
-                # É um objeto DocumentoCarregado
-                docs_para_indexar.append((d.nome, d.get_conteudo(), d.hash))
-            else:
-                # Já é uma tupla ou outro formato
-                docs_para_indexar.append(d)
-
-        # Indexa documentos no RAG
+        # Objetos DocumentoCarregado são repassados sem ler o conteúdo: o RAGManager
+        # só chama get_conteudo() para documentos que ainda não estão no cache de chunks
         stats = self.rag_manager.indexar_documentos(
-            docs_para_indexar, 
+            list(documentos), 
             progress_callback=progress_callback
         )
         
@@ -149,20 +166,8 @@ class ModelManager:
         
         return stats
 
-    def gerar_resposta_rag(self, pergunta: str):
-        """Gera resposta usando RAG ou Agente Orquestrador com streaming."""
-        llm = self.session_state.get('llm')
-        if not llm:
-            raise ValueError("LLM não inicializado. Chame criar_chain_rag ou criar_chain_simples primeiro.")
-        
-        # Se houver documentos, usamos a lógica do Orquestrador
-        if self.session_state.get('documentos'):
-            yield from self.orchestrator.planejar_documento(pergunta)
-            return
-
-        # Recupera contexto relevante
-        contexto = self.rag_manager.get_contexto_para_prompt(pergunta)
-        
+    def _chain_rag(self, llm, contexto: str):
+        """Chain RAG simples (sem orquestrador) com o contexto já recuperado."""
         if not contexto:
             contexto = "Nenhum contexto relevante encontrado nos documentos."
         
@@ -182,7 +187,22 @@ class ModelManager:
             ('user', '{input}')
         ])
         
-        chain = template | llm
+        return template | llm
+
+    def gerar_resposta_rag(self, pergunta: str):
+        """Gera resposta usando RAG ou Agente Orquestrador com streaming."""
+        llm = self.session_state.get('llm')
+        if not llm:
+            raise ValueError("LLM não inicializado. Chame criar_chain_rag ou criar_chain_simples primeiro.")
+        
+        # Se houver documentos, usamos a lógica do Orquestrador
+        if self.session_state.get('documentos'):
+            yield from self.orchestrator.planejar_documento(pergunta)
+            return
+
+        # Recupera contexto relevante
+        contexto = self.rag_manager.get_contexto_para_prompt(pergunta)
+        chain = self._chain_rag(llm, contexto)
         
         for chunk in chain.stream({
             'input': pergunta,
@@ -190,6 +210,40 @@ class ModelManager:
         }):
             yield chunk.content
 
+    async def agerar_resposta_rag(self, pergunta: str) -> AsyncGenerator[str, None]:
+        """
+        Versão assíncrona de gerar_resposta_rag, usada pela API: o LLM é consumido via
+        `astream` e a recuperação roda em thread, então um stream lento não segura o
+        event loop das demais conexões.
+        """
+        async for texto in textos(self.aeventos_resposta(pergunta)):
+            yield texto
+
+    async def aeventos_resposta(self, pergunta: str) -> AsyncGenerator[EventoChat, None]:
+        """Resposta como eventos tipados (tokens, recuperação, trocas de agente...) para o SSE."""
+        llm = self.session_state.get('llm')
+        if not llm:
+            raise ValueError("LLM não inicializado. Chame criar_chain_rag ou criar_chain_simples primeiro.")
+
+        if self.session_state.get('documentos'):
+            async for evento in self.orchestrator.aeventos(pergunta):
+                yield evento
+            return
+
+        inicio = time.perf_counter()
+        contexto = await asyncio.to_thread(self.rag_manager.get_contexto_para_prompt, pergunta)
+        yield EventoChat(RETRIEVAL_DONE, {
+            "chars": len(contexto or ''),
+            "segundos": round(time.perf_counter() - inicio, 3),
+        })
+        chain = self._chain_rag(llm, contexto)
+
+        async for chunk in chain.astream({
+            'input': pergunta,
+            'chat_history': self.get_historico_langchain()
+        }):
+            yield EventoChat.token(chunk.content)
+
     def criar_chain_simples(
         self,
         documentos_conteudo: str,
@@ -4,21 +4,166 @@
 
 import os
 import shutil
-from typing import List, Optional
-from dataclasses import dataclass
+import hashlib
+import threading
+from typing import Dict, Iterable, List, Optional
+from dataclasses import dataclass, field
 
 
+from config.settings import TipoArquivo
 from services.text_processor import TextProcessor, TextChunk, ChunkConfig
+from services.embedding_registry import EMBEDDING_REGISTRY
+from services.embedding_cache import EmbeddingCache, CachedEmbeddings, get_embedding_cache
+from services.retrieval_cache import LRUCache, get_query_cache
+from services.index_manifest import IndexManifest
+from services.chunk_cache import get_chunk_cache
+from services.lexical_index import LexicalIndex, fusao_rrf
+from services.context_packer import empacotar_contexto
+from services.vector_store import ColecaoChroma, FlatVectorStore, get_flat_store, descartar_flat_store, descartar_flat_stores
+from services.content_store import get_content_store
 
 @dataclass
 class RAGConfig:
     """Configurações do RAG."""
     embedding_model: str = "all-MiniLM-L6-v2"  # Modelo leve e eficiente
+    embedding_device: str = "cpu"
+    embedding_cache: bool = True
+    embedding_cache_dtype: str = "float16"
+    vector_backend: str = "chroma"  # "chroma" (HNSW) | "flat" (NumPy memmap, busca exata)
+    modo_busca_global: str = "agrupada"  # "agrupada" | "por_fonte"
+    cache_queries_max: int = 256
+    cache_resultados_max: int = 128
+    modo_busca: str = "vetorial"  # "vetorial" | "hibrida" (BM25 + vetores via RRF)
+    atalho_lexical: bool = False
+    rrf_k: int = 60
+    max_tokens_contexto: int = 6000  # Orçamento de tokens do contexto no prompt
+    max_tokens_por_agente: Dict[str, int] = field(default_factory=dict)
     collection_name: str = "oraculo_docs"
     top_k: int = 5  # Quantos chunks recuperar
     chunk_size: int = 1000
     chunk_overlap: int = 200
 
+def top_k_por_grupo(scores, grupos: List[str], k: int) -> List[int]:
+    """
+    Índices dos k maiores scores de cada grupo, de forma vetorizada.
+
+    O resultado é ordenado pelo melhor score de cada grupo e, dentro do
+    grupo, por score decrescente.
+    """
+    import numpy as np
+
+    scores = np.asarray(scores, dtype=np.float32)
+    if scores.size == 0 or k <= 0:
+        return []
+    _, grupo_ids = np.unique(np.asarray(grupos, dtype=object).astype(str), return_inverse=True)
+
+    # Ordena por grupo e, dentro do grupo, por score decrescente
+    ordem = np.lexsort((-scores, grupo_ids))
+    grupos_ordenados = grupo_ids[ordem]
+    inicio_grupo = np.r_[0, np.flatnonzero(np.diff(grupos_ordenados)) + 1]
+    tamanhos = np.diff(np.r_[inicio_grupo, len(ordem)])
+    posicao = np.arange(len(ordem)) - np.repeat(inicio_grupo, tamanhos)
+    escolhidos = ordem[posicao < k]
+
+    # Grupos com melhor resultado primeiro
+    melhor_do_grupo = scores[ordem[inicio_grupo]]
+    rank_grupo = np.empty(len(melhor_do_grupo), dtype=np.int64)
+    rank_grupo[np.argsort(-melhor_do_grupo, kind='stable')] = np.arange(len(melhor_do_grupo))
+    chave_final = np.lexsort((-scores[escolhidos], rank_grupo[grupo_ids[escolhidos]]))
+    return escolhidos[chave_final].tolist()
+
+
+VECTOR_DB_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '.tmp', 'vector_db'))
+
+_chroma_client = None
+_chroma_lock = threading.Lock()
+
+
+def nome_colecao(base: str, escopo: Optional[str]) -> str:
+    """Nome da coleção da sessão (compatível com as regras do Chroma)."""
+    if not escopo:
+        return base
+    return f"{base}_{hashlib.sha1(str(escopo).encode('utf-8')).hexdigest()[:16]}"
+
+
+def _abrir_chroma_client(persist_dir: str):
+    """Abre o cliente persistente, recriando a pasta se o índice estiver corrompido."""
+    import chromadb
+    from chromadb.config import Settings as ChromaSettings
+
+    try:
+        return chromadb.PersistentClient(
+            path=persist_dir,
+            settings=ChromaSettings(
+                anonymized_telemetry=False,
+                allow_reset=True
+            )
+        )
+    except Exception as e:
+        # Se falhar a abertura (comum em corrupção de índice HNSW)
+        print(f"⚠️ Erro ao carregar banco de vetores: {str(e)}")
+        
+        # Tenta limpar a pasta e reinicializar
+        try:
+            if os.path.exists(persist_dir):
+                print(f"🧹 Tentando limpar índice corrompido em: {persist_dir}")
+                # No Windows, arquivos podem estar presos por outros processos.
+                # Tentamos remover recursivamente com retries.
+                import time
+                for i in range(3):
+                    try:
+                        shutil.rmtree(persist_dir, ignore_errors=False)
+                        break
+                    except PermissionError:
+                        print(f"  [Tentativa {i+1}] Pasta bloqueada, aguardando 1s...")
+                        time.sleep(1)
+                    except Exception as e:
+                        print(f"  Erro inesperado na remoção: {e}")
+                        break
+            
+            os.makedirs(persist_dir, exist_ok=True)
+            
+            return chromadb.PersistentClient(
+                path=persist_dir,
+                settings=ChromaSettings(
+                    anonymized_telemetry=False,
+                    allow_reset=True
+                )
+            )
+        except Exception as recovery_error:
+            print(f"❌ Falha crítica na recuperação: {str(recovery_error)}")
+            # Fallback para cliente em memória se falhar feio
+            return chromadb.Client(
+                settings=ChromaSettings(anonymized_telemetry=False)
+            )
+
+
+def liberar_colecao(escopo: str, apagar: bool = False, config: RAGConfig = None) -> None:
+    """
+    Solta o índice flat aberto da coleção da sessão; com
+    `apagar`, remove também a coleção vetorial, o manifesto e o índice lexical.
+    """
+    from config.settings import RAG_CONFIG
+    config = config or RAG_CONFIG
+    nome = nome_colecao(config.collection_name, escopo)
+    descartar_flat_store(nome, apagar=apagar)
+    if not apagar:
+        return
+    if config.vector_backend != "flat":
+        ColecaoChroma(get_chroma_client(), nome).apagar()
+    IndexManifest(nome).apagar()
+    LexicalIndex(nome).apagar()
+
+
+def get_chroma_client():
+    """Cliente ChromaDB compartilhado por todas as sessões do processo."""
+    global _chroma_client
+    with _chroma_lock:
+        if _chroma_client is None:
+            _chroma_client = _abrir_chroma_client(VECTOR_DB_DIR)
+        return _chroma_client
+
+
 class RAGManager:
     """
     Gerenciador de RAG (Retrieval Augmented Generation).
@@ -36,130 +181,130 @@ class RAGManager:
                 chunk_overlap=self.config.chunk_overlap
             )
         )
+        self.chunk_cache = get_chunk_cache(self.text_processor.config)
         self._init_session_state()
         self._init_embeddings()
         self._init_vector_store()
-        self._lifecycle_purge()
+        # A remoção de arquivos antigos de .tmp/ roda no janitor (services/janitor.py)
 
     @property
     def session_state(self):
         """Retorna o estado da sessão atual."""
         return self._external_state
 
-    def _lifecycle_purge(self):
-        """Remove arquivos temporários e índices com mais de 48h."""
-        import time
-        current_time = time.time()
-        max_age = 48 * 3600  # 48 horas em segundos
-        
-        base_tmp = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '.tmp'))
-        content_dir = os.path.join(base_tmp, 'content')
-        
-        if os.path.exists(content_dir):
-            for f in os.listdir(content_dir):
-                file_path = os.path.join(content_dir, f)
-                if os.path.isfile(file_path):
-                    if current_time - os.path.getmtime(file_path) > max_age:
-                        try:
-                            os.remove(file_path)
-                        except:
-                            pass
-
-
     def _init_session_state(self):
         """Inicializa session state."""
         if 'rag_chunks' not in self.session_state:
             self.session_state['rag_chunks'] = []
         if 'rag_initialized' not in self.session_state:
             self.session_state['rag_initialized'] = False
+        if 'rag_versao' not in self.session_state:
+            self.session_state['rag_versao'] = 0
 
     def _init_embeddings(self):
-        """Inicializa modelo de embeddings."""
-        # Cache do modelo para não recarregar
+        """Inicializa modelo de embeddings (compartilhado pelo processo)."""
+        # O modelo vive no registro global: todas as sessões usam os mesmos pesos
         if 'embedding_model' not in self.session_state:
-            # Lazy import para evitar overhead na importação do módulo
-            from langchain_huggingface import HuggingFaceEmbeddings
-            
-            # Bug fix: 'Cannot copy out of meta tensor' em versões recentes de torch/transformers
-            # Forçamos o carregamento direto no CPU sem usar meta tensors se possível
-            self.session_state['embedding_model'] = HuggingFaceEmbeddings(
-                model_name=self.config.embedding_model,
-                model_kwargs={
-                    'device': 'cpu',
-                    'trust_remote_code': True
-                },
-                encode_kwargs={'normalize_embeddings': True}
+            self.session_state['embedding_model'] = EMBEDDING_REGISTRY.get(
+                self.config.embedding_model,
+                self.config.embedding_device
             )
         self.embeddings = self.session_state['embedding_model']
 
-    def _init_vector_store(self):
-        """Inicializa vector store persistente."""
-        import chromadb
-        from chromadb.config import Settings as ChromaSettings
+        # Cache em disco por (modelo, chunking, hash do chunk): re-indexar conteúdo
+        # já visto (após purga, retry ou em outra sessão) não executa inferência
+        namespace = EmbeddingCache.namespace_para(
+            self.config.embedding_model,
+            self.config.chunk_size,
+            self.config.chunk_overlap
+        )
+        if self.config.embedding_cache:
+            self.embedding_cache = get_embedding_cache(namespace, dtype=self.config.embedding_cache_dtype)
+        else:
+            self.embedding_cache = None
+        # Embeddings de consulta não dependem do corpus: LRU por modelo, sem versão
+        self.query_cache = get_query_cache(namespace, self.config.cache_queries_max)
+        self.embeddings = CachedEmbeddings(self.embeddings, self.embedding_cache, self.query_cache)
 
-        persist_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '.tmp', 'vector_db'))
-        
-        # Cliente ChromaDB persistente
-        if 'chroma_client' not in self.session_state:
-            try:
-                self.session_state['chroma_client'] = chromadb.PersistentClient(
-                    path=persist_dir,
-                    settings=ChromaSettings(
-                        anonymized_telemetry=False,
-                        allow_reset=True
-                    )
-                )
-            except Exception as e:
-                # Se falhar a abertura (comum em corrupção de índice HNSW)
-                print(f"⚠️ Erro ao carregar banco de vetores: {str(e)}")
-                
-                # Tenta limpar a pasta e reinicializar
-                try:
-                    if os.path.exists(persist_dir):
-                        print(f"🧹 Tentando limpar índice corrompido em: {persist_dir}")
-                        # No Windows, arquivos podem estar presos por outros processos.
-                        # Tentamos remover recursivamente com retries.
-                        import time
-                        for i in range(3):
-                            try:
-                                shutil.rmtree(persist_dir, ignore_errors=False)
-                                break
-                            except PermissionError:
-                                print(f"  [Tentativa {i+1}] Pasta bloqueada, aguardando 1s...")
-                                time.sleep(1)
-                            except Exception as e:
-                                print(f"  Erro inesperado na remoção: {e}")
-                                break
-                    
-                    os.makedirs(persist_dir, exist_ok=True)
-                    
-                    self.session_state['chroma_client'] = chromadb.PersistentClient(
-                        path=persist_dir,
-                        settings=ChromaSettings(
-                            anonymized_telemetry=False,
-                            allow_reset=True
-                        )
-                    )
-                except Exception as recovery_error:
-                    print(f"❌ Falha crítica na recuperação: {str(recovery_error)}")
-                    # Fallback para cliente em memória se falhar feio
-                    self.session_state['chroma_client'] = chromadb.Client(
-                        settings=ChromaSettings(anonymized_telemetry=False)
-                    )
+        # Resultados de busca dependem do corpus: LRU por sessão, chave inclui a versão
+        if '_retrieval_cache' not in self.session_state:
+            self.session_state['_retrieval_cache'] = LRUCache(self.config.cache_resultados_max)
+        self.retrieval_cache = self.session_state['_retrieval_cache']
 
+    def _init_vector_store(self):
+        """Inicializa vector store persistente (cliente único por processo)."""
+        if 'chroma_client' not in self.session_state:
+            self.session_state['chroma_client'] = get_chroma_client()
         self.chroma_client = self.session_state['chroma_client']
 
+        # Coleção isolada por sessão: uploads de um usuário não apagam os de outro
+        self.collection_name = nome_colecao(self.config.collection_name, self.session_state.get('session_id'))
+        self.manifest = IndexManifest(self.collection_name)
+        # Índice BM25 construído a partir dos mesmos TextChunks da coleção
+        self.lexical_index = LexicalIndex(self.collection_name)
         
         # Vector store
         if 'vector_store' not in self.session_state:
             self.session_state['vector_store'] = None
         self.vector_store = self.session_state['vector_store']
 
+    @property
+    def colecao(self):
+        """Operações de coleção do backend configurado (sincronização, varredura, limpeza)."""
+        if self.config.vector_backend == "flat":
+            return get_flat_store(self.collection_name, self.embeddings)
+        return ColecaoChroma(self.chroma_client, self.collection_name)
+
+    def _conectar_vector_store(self):
+        """VectorStore LangChain da coleção atual no backend configurado."""
+        if self.config.vector_backend == "flat":
+            return get_flat_store(self.collection_name, self.embeddings)
+
+        try:
+            from langchain_chroma import Chroma
+        except ImportError:
+            from langchain_community.vectorstores import Chroma
+        return Chroma(
+            collection_name=self.collection_name,
+            embedding_function=self.embeddings,
+            client=self.chroma_client
+        )
+
     @property
     def is_initialized(self) -> bool:
         """Verifica se o RAG está inicializado com documentos."""
         return self.session_state.get('rag_initialized', False)
 
+    @property
+    def versao(self) -> int:
+        """Versão do corpus indexado; muda a cada indexação ou limpeza."""
+        return self.session_state.get('rag_versao', 0)
+
+    def _incrementar_versao(self):
+        """Invalida os resultados de busca em cache para esta sessão."""
+        self.session_state['rag_versao'] = self.versao + 1
+        self.retrieval_cache.limpar()
+
+    def _buscar_com_cache(self, query: str, k: int, modo: str, buscar):
+        """Consulta o cache de resultados por (versão, query, k, modo) antes de buscar."""
+        chave = (self.versao, query, k, modo)
+        docs = self.retrieval_cache.get(chave)
+        if docs is None:
+            docs = buscar()
+            self.retrieval_cache.put(chave, list(docs))
+        return list(docs)
+
+    def get_cache_stats(self) -> dict:
+        """Contadores de acerto dos caches (para dimensionamento)."""
+        stats = {
+            "versao": self.versao,
+            "resultados": self.retrieval_cache.get_stats(),
+            "embeddings_consulta": self.query_cache.get_stats(),
+        }
+        if self.embedding_cache is not None:
+            stats["embeddings_documentos"] = self.embedding_cache.get_stats()
+        return stats
+
     @property
     def total_chunks(self) -> int:
         """Total de chunks indexados."""
@@ -186,7 +331,16 @@ class RAGManager:
         """
         if not incremental:
             self.limpar_indice()
-        
+        # Buscas concorrentes (indexação em background) veem o corpus parcial: a versão
+        # muda antes e depois da escrita, então nada cacheado no meio sobrevive a ela
+        self._incrementar_versao()
+        try:
+            return self._indexar(documentos, incremental, progress_callback)
+        finally:
+            self._incrementar_versao()
+
+    def _indexar(self, documentos: List[tuple], incremental: bool, progress_callback) -> dict:
+        """Sincroniza o manifesto e grava os documentos novos (ver indexar_documentos)."""
         # Pega hashes atuais da UI para sincronização
         def get_val(obj, attr, index):
             if isinstance(obj, (list, tuple)):
@@ -200,12 +354,14 @@ class RAGManager:
 
         hashes_atuais = set(get_val(d, 'hash', 2) for d in documentos)
         
-        # Pega coleção atual para verificar hashes
+        # Sincronização pelo manifesto local: O(documentos alterados), sem varrer a coleção
         try:
-            collection = self.chroma_client.get_collection(self.config.collection_name)
-            # Extrai hashes únicos já presentes na coleção
-            existing_metadata = collection.get(include=['metadatas'])['metadatas']
-            hashes_no_banco = set(m.get('hash') for m in existing_metadata if m.get('hash'))
+            colecao = self.colecao
+            if not self.manifest.existe:
+                # Migração: coleção anterior ao manifesto, varre uma única vez
+                self.manifest.reconstruir(colecao.metadatas())
+                self.manifest.salvar()
+            hashes_no_banco = self.manifest.hashes
             
             # Sincronização: Remove do banco o que não está mais na lista da UI
             hashes_para_deletar = hashes_no_banco - hashes_atuais
@@ -213,7 +369,10 @@ class RAGManager:
                 if progress_callback:
                     progress_callback(0.1, f"Limpando {len(hashes_para_deletar)} documentos antigos...")
                 # Deleta usando o filtro de metadados
-                collection.delete(where={"hash": {"$in": list(hashes_para_deletar)}})
+                colecao.remover_hashes(hashes_para_deletar)
+                self.manifest.remover(hashes_para_deletar)
+                self.manifest.salvar()
+                self.lexical_index.remover(hashes_para_deletar)
                 # Atualiza lista do que restou
                 hashes_no_banco = hashes_no_banco - hashes_para_deletar
         except Exception as e:
@@ -222,32 +381,47 @@ class RAGManager:
 
         todos_chunks = []
         documentos_langchain = []
+        novos_no_manifesto = []
         
         total_docs = len(documentos)
         docs_skipped = 0
         
+        stats_por_doc = []
+        # Índice BM25 só é alimentado no modo híbrido
+        hibrida = self.config.modo_busca == "hibrida"
+        hashes_lexicais = self.lexical_index.hashes() if hibrida else set()
+        
         for i, d in enumerate(documentos):
             nome = get_val(d, 'nome', 0)
-            conteudo = get_conteudo(d)
             doc_hash = get_val(d, 'hash', 2)
             
             if progress_callback:
                 progress_callback((i + 1) / (total_docs + 1), f"Processando {nome}...")
             
+            # Chunks por (hash, ChunkConfig): só documentos novos são lidos e processados
+            entrada = self.chunk_cache.get(doc_hash)
+            if entrada is None and getattr(d, 'tipo', None) == TipoArquivo.CSV and os.path.exists(d.caminho_cache):
+                # CSV: registros inteiros com cabeçalho por chunk, linhas descomprimidas sob demanda
+                entrada = self.chunk_cache.processar_csv(doc_hash, d.abrir_conteudo().linhas(), self.text_processor)
+            elif entrada is None:
+                entrada = self.chunk_cache.processar(doc_hash, get_conteudo(d), self.text_processor)
+            
             # Valida conteúdo
-            is_valid, msg = self.text_processor.validar_conteudo_extraido(conteudo)
-            if not is_valid:
-                print(f"⚠️ {nome}: {msg}")
+            if not entrada['valido']:
+                print(f"⚠️ {nome}: {entrada['mensagem']}")
                 continue
             
-            # Sempre gera chunks para o UI (processamento de texto é rápido)
-            chunks = self.text_processor.criar_chunks(conteudo, nome)
+            chunks = self.chunk_cache.chunks_para(entrada, nome)
             todos_chunks.extend(chunks)
+            stats_por_doc.append((nome, len(chunks), entrada['total_chars']))
+            if hibrida and doc_hash not in hashes_lexicais:
+                self.lexical_index.adicionar(doc_hash, chunks)
             
             # Só adiciona no LangChain se NÃO estiver no banco
             if incremental and doc_hash in hashes_no_banco:
                 docs_skipped += 1
             else:
+                novos_no_manifesto.append((doc_hash, nome, len(chunks)))
                 for chunk in chunks:
                     from langchain_core.documents import Document
                     doc = Document(
@@ -255,7 +429,8 @@ class RAGManager:
                         metadata={
                             "source": chunk.documento_origem,
                             "chunk_index": chunk.indice,
-                            "hash": doc_hash
+                            "hash": doc_hash,
+                            "tokens": chunk.tokens
                         }
                     )
                     documentos_langchain.append(doc)
@@ -267,11 +442,7 @@ class RAGManager:
         # Se não há nada NOVO para indexar
         if not documentos_langchain:
             # Garante que o vector store está conectado
-            self.vector_store = Chroma(
-                collection_name=self.config.collection_name,
-                embedding_function=self.embeddings,
-                client=self.chroma_client
-            )
+            self.vector_store = self._conectar_vector_store()
             
             # Atualiza session state com os chunks carregados
             self.session_state['rag_chunks'] = todos_chunks
@@ -281,8 +452,8 @@ class RAGManager:
             if progress_callback:
                 progress_callback(1.0, "Documentos sincronizados com sucesso.")
             
-            stats = self.text_processor.get_estatisticas(todos_chunks)
-            stats['documentos_indexados'] = len(set(c.documento_origem for c in todos_chunks))
+            stats = self.text_processor.somar_estatisticas(stats_por_doc)
+            stats['documentos_indexados'] = len(set(nome for nome, _, _ in stats_por_doc))
             stats['documentos_pulpados'] = docs_skipped
             stats['novos_documentos'] = 0
             
@@ -292,20 +463,13 @@ class RAGManager:
             progress_callback(0.9, "Atualizando embeddings...")
         
         # Adiciona novos documentos ao vector store existente ou cria um novo
-        try:
-            from langchain_chroma import Chroma
-        except ImportError:
-            from langchain_community.vectorstores import Chroma
+        if not (self.vector_store and incremental):
+            self.vector_store = self._conectar_vector_store()
+        self.vector_store.add_documents(documentos_langchain)
 
-        if self.vector_store and incremental:
-            self.vector_store.add_documents(documentos_langchain)
-        else:
-            self.vector_store = Chroma.from_documents(
-                documents=documentos_langchain,
-                embedding=self.embeddings,
-                collection_name=self.config.collection_name,
-                client=self.chroma_client
-            )
+        for doc_hash, nome, n_chunks in novos_no_manifesto:
+            self.manifest.adicionar(doc_hash, nome, n_chunks)
+        self.manifest.salvar()
         
         # Atualiza session state com todos os chunks processados
         self.session_state['rag_chunks'] = todos_chunks
@@ -316,10 +480,9 @@ class RAGManager:
         if progress_callback:
             progress_callback(1.0, "Concluído!")
         
-        # Estatísticas
-        chunks_finais = self.session_state['rag_chunks']
-        stats = self.text_processor.get_estatisticas(chunks_finais)
-        stats['documentos_indexados'] = len(set(c.documento_origem for c in chunks_finais))
+        # Estatísticas (agregadas por documento, sem percorrer os chunks)
+        stats = self.text_processor.somar_estatisticas(stats_por_doc)
+        stats['documentos_indexados'] = len(set(nome for nome, _, _ in stats_por_doc))
         stats['documentos_pulpados'] = docs_skipped
         
         return stats
@@ -346,27 +509,76 @@ class RAGManager:
         
         k = top_k or self.config.top_k
         
-        # Busca por similaridade
-        docs = self.vector_store.similarity_search(query, k=k)
+        modo = self.config.modo_busca
         
-        return docs
+        # Resultado reaproveitado enquanto o corpus não muda
+        return self._buscar_com_cache(
+            query, k, f"top_k:{modo}",
+            lambda: self._buscar_top_k(query, k, modo)
+        )
+
+    def _buscar_top_k(self, query: str, k: int, modo: str) -> List:
+        """Busca vetorial ou híbrida (BM25 + vetores combinados por RRF)."""
+        if modo != "hibrida" or not self.lexical_index.disponivel:
+            return self.vector_store.similarity_search(query, k=k)
+
+        # Atalho: termos exatos (autores, siglas, "METODOLOGIA") dispensam o embedding
+        if self.config.atalho_lexical:
+            exatos = self.lexical_index.buscar_exata(query, k)
+            if len(exatos) >= k:
+                return self._documentos_lexicais(exatos)
+
+        vetoriais = self.vector_store.similarity_search(query, k=k)
+        lexicais = self._documentos_lexicais(self.lexical_index.buscar(query, k))
+        fundidos = fusao_rrf(
+            [vetoriais, lexicais],
+            chave=lambda d: (d.metadata.get('source'), d.metadata.get('hash'), d.metadata.get('chunk_index')),
+            k=self.config.rrf_k
+        )
+        return fundidos[:k]
+
+    @staticmethod
+    def _documentos_lexicais(resultados: List[tuple]) -> List:
+        from langchain_core.documents import Document
+        return [Document(page_content=conteudo, metadata=metadata) for conteudo, metadata, _ in resultados]
 
     def buscar_em_todos_os_documentos(
         self, 
         query: str, 
-        k_por_doc: int = 3
+        k_por_doc: int = 3,
+        modo: str = None
     ) -> List:
         """
         Busca chunks mais relevantes em CADA um dos documentos indexados.
         Garante cobertura total do corpus.
+
+        Args:
+            query: Pergunta do usuário
+            k_por_doc: Chunks retornados por documento
+            modo: "agrupada" (query embutida uma vez, um único passo NumPy) ou
+                "por_fonte" (uma busca filtrada por documento). Padrão: config.
         """
         if not self.is_initialized or self.vector_store is None:
             return []
+
+        modo = modo or self.config.modo_busca_global
+        return self._buscar_com_cache(
+            query, k_por_doc, f"global:{modo}",
+            lambda: self._buscar_em_todos(query, k_por_doc, modo)
+        )
+
+    def _buscar_em_todos(self, query: str, k_por_doc: int, modo: str) -> List:
+        """Executa a busca global sem cache (ver buscar_em_todos_os_documentos)."""
+        if modo == "agrupada":
+            try:
+                docs = self._buscar_agrupado_por_fonte(query, k_por_doc)
+                if docs is not None:
+                    return docs
+            except Exception as e:
+                print(f"[RAG] Busca agrupada indisponível, usando busca por fonte: {e}")
             
         # Pega a lista de todos os fontes (sources) unicos
-        collection = self.chroma_client.get_collection(self.config.collection_name)
-        metadata = collection.get(include=['metadatas'])['metadatas']
-        sources = list(set(m.get('source') for m in metadata if m.get('source')))
+        sources = self.colecao.fontes()
         
         documentos_finais = []
         for source in sources:
@@ -380,6 +592,29 @@ class RAGManager:
             
         return documentos_finais
 
+    def _buscar_agrupado_por_fonte(self, query: str, k_por_doc: int) -> Optional[List]:
+        """
+        Top-k por documento em um único passo: embute a query uma vez e pontua
+        todos os vetores da coleção com um produto matricial.
+        Retorna None se a coleção não expõe os vetores (cai no modo por fonte).
+        """
+        from langchain_core.documents import Document
+
+        pontuados = self.colecao.pontuar(self.embeddings.embed_query(query))
+        if pontuados is None:
+            return None
+        scores, documentos, metadatas = pontuados
+        if len(documentos) == 0:
+            return []
+
+        fontes = [m.get('source', '') for m in metadatas]
+        selecionados = top_k_por_grupo(scores, fontes, k_por_doc)
+
+        return [
+            Document(page_content=documentos[i], metadata=metadatas[i])
+            for i in selecionados
+        ]
+
     def buscar_com_scores(
         self, 
         query: str, 
@@ -400,14 +635,28 @@ class RAGManager:
         
         return docs_with_scores
 
-    def get_contexto_para_prompt(self, query: str, top_k: int = None, cobertura_total: bool = False) -> str:
+    def orcamento_tokens(self, agente: str = None) -> int:
+        """Orçamento de tokens do contexto para o agente (padrão: max_tokens_contexto)."""
+        return self.config.max_tokens_por_agente.get(agente, self.config.max_tokens_contexto)
+
+    def get_contexto_para_prompt(
+        self,
+        query: str,
+        top_k: int = None,
+        cobertura_total: bool = False,
+        agente: str = None
+    ) -> str:
         """
         Retorna contexto formatado para incluir no prompt.
         
+        Chunks adjacentes do mesmo documento são fundidos (sem repetir o
+        overlap) e o total respeita o orçamento de tokens do agente.
+        
         Args:
             query: Pergunta do usuário
             top_k: Número de chunks a retornar (se cobertura_total=False)
             cobertura_total: Se True, busca em todos os documentos individualmente.
+            agente: Agente que consome o contexto (define o orçamento de tokens)
             
         Returns:
             String formatada com os chunks relevantes
@@ -420,11 +669,15 @@ class RAGManager:
         if not docs:
             return ""
         
+        trechos = empacotar_contexto(
+            docs,
+            self.orcamento_tokens(agente),
+            max_sobreposicao=self.config.chunk_overlap
+        )
         contexto_partes = []
-        for i, doc in enumerate(docs, 1):
-            source = doc.metadata.get('source', 'Desconhecido')
+        for i, trecho in enumerate(trechos, 1):
             contexto_partes.append(
-                f"--- CONTEÚDO DO DOCUMENTO: {source} (Fragmento {i}) ---\n{doc.page_content}"
+                f"--- CONTEÚDO DO DOCUMENTO: {trecho.source} (Fragmento {i}) ---\n{trecho.conteudo}"
             )
         
         return "\n\n".join(contexto_partes)
@@ -433,24 +686,56 @@ class RAGManager:
 
     def limpar_indice(self):
         """Limpa o índice atual."""
-        # Reseta collection no ChromaDB
-        try:
-            self.chroma_client.delete_collection(self.config.collection_name)
-        except:
-            pass  # Collection pode não existir
+        # Reseta a collection no backend vetorial
+        self.colecao.apagar()
+        self.manifest.apagar()
+        self.lexical_index.limpar()
         
         self.session_state['vector_store'] = None
         self.session_state['rag_chunks'] = []
         self.session_state['rag_initialized'] = False
         self.vector_store = None
+        self._incrementar_versao()
 
     def get_estatisticas(self) -> dict:
         """Retorna estatísticas do índice atual."""
         chunks = self.session_state.get('rag_chunks', [])
         return self.text_processor.get_estatisticas(chunks)
 
-    def purgar_fisicamente(self):
-        """Deleta fisicamente todas as pastas de dados locais (usando reset para o Chroma)."""
+    def purgar_fisicamente(self, manter_conteudo: Iterable[str] = ()):
+        """
+        Apaga fisicamente os dados desta sessão: coleção (Chroma ou flat), manifesto,
+        índice lexical e os textos em .tmp/content dos documentos indexados que não
+        estão em `manter_conteudo`. As coleções das demais sessões não são tocadas.
+        """
+        try:
+            hashes = self.manifest.hashes | self.lexical_index.hashes()
+        except Exception:
+            hashes = self.manifest.hashes  # Índice lexical ilegível: só o manifesto
+        self.limpar_indice()
+
+        if self.config.vector_backend == "flat":
+            descartar_flat_store(self.collection_name, apagar=True)
+        try:
+            self.lexical_index.apagar()
+        except OSError as e:
+            print(f"Aviso: Erro ao apagar índice lexical: {e}")
+        self.lexical_index = LexicalIndex(self.collection_name, self.lexical_index.dir)
+
+        # Textos são endereçados por conteúdo: só os desta sessão que não serão reindexados
+        content_store = get_content_store()
+        try:
+            for content_hash in hashes - set(manter_conteudo):
+                content_store.remover(content_hash)
+        except OSError as e:
+            return False, f"❌ Erro ao purgar cache de texto: {str(e)}"
+        return True, "✅ Dados da sessão purgados com sucesso."
+
+    def purgar_todas_as_sessoes(self):
+        """
+        Reset administrativo do processo: apaga todas as coleções (reset do Chroma),
+        manifestos, índices lexicais e flat e todo o .tmp/content. Afeta todas as sessões.
+        """
         self.limpar_indice()
         
         # 1. Reset do ChromaDB (mais seguro que rm -rf no Windows com o arquivo aberto)
@@ -458,6 +743,12 @@ class RAGManager:
             self.chroma_client.reset()
         except Exception as e:
             print(f"Aviso: Erro ao resetar Chroma: {e}")
+        # O reset apaga todas as coleções do processo: manifestos ficam obsoletos
+        IndexManifest.apagar_todos()
+        LexicalIndex.apagar_todos()
+        descartar_flat_stores()
+        FlatVectorStore.apagar_todos()
+        self.lexical_index = LexicalIndex(self.collection_name)
 
         # 2. Limpeza do cache de texto em .tmp/content/
         base_tmp = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '.tmp'))
@@ -0,0 +1,78 @@
+# services/retrieval_cache.py
+"""Cache LRU em memória para embeddings de consulta e resultados de busca."""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable
+
+
+_AUSENTE = object()
+
+
+class LRUCache:
+    """
+    Cache LRU thread-safe com contadores de acerto.
+
+    Os contadores (hits/misses/evictions) servem para dimensionar `maxsize`.
+    """
+
+    def __init__(self, maxsize: int = 128):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._dados: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, chave: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            valor = self._dados.get(chave, _AUSENTE)
+            if valor is _AUSENTE:
+                self.misses += 1
+                return default
+            self._dados.move_to_end(chave)
+            self.hits += 1
+            return valor
+
+    def put(self, chave: Hashable, valor: Any) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._dados[chave] = valor
+            self._dados.move_to_end(chave)
+            while len(self._dados) > self.maxsize:
+                self._dados.popitem(last=False)
+                self.evictions += 1
+
+    def limpar(self) -> None:
+        with self._lock:
+            self._dados.clear()
+
+    def __len__(self) -> int:
+        return len(self._dados)
+
+    def __contains__(self, chave: Hashable) -> bool:
+        return chave in self._dados
+
+    def get_stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "tamanho": len(self._dados),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+_query_caches: Dict[str, LRUCache] = {}
+_query_caches_lock = threading.Lock()
+
+
+def get_query_cache(namespace: str, maxsize: int = 256) -> LRUCache:
+    """Cache de embeddings de consulta compartilhado pelo processo (por modelo)."""
+    with _query_caches_lock:
+        if namespace not in _query_caches:
+            _query_caches[namespace] = LRUCache(maxsize)
+        return _query_caches[namespace]
@@ -0,0 +1,270 @@
+# services/scheduler.py
+"""Controle de admissão e escalonamento justo (entre sessões) do trabalho de LLM e de indexação."""
+
+import math
+import time
+import asyncio
+import threading
+from collections import OrderedDict, deque
+from typing import Any, Dict, List, Optional, Tuple
+
+from config.settings import SCHEDULER_CONFIG
+
+
+class AdmissaoNegadaError(RuntimeError):
+    """Limite de concorrência ou de fila atingido; `retry_after` sugere quando tentar de novo (s)."""
+
+    def __init__(self, mensagem: str, retry_after: int = 1):
+        super().__init__(mensagem)
+        self.retry_after = retry_after
+
+
+class FilaJusta:
+    """
+    Fila de admissão com limites globais e por sessão.
+
+    - Até `max_execucao` itens executam ao mesmo tempo, no máximo
+      `max_execucao_por_sessao` de cada sessão.
+    - O excedente espera em filas por sessão (FIFO dentro da sessão); ao liberar
+      um slot, as sessões são atendidas em rodízio, então uma sessão com muitos
+      itens não atrasa as demais.
+    - Acima de `max_fila` itens aguardando (ou `max_fila_por_sessao` da mesma
+      sessão) a admissão falha na hora com AdmissaoNegadaError.
+
+    Thread-safe e não bloqueante: quem usa decide como esperar a vez (future do
+    asyncio, executor...). Os itens despachados já saem com o slot reservado.
+    """
+
+    def __init__(self, nome: str, max_execucao: int, max_execucao_por_sessao: int,
+                 max_fila: int, max_fila_por_sessao: int, duracao_inicial: float = 5.0):
+        self.nome = nome
+        self.max_execucao = max_execucao
+        self.max_execucao_por_sessao = max_execucao_por_sessao
+        self.max_fila = max_fila
+        self.max_fila_por_sessao = max_fila_por_sessao
+        self._filas: "OrderedDict[str, deque]" = OrderedDict()  # Ordem = vez no rodízio
+        self._executando: Dict[str, int] = {}
+        self._em_execucao = 0
+        self._na_fila = 0
+        self._lock = threading.Lock()
+        # Médias móveis (EWMA) usadas na estimativa do Retry-After
+        self._duracao_media = duracao_inicial
+        self._espera_media = 0.0
+        self.admitidas = 0
+        self.enfileiradas = 0
+        self.rejeitadas = 0
+        self.desistencias = 0
+        self.pico_fila = 0
+
+    # ==================== ADMISSÃO ====================
+
+    def admitir(self, session_id: str, item: Any) -> bool:
+        """
+        True: o item pode executar já (slot reservado). False: entrou na fila e
+        sairá por `liberar`. Levanta AdmissaoNegadaError se não há vaga na fila.
+        """
+        with self._lock:
+            if (self._em_execucao < self.max_execucao
+                    and self._executando.get(session_id, 0) < self.max_execucao_por_sessao
+                    and not self._filas.get(session_id)):
+                self._reservar(session_id)
+                self.admitidas += 1
+                return True
+
+            na_fila_sessao = len(self._filas.get(session_id, ()))
+            if na_fila_sessao >= self.max_fila_por_sessao:
+                self.rejeitadas += 1
+                raise AdmissaoNegadaError(
+                    f"Limite de {self.nome} da sessão atingido ({na_fila_sessao} aguardando).",
+                    self._retry_after(na_fila_sessao + 1, self.max_execucao_por_sessao)
+                )
+            if self._na_fila >= self.max_fila:
+                self.rejeitadas += 1
+                raise AdmissaoNegadaError(
+                    f"Fila de {self.nome} cheia ({self._na_fila} aguardando).",
+                    self._retry_after(self._na_fila + 1, self.max_execucao)
+                )
+
+            self._filas.setdefault(session_id, deque()).append((item, time.monotonic()))
+            self._na_fila += 1
+            self.enfileiradas += 1
+            self.pico_fila = max(self.pico_fila, self._na_fila)
+            return False
+
+    def cancelar(self, session_id: str, item: Any) -> bool:
+        """Retira um item que ainda aguarda; False se ele já foi despachado."""
+        with self._lock:
+            fila = self._filas.get(session_id)
+            if not fila:
+                return False
+            for entrada in fila:
+                if entrada[0] is item:
+                    fila.remove(entrada)
+                    break
+            else:
+                return False
+            if not fila:
+                del self._filas[session_id]
+            self._na_fila -= 1
+            self.desistencias += 1
+            return True
+
+    def liberar(self, session_id: str, duracao: Optional[float] = None) -> List[Tuple[str, Any]]:
+        """Devolve o slot da sessão; retorna os (session_id, item) despachados em seguida."""
+        with self._lock:
+            restantes = self._executando.get(session_id, 0) - 1
+            if restantes > 0:
+                self._executando[session_id] = restantes
+            else:
+                self._executando.pop(session_id, None)
+            self._em_execucao -= 1
+            if duracao is not None:
+                self._duracao_media = 0.8 * self._duracao_media + 0.2 * duracao
+            return self._despachar()
+
+    def esvaziar(self) -> List[Tuple[str, Any]]:
+        """Retira todos os itens que aguardam (ex.: no encerramento); os em execução seguem."""
+        with self._lock:
+            itens = [(sid, item) for sid, fila in self._filas.items() for item, _ in fila]
+            self._filas.clear()
+            self._na_fila = 0
+            self.desistencias += len(itens)
+            return itens
+
+    def sessao_ativa(self, session_id: str) -> bool:
+        """Se a sessão tem item em execução ou aguardando a vez."""
+        with self._lock:
+            return bool(self._executando.get(session_id) or self._filas.get(session_id))
+
+    # ==================== INTERNOS ====================
+
+    def _reservar(self, session_id: str) -> None:
+        self._executando[session_id] = self._executando.get(session_id, 0) + 1
+        self._em_execucao += 1
+
+    def _despachar(self) -> List[Tuple[str, Any]]:
+        despachados = []
+        while self._em_execucao < self.max_execucao:
+            escolhida = next(
+                (sid for sid, fila in self._filas.items()
+                 if fila and self._executando.get(sid, 0) < self.max_execucao_por_sessao),
+                None
+            )
+            if escolhida is None:
+                break
+            fila = self._filas[escolhida]
+            item, entrada = fila.popleft()
+            if fila:
+                self._filas.move_to_end(escolhida)  # Próxima vez dela só depois das demais
+            else:
+                del self._filas[escolhida]
+            self._na_fila -= 1
+            self._espera_media = 0.8 * self._espera_media + 0.2 * (time.monotonic() - entrada)
+            self._reservar(escolhida)
+            self.admitidas += 1
+            despachados.append((escolhida, item))
+        return despachados
+
+    def _retry_after(self, posicao: int, vazao: int) -> int:
+        """Segundos estimados até liberar a posição dada, pela duração média observada."""
+        return max(1, math.ceil(posicao * self._duracao_media / max(1, vazao)))
+
+    def retry_after(self) -> int:
+        with self._lock:
+            return self._retry_after(self._na_fila + 1, self.max_execucao)
+
+    def get_metricas(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "nome": self.nome,
+                "em_execucao": self._em_execucao,
+                "na_fila": self._na_fila,
+                "max_execucao": self.max_execucao,
+                "max_execucao_por_sessao": self.max_execucao_por_sessao,
+                "max_fila": self.max_fila,
+                "max_fila_por_sessao": self.max_fila_por_sessao,
+                "fila_por_sessao": {sid: len(fila) for sid, fila in self._filas.items()},
+                "execucao_por_sessao": dict(self._executando),
+                "pico_fila": self.pico_fila,
+                "admitidas": self.admitidas,
+                "enfileiradas": self.enfileiradas,
+                "rejeitadas": self.rejeitadas,
+                "desistencias": self.desistencias,
+                "espera_media_segundos": round(self._espera_media, 3),
+                "duracao_media_segundos": round(self._duracao_media, 3),
+            }
+
+
+class Permissao:
+    """Slot obtido do Escalonador; `liberar` é idempotente."""
+
+    def __init__(self, escalonador: "Escalonador", session_id: str):
+        self._escalonador = escalonador
+        self.session_id = session_id
+        self._inicio = time.monotonic()
+        self._liberada = False
+
+    def liberar(self) -> None:
+        if self._liberada:
+            return
+        self._liberada = True
+        self._escalonador._liberar(self.session_id, time.monotonic() - self._inicio)
+
+
+class Escalonador:
+    """
+    Permissões assíncronas sobre uma FilaJusta: quem não tem vaga imediata espera
+    a vez sem bloquear o event loop, por até `max_espera` segundos; depois disso
+    (ou com a fila cheia) recebe AdmissaoNegadaError com o Retry-After estimado.
+    """
+
+    def __init__(self, fila: FilaJusta, max_espera: float):
+        self.fila = fila
+        self.max_espera = max_espera
+
+    async def adquirir(self, session_id: str) -> Permissao:
+        futuro = asyncio.get_running_loop().create_future()
+        if not self.fila.admitir(session_id, futuro):
+            try:
+                await asyncio.wait_for(asyncio.shield(futuro), timeout=self.max_espera)
+            except asyncio.TimeoutError:
+                if self.fila.cancelar(session_id, futuro):
+                    raise AdmissaoNegadaError(
+                        f"Tempo de espera por {self.fila.nome} esgotado ({self.max_espera:.0f}s).",
+                        self.fila.retry_after()
+                    )
+                # Despachado no limite do prazo: segue com o slot
+            except asyncio.CancelledError:
+                if not self.fila.cancelar(session_id, futuro):
+                    self._liberar(session_id, None)
+                raise
+        return Permissao(self, session_id)
+
+    def sessao_ocupada(self, session_id: str) -> bool:
+        """Se a sessão tem permissão em uso ou pedido na fila (ex.: stream de chat em andamento)."""
+        return self.fila.sessao_ativa(session_id)
+
+    def _liberar(self, session_id: str, duracao: Optional[float]) -> None:
+        for _, futuro in self.fila.liberar(session_id, duracao):
+            futuro.get_loop().call_soon_threadsafe(_conceder, futuro)
+
+    def get_metricas(self) -> Dict[str, Any]:
+        return {**self.fila.get_metricas(), "max_espera_segundos": self.max_espera}
+
+
+def _conceder(futuro: asyncio.Future) -> None:
+    if not futuro.done():
+        futuro.set_result(True)
+
+
+# Streams de chat (triagem + geração + extração de estrutura) do processo
+ESCALONADOR_LLM = Escalonador(
+    FilaJusta(
+        "LLM",
+        max_execucao=SCHEDULER_CONFIG.llm_max_execucao,
+        max_execucao_por_sessao=SCHEDULER_CONFIG.llm_max_execucao_por_sessao,
+        max_fila=SCHEDULER_CONFIG.llm_max_fila,
+        max_fila_por_sessao=SCHEDULER_CONFIG.llm_max_fila_por_sessao,
+    ),
+    max_espera=SCHEDULER_CONFIG.llm_max_espera_segundos,
+)
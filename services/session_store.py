@@ -0,0 +1,326 @@
+# services/session_store.py
+"""Armazenamento limitado das sessões da API (LRU + TTL) com backends plugáveis."""
+
+import os
+import sys
+import json
+import time
+import sqlite3
+import threading
+import dataclasses
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime
+from enum import Enum
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+
+# Partes do session_state que sobrevivem à expulsão no backend SQLite.
+# O restante (LLM, chain, RAGManager, vector store, chunks) é recriado sob demanda.
+CHAVES_PERSISTENTES = (
+    'session_id', 'mensagens', 'documentos', 'usar_rag', 'agente_ativo', 'active_doc_id',
+    'rag_stats', 'current_structure', 'completed_sections', 'sections_queue',
+    'pending_section',
+)
+
+# Hook de expulsão: (session_id, state, motivo) — motivo: "lru" | "ttl" | "removida"
+HookExpulsao = Callable[[str, Dict[str, Any], str], None]
+
+
+def tamanho_aproximado(obj: Any, _vistos: set = None) -> int:
+    """
+    Bytes aproximados de um objeto: percorre contêineres e dataclasses (ex.: TextChunk,
+    DocumentoCarregado); demais objetos (clientes, modelos) contam só o próprio tamanho.
+    """
+    vistos = _vistos if _vistos is not None else set()
+    if id(obj) in vistos:
+        return 0
+    vistos.add(id(obj))
+    tamanho = sys.getsizeof(obj)
+    # Contêineres são copiados antes da descida: outras threads podem alterá-los durante a medição
+    if isinstance(obj, dict):
+        tamanho += sum(tamanho_aproximado(k, vistos) + tamanho_aproximado(v, vistos) for k, v in list(obj.items()))
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        tamanho += sum(tamanho_aproximado(item, vistos) for item in list(obj))
+    elif dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        tamanho += sum(tamanho_aproximado(getattr(obj, f.name), vistos) for f in dataclasses.fields(obj))
+    return tamanho
+
+
+def _tamanho_sessao(state: Dict[str, Any], tentativas: int = 3) -> Optional[int]:
+    """tamanho_aproximado tolerante a mutações concorrentes; None se todas as tentativas colidirem."""
+    for _ in range(tentativas):
+        try:
+            return tamanho_aproximado(state)
+        except RuntimeError:
+            continue  # "changed size during iteration" na cópia: mede de novo
+    return None
+
+
+class SessionStore(ABC):
+    """
+    Sessões vivas em memória, limitadas por quantidade (LRU) e por inatividade (TTL).
+
+    - `obter` cria a sessão pela fábrica (ou a reidrata do backend) e a marca como usada.
+    - Ao exceder `max_sessoes`, a menos usada recentemente é expulsa; sessões sem
+      acesso há mais de `ttl_segundos` expiram. A verificação é amortizada: só as
+      sessões vencidas do início da fila LRU são visitadas.
+    - Sessões para as quais `protegida(session_id)` é verdadeiro (ex.: job de
+      indexação ou stream de chat em andamento) não são expulsas.
+    - Os hooks de `ao_expulsar` rodam fora do lock, depois da persistência.
+    """
+
+    # Se a sessão expulsa pode voltar (reidratada do backend) com os mesmos documentos
+    persistente = True
+
+    def __init__(self, max_sessoes: int, ttl_segundos: float, relogio: Callable[[], float] = time.monotonic):
+        self.max_sessoes = max_sessoes
+        self.ttl_segundos = ttl_segundos
+        self._relogio = relogio
+        self._sessoes: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._acessos: Dict[str, float] = {}
+        self._hooks: List[HookExpulsao] = []
+        self._lock = threading.RLock()
+        self.protegida: Callable[[str], bool] = lambda session_id: False
+        self.expulsas = {"lru": 0, "ttl": 0, "removida": 0}
+        self.reidratadas = 0
+
+    # ==================== BACKEND ====================
+
+    @abstractmethod
+    def _carregar(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Estado persistido da sessão, ou None."""
+
+    @abstractmethod
+    def _persistir(self, session_id: str, state: Dict[str, Any]) -> None:
+        """Grava as partes serializáveis do estado."""
+
+    @abstractmethod
+    def _apagar(self, session_id: str) -> None:
+        """Remove o estado persistido."""
+
+    # ==================== API ====================
+
+    def ao_expulsar(self, hook: HookExpulsao) -> None:
+        self._hooks.append(hook)
+
+    def obter(self, session_id: str, fabrica: Callable[[str], Dict[str, Any]]) -> Dict[str, Any]:
+        """Sessão viva (criada ou reidratada se necessário), marcada como a mais recente."""
+        with self._lock:
+            expulsas = self._coletar_vencidas()
+            state = self._sessoes.get(session_id)
+            if state is None:
+                persistido = self._carregar(session_id)
+                state = fabrica(session_id)
+                if persistido:
+                    state.update(persistido)
+                    self.reidratadas += 1
+                self._sessoes[session_id] = state
+            self._sessoes.move_to_end(session_id)
+            self._acessos[session_id] = self._relogio()
+            expulsas += self._coletar_excedentes()
+        self._notificar(expulsas)
+        return state
+
+    def get(self, session_id: str, padrao: Any = None) -> Any:
+        """Sessão viva sem criar nem alterar a ordem LRU (como dict.get)."""
+        with self._lock:
+            return self._sessoes.get(session_id, padrao)
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._sessoes
+
+    def __len__(self) -> int:
+        return len(self._sessoes)
+
+    def remover(self, session_id: str) -> bool:
+        """Encerra a sessão: dispara os hooks e apaga o estado persistido."""
+        with self._lock:
+            state = self._sessoes.pop(session_id, None)
+            self._acessos.pop(session_id, None)
+            self._apagar(session_id)
+        if state is None:
+            return False
+        self.expulsas["removida"] += 1
+        self._notificar([(session_id, state, "removida")])
+        return True
+
+    def expirar(self) -> int:
+        """Expulsa agora todas as sessões vencidas; retorna quantas."""
+        with self._lock:
+            expulsas = self._coletar_vencidas()
+        self._notificar(expulsas)
+        return len(expulsas)
+
+    def salvar(self, session_id: str) -> None:
+        """Persiste a sessão viva (no-op no backend em memória)."""
+        with self._lock:
+            state = self._sessoes.get(session_id)
+            if state is not None:
+                self._persistir(session_id, state)
+
+    def salvar_todas(self) -> None:
+        with self._lock:
+            for session_id, state in self._sessoes.items():
+                self._persistir(session_id, state)
+
+    def get_metricas(self) -> Dict[str, Any]:
+        with self._lock:
+            itens = list(self._sessoes.items())
+        por_sessao = {session_id: _tamanho_sessao(state) for session_id, state in itens}
+        return {
+            "backend": type(self).__name__,
+            "sessoes_ativas": len(itens),
+            "max_sessoes": self.max_sessoes,
+            "ttl_segundos": self.ttl_segundos,
+            "expulsas": dict(self.expulsas),
+            "reidratadas": self.reidratadas,
+            "bytes_total": sum(b for b in por_sessao.values() if b is not None),
+            "bytes_por_sessao": por_sessao,
+        }
+
+    # ==================== EXPULSÃO ====================
+
+    def _expulsar(self, session_id: str, motivo: str) -> Tuple[str, Dict[str, Any], str]:
+        state = self._sessoes.pop(session_id)
+        self._acessos.pop(session_id, None)
+        self._persistir(session_id, state)
+        self.expulsas[motivo] += 1
+        return session_id, state, motivo
+
+    def _coletar_vencidas(self) -> list:
+        limite = self._relogio() - self.ttl_segundos
+        expulsas = []
+        for session_id in list(self._sessoes):
+            if self._acessos.get(session_id, 0) > limite:
+                break  # Ordem LRU: as seguintes foram acessadas depois
+            if not self.protegida(session_id):
+                expulsas.append(self._expulsar(session_id, "ttl"))
+        return expulsas
+
+    def _coletar_excedentes(self) -> list:
+        expulsas = []
+        excedente = len(self._sessoes) - self.max_sessoes
+        if excedente <= 0:
+            return expulsas
+        mais_recente = next(reversed(self._sessoes))
+        for session_id in list(self._sessoes):
+            if len(expulsas) >= excedente:
+                break
+            if session_id != mais_recente and not self.protegida(session_id):
+                expulsas.append(self._expulsar(session_id, "lru"))
+        return expulsas
+
+    def _notificar(self, expulsas: list) -> None:
+        for session_id, state, motivo in expulsas:
+            for hook in self._hooks:
+                try:
+                    hook(session_id, state, motivo)
+                except Exception as e:
+                    print(f"[SESSOES] Erro no hook de expulsão de {session_id}: {e}")
+
+
+class MemorySessionStore(SessionStore):
+    """Backend só em memória: a sessão expulsa é descartada."""
+
+    persistente = False
+
+    def _carregar(self, session_id: str) -> Optional[Dict[str, Any]]:
+        return None
+
+    def _persistir(self, session_id: str, state: Dict[str, Any]) -> None:
+        pass
+
+    def _apagar(self, session_id: str) -> None:
+        pass
+
+
+def _para_json(valor: Any) -> Any:
+    if dataclasses.is_dataclass(valor) and not isinstance(valor, type):
+        return dataclasses.asdict(valor)
+    if isinstance(valor, Enum):
+        return valor.value
+    if isinstance(valor, datetime):
+        return valor.isoformat()
+    if hasattr(valor, "model_dump"):
+        return valor.model_dump()
+    return str(valor)
+
+
+class SqliteSessionStore(SessionStore):
+    """
+    Backend SQLite: ao ser expulsa (ou em `salvar`), a sessão grava as partes
+    serializáveis (CHAVES_PERSISTENTES) e é reidratada no próximo acesso.
+    Linhas sem atualização há mais de `retencao_segundos` são apagadas em `expirar`.
+    """
+
+    def __init__(self, caminho: str, max_sessoes: int, ttl_segundos: float,
+                 retencao_segundos: float = 7 * 24 * 3600, relogio: Callable[[], float] = time.monotonic):
+        super().__init__(max_sessoes, ttl_segundos, relogio)
+        self.caminho = caminho
+        self.retencao_segundos = retencao_segundos
+        os.makedirs(os.path.dirname(caminho) or '.', exist_ok=True)
+        with self._conectar() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessoes ("
+                "session_id TEXT PRIMARY KEY, dados TEXT NOT NULL, atualizado_em REAL NOT NULL)"
+            )
+
+    @contextmanager
+    def _conectar(self) -> Iterator[sqlite3.Connection]:
+        """Conexão curta (commit ao final e fechamento explícito)."""
+        conn = sqlite3.connect(self.caminho, timeout=10)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _carregar(self, session_id: str) -> Optional[Dict[str, Any]]:
+        with self._conectar() as conn:
+            linha = conn.execute("SELECT dados FROM sessoes WHERE session_id = ?", (session_id,)).fetchone()
+        if not linha:
+            return None
+        dados = json.loads(linha[0])
+        if dados.get('documentos'):
+            from services.upload_manager import DocumentoCarregado
+            dados['documentos'] = [DocumentoCarregado.de_dict(d) for d in dados['documentos']]
+        return dados
+
+    def _persistir(self, session_id: str, state: Dict[str, Any]) -> None:
+        dados = {k: state[k] for k in CHAVES_PERSISTENTES if k in state}
+        with self._conectar() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO sessoes (session_id, dados, atualizado_em) VALUES (?, ?, ?)",
+                (session_id, json.dumps(dados, ensure_ascii=False, default=_para_json), time.time())
+            )
+
+    def _apagar(self, session_id: str) -> None:
+        with self._conectar() as conn:
+            conn.execute("DELETE FROM sessoes WHERE session_id = ?", (session_id,))
+
+    def expirar(self) -> int:
+        total = super().expirar()
+        with self._lock, self._conectar() as conn:
+            conn.execute("DELETE FROM sessoes WHERE atualizado_em < ?", (time.time() - self.retencao_segundos,))
+        return total
+
+    def persistidas(self) -> int:
+        with self._conectar() as conn:
+            return conn.execute("SELECT COUNT(*) FROM sessoes").fetchone()[0]
+
+    def get_metricas(self) -> Dict[str, Any]:
+        metricas = super().get_metricas()
+        metricas["sessoes_persistidas"] = self.persistidas()
+        return metricas
+
+
+def criar_session_store(config) -> SessionStore:
+    """Instancia o backend configurado em SessionConfig."""
+    if config.backend == "sqlite":
+        return SqliteSessionStore(config.caminho_sqlite, config.max_sessoes, config.ttl_segundos)
+    if config.backend == "memoria":
+        return MemorySessionStore(config.max_sessoes, config.ttl_segundos)
+    raise ValueError(f"Backend de sessões desconhecido: {config.backend}")
@@ -1,12 +1,38 @@
 # services/text_processor.py
 """Processador de texto para RAG - chunking, limpeza e validação."""
 
+import io
 import re
+import csv
 from dataclasses import dataclass
-from typing import List, Optional, Tuple
+from typing import Iterable, Iterator, List, Optional, Tuple
 
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 
+
+_encoder = None
+_encoder_indisponivel = False
+
+
+def contar_tokens(texto: str) -> int:
+    """
+    Tokens do texto no encoding cl100k_base (tiktoken).
+    Sem o arquivo BPE (ex.: ambiente offline), estima ~4 caracteres por token.
+    """
+    global _encoder, _encoder_indisponivel
+    if not texto:
+        return 0
+    if _encoder is None and not _encoder_indisponivel:
+        try:
+            import tiktoken
+            _encoder = tiktoken.get_encoding("cl100k_base")
+        except Exception as e:
+            print(f"[TOKENS] tiktoken indisponível, usando estimativa por caracteres: {e}")
+            _encoder_indisponivel = True
+    if _encoder is not None:
+        return len(_encoder.encode(texto, disallowed_special=()))
+    return max(1, (len(texto) + 3) // 4)
+
 @dataclass
 class ChunkConfig:
     """Configurações de chunking."""
@@ -25,6 +51,62 @@ class TextChunk:
     indice: int
     documento_origem: str
     total_chars: int
+    tokens: int = 0
+
+
+class ValidacaoConteudo:
+    """
+    Critérios de `TextProcessor.validar_conteudo_extraido` acumulados parte a
+    parte, para validar conteúdo que chega em streaming (ex.: chunks de CSV).
+    """
+
+    def __init__(self, processor: "TextProcessor"):
+        self.processor = processor
+        self.recebido = False
+        self.chars = 0
+        self.palavras = 0
+        self.chars_estranhos = 0
+        self.bloqueio_js = False
+
+    def adicionar(self, texto: str) -> None:
+        self.recebido = self.recebido or bool(texto)
+        texto_limpo = self.processor.limpar_texto(texto)
+        if not texto_limpo:
+            return
+        self.chars += len(texto_limpo)
+        self.palavras += len(texto_limpo.split())
+        self.chars_estranhos += len(re.findall(r'[^\w\s\.,;:!?\-\(\)\[\]\"\'áéíóúàèìòùâêîôûãõäëïöüç]', texto_limpo, re.IGNORECASE))
+        texto_lower = texto_limpo.lower()
+        if "enable javascript" in texto_lower or "just a moment" in texto_lower:
+            self.bloqueio_js = True
+
+    def resultado(self) -> Tuple[bool, str]:
+        if not self.recebido:
+            return False, "Nenhum conteúdo extraído."
+        
+        # Muito curto
+        if self.chars < 50:
+            return False, "Conteúdo muito curto (< 50 caracteres)."
+        
+        # Detecta possíveis problemas de extração
+        problemas = []
+        
+        # PDF protegido ou escaneado (muito pouco texto legível)
+        if self.palavras < 10:
+            problemas.append("Poucas palavras extraídas (possível PDF escaneado ou protegido)")
+        
+        # Muitos caracteres estranhos
+        if self.chars_estranhos / self.chars > 0.1:
+            problemas.append("Muitos caracteres não reconhecidos (possível problema de encoding)")
+        
+        # Texto de bloqueio JavaScript
+        if self.bloqueio_js:
+            problemas.append("Conteúdo bloqueado por JavaScript")
+        
+        if problemas:
+            return False, " | ".join(problemas)
+        
+        return True, "Conteúdo válido"
 
 
 class TextProcessor:
@@ -124,12 +206,60 @@ class TextProcessor:
                 conteudo=chunk_texto,
                 indice=i,
                 documento_origem=documento_nome,
-                total_chars=len(chunk_texto)
+                total_chars=len(chunk_texto),
+                tokens=contar_tokens(chunk_texto)
             )
             chunks.append(chunk)
         
         return chunks
 
+    @staticmethod
+    def _linha_csv(celulas: List[str]) -> str:
+        buffer = io.StringIO()
+        csv.writer(buffer, lineterminator='').writerow(celulas)
+        return buffer.getvalue()
+
+    def criar_chunks_csv(self, linhas: Iterable[str], documento_nome: str) -> Iterator[TextChunk]:
+        """
+        Chunking de CSV por registros inteiros, com o cabeçalho repetido em cada chunk.
+
+        Lê as linhas sob demanda (aceita um arquivo aberto com newline='') e emite
+        os chunks à medida que ficam prontos: a memória não cresce com o arquivo.
+        Um registro maior que chunk_size vira um chunk sozinho (nunca é cortado).
+        """
+        cabecalho = None
+        registros: List[str] = []
+        tamanho = 0
+        indice = 0
+
+        def emitir():
+            conteudo = '\n'.join([cabecalho] + registros)
+            return TextChunk(
+                conteudo=conteudo,
+                indice=indice,
+                documento_origem=documento_nome,
+                total_chars=len(conteudo),
+                tokens=contar_tokens(conteudo)
+            )
+
+        for celulas in csv.reader(linhas):
+            celulas = [self.limpar_texto(c).replace('\n', ' ') for c in celulas]
+            if not any(celulas):
+                continue
+            linha = self._linha_csv(celulas)
+            if cabecalho is None:
+                cabecalho = linha
+                continue
+            if registros and len(cabecalho) + tamanho + len(linha) + 1 > self.config.chunk_size:
+                yield emitir()
+                indice += 1
+                registros, tamanho = [], 0
+            registros.append(linha)
+            tamanho += len(linha) + 1
+
+        if registros:
+            yield emitir()
+
     def criar_chunks_multiplos_docs(
         self,
         documentos: List[Tuple[str, str]]  # [(nome, conteudo), ...]
@@ -160,37 +290,9 @@ class TextProcessor:
         Returns:
             (is_valid, mensagem)
         """
-        if not texto:
-            return False, "Nenhum conteúdo extraído."
-        
-        texto_limpo = self.limpar_texto(texto)
-        
-        # Muito curto
-        if len(texto_limpo) < 50:
-            return False, "Conteúdo muito curto (< 50 caracteres)."
-        
-        # Detecta possíveis problemas de extração
-        problemas = []
-        
-        # PDF protegido ou escaneado (muito pouco texto legível)
-        palavras = texto_limpo.split()
-        if len(palavras) < 10:
-            problemas.append("Poucas palavras extraídas (possível PDF escaneado ou protegido)")
-        
-        # Muitos caracteres estranhos
-        chars_estranhos = len(re.findall(r'[^\w\s\.,;:!?\-\(\)\[\]\"\'áéíóúàèìòùâêîôûãõäëïöüç]', texto_limpo, re.IGNORECASE))
-        ratio_estranhos = chars_estranhos / len(texto_limpo) if texto_limpo else 0
-        if ratio_estranhos > 0.1:
-            problemas.append("Muitos caracteres não reconhecidos (possível problema de encoding)")
-        
-        # Texto de bloqueio JavaScript
-        if "enable javascript" in texto_limpo.lower() or "just a moment" in texto_limpo.lower():
-            problemas.append("Conteúdo bloqueado por JavaScript")
-        
-        if problemas:
-            return False, " | ".join(problemas)
-        
-        return True, "Conteúdo válido"
+        validacao = ValidacaoConteudo(self)
+        validacao.adicionar(texto)
+        return validacao.resultado()
 
     # ==================== ESTATÍSTICAS ====================
 
@@ -212,4 +314,28 @@ class TextProcessor:
             "total_chars": total_chars,
             "media_chars_chunk": total_chars // len(chunks),
             "documentos": docs_unicos
-        }
\ No newline at end of file
+        }
+
+    def somar_estatisticas(self, parciais: List[Tuple[str, int, int]]) -> dict:
+        """
+        Agrega estatísticas por documento sem percorrer os chunks.
+
+        Args:
+            parciais: Lista de (documento, total_chunks, total_chars)
+
+        Returns:
+            Mesmo formato de get_estatisticas
+        """
+        total_chunks = sum(n for _, n, _ in parciais)
+        if not total_chunks:
+            return self.get_estatisticas([])
+
+        total_chars = sum(c for _, _, c in parciais)
+        docs_unicos = list(dict.fromkeys(nome for nome, n, _ in parciais if n))
+
+        return {
+            "total_chunks": total_chunks,
+            "total_chars": total_chars,
+            "media_chars_chunk": total_chars // total_chunks,
+            "documentos": docs_unicos
+        }
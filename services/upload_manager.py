@@ -3,16 +3,20 @@
 
 import os
 import sys
+import asyncio
 import tempfile
 import hashlib
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import List, Optional, Tuple
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 
 
 from fake_useragent import UserAgent
 
 from config.settings import TipoArquivo, UPLOAD_CONFIG
+from services.ingestion_pool import get_ingestion_pool
+from services.extraction_cache import get_extraction_cache
+from services.content_store import ContentStore, TextoComprimido, get_content_store
 
 @dataclass
 class DocumentoCarregado:
@@ -20,18 +24,32 @@ class DocumentoCarregado:
     id: str
     nome: str
     tipo: TipoArquivo
-    caminho_cache: str  # Caminho para o arquivo de texto em .tmp/
+    caminho_cache: str  # Caminho do texto no ContentStore (.tmp/content/<hash>.blk)
     hash: str          # Hash MD5 do conteúdo
     tamanho_bytes: int
     tamanho_chars: int
     data_upload: datetime = field(default_factory=datetime.now)
+    hash_bytes: Optional[str] = None  # SHA-256 do arquivo original (uploads)
+    encoding: Optional[str] = None    # Encoding detectado na ingestão (TXT/CSV)
 
     def get_conteudo(self) -> str:
-        """Lê o conteúdo do arquivo de cache."""
+        """Lê o conteúdo completo do armazém."""
         if not os.path.exists(self.caminho_cache):
             return ""
-        with open(self.caminho_cache, 'r', encoding='utf-8') as f:
-            return f.read()
+        return TextoComprimido(self.caminho_cache).ler()
+
+    @classmethod
+    def de_dict(cls, dados: dict) -> "DocumentoCarregado":
+        """Reconstrói o documento a partir de dataclasses.asdict serializado em JSON."""
+        dados = dict(dados)
+        dados['tipo'] = TipoArquivo(dados['tipo'])
+        if isinstance(dados.get('data_upload'), str):
+            dados['data_upload'] = datetime.fromisoformat(dados['data_upload'])
+        return cls(**dados)
+
+    def abrir_conteudo(self) -> TextoComprimido:
+        """Leitor do texto para leituras por intervalo e em streaming (sem materializar tudo)."""
+        return TextoComprimido(self.caminho_cache)
 
     @property
     def tamanho_formatado(self) -> str:
@@ -43,6 +61,144 @@ class DocumentoCarregado:
         else:
             return f"{self.tamanho_bytes / (1024 * 1024):.2f} MB"
 
+class ArquivoGrandeDemaisError(ValueError):
+    """Levantada quando o upload excede o limite durante o recebimento."""
+    pass
+
+
+@dataclass
+class ArquivoRecebido:
+    """Upload gravado no spool em disco, com hash e tamanho calculados no streaming."""
+    caminho: str
+    nome: str
+    tamanho_bytes: int
+    hash_bytes: str
+
+    def descartar(self) -> None:
+        if os.path.exists(self.caminho):
+            os.unlink(self.caminho)
+
+
+# Folga para os campos de texto, cabeçalhos das partes e delimitadores do multipart
+MARGEM_MULTIPART_BYTES = 64 * 1024
+
+
+@dataclass
+class FormularioRecebido:
+    """Corpo multipart lido em streaming: campos de texto, arquivos no spool e arquivos recusados."""
+    campos: Dict[str, str] = field(default_factory=dict)
+    arquivos: List[ArquivoRecebido] = field(default_factory=list)
+    recusados: List[dict] = field(default_factory=list)
+
+    def descartar(self) -> None:
+        for arquivo in self.arquivos:
+            arquivo.descartar()
+
+
+class _LeitorMultipart:
+    """Callbacks do parser multipart: estado da parte atual e gravação direta no spool."""
+
+    def __init__(self, manager: "UploadManager", form: FormularioRecebido, max_arquivos: int, recusar_excedente: bool):
+        self.manager = manager
+        self.form = form
+        self.max_arquivos = max_arquivos
+        self.recusar_excedente = recusar_excedente
+        self.limite = manager.config.MAX_SIZE_BYTES
+        self.campos_bytes = 0
+        self.destino = None
+        self._nova_parte()
+
+    def callbacks(self) -> dict:
+        return {
+            "on_part_begin": self._nova_parte,
+            "on_header_field": self._campo_cabecalho,
+            "on_header_value": self._valor_cabecalho,
+            "on_header_end": self._fim_cabecalho,
+            "on_headers_finished": self._abrir_parte,
+            "on_part_data": self._dados,
+            "on_part_end": self._fechar_parte,
+        }
+
+    def _nova_parte(self):
+        self.cabecalhos: Dict[bytes, bytes] = {}
+        self._campo, self._valor = b"", b""
+        self.nome = ""
+        self.arquivo: Optional[str] = None
+        self.valor: Optional[bytearray] = None
+        self.caminho = None
+        self.sha = None
+        self.tamanho = 0
+
+    def _campo_cabecalho(self, data: bytes, start: int, end: int):
+        self._campo += data[start:end]
+
+    def _valor_cabecalho(self, data: bytes, start: int, end: int):
+        self._valor += data[start:end]
+
+    def _fim_cabecalho(self):
+        self.cabecalhos[self._campo.lower()] = self._valor
+        self._campo, self._valor = b"", b""
+
+    def _abrir_parte(self):
+        from python_multipart.multipart import parse_options_header
+
+        _, opcoes = parse_options_header(self.cabecalhos.get(b"content-disposition", b""))
+        self.nome = opcoes.get(b"name", b"").decode("utf-8", errors="replace")
+        if b"filename" not in opcoes:
+            self.valor = bytearray()
+            return
+        self.arquivo = opcoes[b"filename"].decode("utf-8", errors="replace")
+        if not self.manager.detectar_tipo_arquivo(self.arquivo):
+            self._recusar("Tipo de arquivo não suportado.")
+        elif len(self.form.arquivos) >= self.max_arquivos:
+            self._recusar(f"Limite de {self.max_arquivos} arquivo(s) por envio.")
+        else:
+            fd, self.caminho = tempfile.mkstemp(suffix=os.path.splitext(self.arquivo)[1], dir=self.manager.spool_dir)
+            self.destino = os.fdopen(fd, 'wb')
+            self.sha = hashlib.sha256()
+
+    def _recusar(self, mensagem: str):
+        self.form.recusados.append({"arquivo": self.arquivo, "success": False, "message": mensagem})
+
+    def _dados(self, data: bytes, start: int, end: int):
+        bloco = data[start:end]
+        if self.valor is not None:
+            self.campos_bytes += len(bloco)
+            if self.campos_bytes > MARGEM_MULTIPART_BYTES:
+                raise ValueError("Campos do formulário excedem o limite.")
+            self.valor += bloco
+            return
+        if self.destino is None:
+            return  # Parte recusada: bytes lidos e descartados
+        self.tamanho += len(bloco)
+        if self.tamanho > self.limite:
+            mensagem = self.manager.validar_tamanho(self.tamanho)[1]
+            if not self.recusar_excedente:
+                raise ArquivoGrandeDemaisError(mensagem)
+            self.abortar()
+            self._recusar(mensagem)
+            return
+        self.sha.update(bloco)
+        self.destino.write(bloco)
+
+    def _fechar_parte(self):
+        if self.valor is not None:
+            self.form.campos[self.nome] = self.valor.decode("utf-8", errors="replace")
+        elif self.destino is not None:
+            self.destino.close()
+            self.destino = None
+            self.form.arquivos.append(ArquivoRecebido(
+                caminho=self.caminho, nome=self.arquivo, tamanho_bytes=self.tamanho, hash_bytes=self.sha.hexdigest()
+            ))
+
+    def abortar(self):
+        """Remove o arquivo parcial da parte em andamento."""
+        if self.destino is not None:
+            self.destino.close()
+            self.destino = None
+            os.unlink(self.caminho)
+
+
 class UploadManager:
     """
     Gerenciador de uploads com suporte a múltiplos documentos.
@@ -52,14 +208,22 @@ class UploadManager:
         self.config = UPLOAD_CONFIG
         self.tmp_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '.tmp'))
         self.content_dir = os.path.join(self.tmp_dir, 'content')
+        self.spool_dir = os.path.join(self.tmp_dir, 'uploads')
         
         # Cria diretórios necessários
         os.makedirs(self.content_dir, exist_ok=True)
+        os.makedirs(self.spool_dir, exist_ok=True)
+        self.extraction_cache = get_extraction_cache(self.content_dir)
         
         # Estado interno ou externo
         self._internal_docs = []
         self._external_state = external_state
 
+    @property
+    def content_store(self) -> ContentStore:
+        """Armazém dos textos extraídos (segue content_dir)."""
+        return get_content_store(self.content_dir)
+
     @property
     def documentos(self) -> List[DocumentoCarregado]:
         """Retorna lista de documentos carregados."""
@@ -150,20 +314,98 @@ class UploadManager:
             err_msg = e.stderr or e.stdout or "Nenhuma mensagem de erro capturada."
             raise RuntimeError(f"Erro no script de ingestão: {err_msg.strip()}")
 
-    def _carregar_site(self, url: str) -> str:
-        """Carrega conteúdo de URL via script de execução."""
-        return self._executar_ingestao(["--url", url])
+    def _extrair(self, pedido: dict, args: List[str]) -> Tuple[str, dict]:
+        """
+        Extrai pelo pool de workers persistentes ou, se desabilitado, por subprocess.
+        Retorna (texto, metadados); o subprocess de linha de comando não devolve metadados.
+        """
+        pool = get_ingestion_pool()
+        if pool is None:
+            return self._executar_ingestao(args), {}
+        return pool.extrair_com_metadados(pedido)
 
-    def _carregar_do_arquivo(self, file_path: str, suffix: str) -> str:
-        """Carrega arquivo via script de execução."""
-        return self._executar_ingestao(["--file", file_path, "--suffix", suffix])
+    def _carregar_do_arquivo(self, file_path: str, suffix: str) -> Tuple[str, dict]:
+        """Carrega arquivo via script de execução: (texto, metadados)."""
+        return self._extrair({"file": file_path, "suffix": suffix}, ["--file", file_path, "--suffix", suffix])
 
     def _gerar_hash(self, texto: str) -> str:
         """Gera hash MD5 do conteúdo."""
         return hashlib.md5(texto.encode('utf-8')).hexdigest()
 
+    def _hash_arquivo(self, caminho: str) -> str:
+        """SHA-256 dos bytes do arquivo, lido em blocos."""
+        sha = hashlib.sha256()
+        with open(caminho, 'rb') as f:
+            for bloco in iter(lambda: f.read(self.config.BLOCO_UPLOAD_BYTES), b''):
+                sha.update(bloco)
+        return sha.hexdigest()
+
     # ==================== MÉTODOS PRINCIPAIS ====================
 
+    async def receber_multipart(
+        self,
+        corpo: AsyncIterator[bytes],
+        content_type: str,
+        max_arquivos: int = 1,
+        recusar_excedente: bool = False,
+        tamanho_declarado: Optional[int] = None
+    ) -> FormularioRecebido:
+        """
+        Lê um corpo multipart/form-data direto da conexão (ex.: `request.stream()`),
+        sem o spool intermediário do Starlette: cada arquivo é gravado no spool à
+        medida que chega, com hash e limite verificados bloco a bloco — inclusive
+        em uploads chunked, sem Content-Length.
+
+        Arquivos de tipo não suportado ou além de `max_arquivos` não são gravados e
+        vão para `recusados`; acima do limite de tamanho, também, se
+        `recusar_excedente` — senão a leitura para com ArquivoGrandeDemaisError.
+        Um `tamanho_declarado` (Content-Length) acima do limite do corpo é
+        recusado antes de qualquer leitura.
+
+        Raises:
+            ArquivoGrandeDemaisError: arquivo ou corpo acima do limite
+            ValueError: corpo que não é multipart/form-data ou campos grandes demais
+        """
+        from python_multipart.multipart import MultipartParser, parse_options_header
+
+        tipo_corpo, opcoes = parse_options_header(content_type or "")
+        if tipo_corpo != b"multipart/form-data" or not opcoes.get(b"boundary"):
+            raise ValueError("Envie os arquivos como multipart/form-data.")
+
+        # Também limita o que é lido e descartado (partes recusadas), com ou sem Content-Length
+        max_corpo = max_arquivos * self.config.MAX_SIZE_BYTES + MARGEM_MULTIPART_BYTES
+        erro_corpo = f"❌ Envio muito grande. Limite: {max_arquivos} x {self.config.MAX_SIZE_MB}MB."
+        if tamanho_declarado and tamanho_declarado > max_corpo:
+            raise ArquivoGrandeDemaisError(erro_corpo)
+
+        form = FormularioRecebido()
+        leitor = _LeitorMultipart(self, form, max_arquivos, recusar_excedente)
+        parser = MultipartParser(opcoes[b"boundary"], leitor.callbacks())
+        lidos = 0
+        try:
+            async for pedaco in corpo:
+                parser.write(pedaco)
+                lidos += len(pedaco)
+                if lidos > max_corpo:
+                    raise ArquivoGrandeDemaisError(erro_corpo)
+            parser.finalize()
+        except BaseException:
+            leitor.abortar()
+            form.descartar()
+            raise
+        return form
+
+    def carregar_documento_recebido(self, tipo: TipoArquivo, recebido: ArquivoRecebido) -> Tuple[bool, str]:
+        """Extrai e registra um upload do spool (o arquivo do spool é removido ao final)."""
+        try:
+            existente = next((d for d in self.documentos if d.hash_bytes == recebido.hash_bytes), None)
+            if existente is not None:
+                # Mesmo arquivo reenviado: nada a extrair
+                return True, f"💡 '{recebido.nome}' já está na lista (conteúdo idêntico)."
+            return self.carregar_documento_de_caminho(tipo, recebido.caminho, recebido.nome, hash_bytes=recebido.hash_bytes)
+        finally:
+            recebido.descartar()
+
     def carregar_documento_de_dados(
         self, 
         tipo: TipoArquivo, 
@@ -181,11 +423,65 @@ class UploadManager:
             if os.path.exists(temp_path):
                 os.unlink(temp_path)
 
+    def carregar_lote(
+        self,
+        itens: List[Tuple[TipoArquivo, "ArquivoRecebido"]],
+        max_paralelo: int = 2,
+        progress_callback=None
+    ) -> List[dict]:
+        """
+        Extrai vários uploads em paralelo e registra os resultados na ordem de envio.
+
+        Cada extração usa um UploadManager próprio (sobre uma cópia da lista atual),
+        então as threads não disputam a lista compartilhada; a deduplicação e o
+        limite de arquivos são aplicados na fusão, que é sequencial.
+
+        Returns:
+            [{"arquivo", "success", "message"}, ...] na mesma ordem de `itens`
+        """
+        from concurrent.futures import ThreadPoolExecutor, as_completed
+
+        def extrair(item):
+            tipo, recebido = item
+            parcial = UploadManager(external_state=list(self.documentos))
+            parcial.content_dir = self.content_dir
+            parcial.extraction_cache = self.extraction_cache
+            ids_anteriores = set(d.id for d in self.documentos)
+            success, message = parcial.carregar_documento_recebido(tipo, recebido)
+            return success, message, [d for d in parcial.documentos if d.id not in ids_anteriores]
+
+        saidas = [None] * len(itens)
+        with ThreadPoolExecutor(max_workers=max(1, max_paralelo), thread_name_prefix="extracao") as executor:
+            futuros = {executor.submit(extrair, item): i for i, item in enumerate(itens)}
+            for concluidos, futuro in enumerate(as_completed(futuros), 1):
+                i = futuros[futuro]
+                try:
+                    saidas[i] = futuro.result()
+                except Exception as e:
+                    saidas[i] = (False, f"❌ Erro ao carregar: {str(e)}", [])
+                if progress_callback:
+                    progress_callback(concluidos / len(itens), f"Texto extraído de {concluidos}/{len(itens)} arquivos...")
+
+        resultados = []
+        for (_, recebido), (success, message, novos) in zip(itens, saidas):
+            for doc in novos:
+                if any(d.caminho_cache == doc.caminho_cache for d in self.documentos):
+                    message = f"💡 '{doc.nome}' já está na lista (conteúdo idêntico)."
+                    continue
+                valid_limite, msg_limite = self.validar_limite_arquivos()
+                if not valid_limite:
+                    success, message = False, msg_limite
+                    continue
+                self.documentos.append(doc)
+            resultados.append({"arquivo": recebido.nome, "success": success, "message": message})
+        return resultados
+
     def carregar_documento_de_caminho(
         self, 
         tipo: TipoArquivo, 
         caminho_arquivo: str,
-        nome_original: str = None
+        nome_original: str = None,
+        hash_bytes: str = None
     ) -> Tuple[bool, str]:
         """Carrega documento a partir de um caminho no disco."""
         try:
@@ -197,36 +493,74 @@ class UploadManager:
             if not success:
                 return False, " | ".join(errors)
 
-            # Ingestão
+            # Arquivo idêntico já extraído: reaproveita o texto sem passar pela ingestão
             suffix = os.path.splitext(nome_doc)[1]
-            conteudo = self._carregar_do_arquivo(caminho_arquivo, suffix)
+            hash_bytes = hash_bytes or self._hash_arquivo(caminho_arquivo)
+            em_cache = self.extraction_cache.get(hash_bytes, suffix)
+            if em_cache:
+                caminho_texto, metadados = em_cache
+                conteudo = TextoComprimido(caminho_texto).ler()
+                return self._registrar_documento(
+                    tipo, conteudo, nome_doc, tamanho_bytes,
+                    hash_bytes=hash_bytes, encoding=metadados.get("encoding")
+                )
+
+            # Ingestão
+            conteudo, metadados = self._carregar_do_arquivo(caminho_arquivo, suffix)
             
-            return self._registrar_documento(tipo, conteudo, nome_doc, tamanho_bytes)
+            success, message = self._registrar_documento(
+                tipo, conteudo, nome_doc, tamanho_bytes,
+                hash_bytes=hash_bytes, encoding=metadados.get("encoding")
+            )
+            if success:
+                self.extraction_cache.put(hash_bytes, suffix, self._gerar_hash(conteudo), metadados)
+            return success, message
         except Exception as e:
             return False, f"❌ Erro ao carregar: {str(e)}"
 
-    def carregar_documento_url(self, url: str, nome: str = None) -> Tuple[bool, str]:
-        """Carrega documento a partir de uma URL."""
+    async def carregar_url(self, url: str, nome: str = None, fetcher=None) -> Tuple[bool, str]:
+        """Carrega documento de uma URL pelo cliente HTTP compartilhado (sem subprocess)."""
+        from services.url_fetcher import URL_FETCHER
         try:
             nome_doc = nome or url[:50]
-            conteudo = self._carregar_site(url)
-            return self._registrar_documento(TipoArquivo.SITE, conteudo, nome_doc, 0)
+            conteudo = await (fetcher or URL_FETCHER).extrair_texto(url)
+            # Compressão e gravação no armazém fora do event loop
+            return await asyncio.to_thread(self._registrar_documento, TipoArquivo.SITE, conteudo, nome_doc, 0)
         except Exception as e:
             return False, f"❌ Erro ao carregar URL: {str(e)}"
 
-    def _registrar_documento(self, tipo: TipoArquivo, conteudo: str, nome_doc: str, tamanho_bytes: int) -> Tuple[bool, str]:
+    def carregar_documento_url(self, url: str, nome: str = None) -> Tuple[bool, str]:
+        """Carrega documento a partir de uma URL (versão síncrona de carregar_url)."""
+        from services.url_fetcher import UrlFetcher
+
+        async def carregar():
+            # asyncio.run cria um loop por chamada: cliente próprio, fechado ao final
+            fetcher = UrlFetcher()
+            try:
+                return await self.carregar_url(url, nome, fetcher=fetcher)
+            finally:
+                await fetcher.fechar()
+        return asyncio.run(carregar())
+
+    def _registrar_documento(
+        self,
+        tipo: TipoArquivo,
+        conteudo: str,
+        nome_doc: str,
+        tamanho_bytes: int,
+        hash_bytes: str = None,
+        encoding: str = None
+    ) -> Tuple[bool, str]:
         """Lógica comum de registro após extração de texto."""
         if not conteudo or len(conteudo.strip()) < 10:
             return False, "⚠️ Documento sem conteúdo extraível."
         
         content_hash = self._gerar_hash(conteudo)
-        cache_id = f"{content_hash}.txt"
-        caminho_cache = os.path.join(self.content_dir, cache_id)
+        caminho_cache = self.content_store.caminho(content_hash)
         
         ja_existia = os.path.exists(caminho_cache)
         if not ja_existia:
-            with open(caminho_cache, 'w', encoding='utf-8') as f:
-                f.write(conteudo)
+            self.content_store.gravar(conteudo)
 
         doc = DocumentoCarregado(
             id=f"{content_hash}_{datetime.now().timestamp()}",
@@ -235,7 +569,9 @@ class UploadManager:
             caminho_cache=caminho_cache,
             hash=content_hash,
             tamanho_bytes=tamanho_bytes,
-            tamanho_chars=len(conteudo)
+            tamanho_chars=len(conteudo),
+            hash_bytes=hash_bytes,
+            encoding=encoding
         )
         
         if any(d.caminho_cache == caminho_cache for d in self.documentos):
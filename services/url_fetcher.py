@@ -0,0 +1,218 @@
+# services/url_fetcher.py
+"""Ingestão de URLs com cliente HTTP assíncrono compartilhado e cache condicional em disco."""
+
+import os
+import json
+import time
+import uuid
+import random
+import asyncio
+import hashlib
+import threading
+from dataclasses import dataclass
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+from config.settings import URL_FETCH_CONFIG
+
+
+DEFAULT_HTTP_CACHE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '.tmp', 'http_cache'))
+
+STATUS_RETENTAVEIS = {429, 500, 502, 503, 504}
+
+
+class FalhaNaBuscaError(RuntimeError):
+    """Levantada quando a URL não pôde ser obtida após as tentativas."""
+    pass
+
+
+@dataclass
+class RespostaHttp:
+    """Corpo de uma URL, vindo da rede (200) ou do cache (304)."""
+    url: str
+    conteudo: bytes
+    content_type: str
+    do_cache: bool = False
+
+
+class UrlFetcher:
+    """
+    Cliente HTTP assíncrono do event loop do servidor, com:
+
+    - pool de conexões (keep-alive) e limite de concorrência por host;
+    - retentativas com backoff exponencial + jitter (respeita Retry-After);
+    - cache em disco por URL, revalidado com If-None-Match / If-Modified-Since:
+      uma fonte já conhecida custa apenas um 304.
+
+    Código síncrono (asyncio.run, um loop novo por chamada) deve usar uma
+    instância própria e fechá-la ao final, em vez da compartilhada.
+    """
+
+    def __init__(self, config=None, cache_dir: str = None):
+        self.config = config or URL_FETCH_CONFIG
+        self.cache_dir = cache_dir or DEFAULT_HTTP_CACHE_DIR
+        self._client = None
+        self._loop = None
+        self._lock = threading.Lock()
+        self._semaforos: Dict[str, asyncio.Semaphore] = {}
+        self.requisicoes = 0
+        self.revalidadas = 0
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _get_client(self):
+        """Cliente do loop atual; o de um loop anterior é fechado antes da troca."""
+        import httpx
+
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._client is not None and self._loop is not loop:
+                self._descartar_cliente()
+            if self._client is None:
+                self._client = httpx.AsyncClient(
+                    follow_redirects=True,
+                    timeout=self.config.timeout_segundos,
+                    limits=httpx.Limits(
+                        max_connections=self.config.max_conexoes,
+                        max_keepalive_connections=self.config.max_conexoes
+                    ),
+                    headers={"User-Agent": os.getenv("USER_AGENT", "Mozilla/5.0")}
+                )
+                self._loop = loop
+                self._semaforos = {}
+            return self._client
+
+    def _descartar_cliente(self):
+        """Fecha o cliente atual no loop dele, se ainda estiver rodando (chamado sob o lock)."""
+        antigo, loop_antigo = self._client, self._loop
+        self._client, self._loop = None, None
+        if loop_antigo is not None and loop_antigo.is_running():
+            asyncio.run_coroutine_threadsafe(antigo.aclose(), loop_antigo)
+        # Loop já encerrado: não há onde aguardar o aclose; as conexões morreram com ele
+
+    def _semaforo(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc
+        if host not in self._semaforos:
+            self._semaforos[host] = asyncio.Semaphore(self.config.limite_por_host)
+        return self._semaforos[host]
+
+    # ==================== CACHE ====================
+
+    def _caminhos(self, url: str):
+        chave = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        base = os.path.join(self.cache_dir, chave)
+        return f"{base}.json", f"{base}.body"
+
+    def _ler_cache(self, url: str) -> Optional[dict]:
+        meta_path, body_path = self._caminhos(url)
+        if not (os.path.exists(meta_path) and os.path.exists(body_path)):
+            return None
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _gravar_cache(self, url: str, resposta, conteudo: bytes):
+        meta_path, body_path = self._caminhos(url)
+        if not (resposta.headers.get("etag") or resposta.headers.get("last-modified")):
+            return  # Sem validadores: não há como revalidar barato
+        for caminho, dados, modo in (
+            (body_path, conteudo, 'wb'),
+            (meta_path, json.dumps({
+                "url": url,
+                "etag": resposta.headers.get("etag"),
+                "last_modified": resposta.headers.get("last-modified"),
+                "content_type": resposta.headers.get("content-type", ""),
+                "salvo_em": time.time(),
+            }), 'w'),
+        ):
+            # Nome único: buscas simultâneas da mesma URL não escrevem no mesmo temporário
+            tmp_path = f"{caminho}.{uuid.uuid4().hex}.tmp"
+            try:
+                with open(tmp_path, modo, **({} if 'b' in modo else {'encoding': 'utf-8'})) as f:
+                    f.write(dados)
+                os.replace(tmp_path, caminho)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
+
+    def _ler_corpo(self, url: str) -> bytes:
+        with open(self._caminhos(url)[1], 'rb') as f:
+            return f.read()
+
+    # ==================== BUSCA ====================
+
+    def _espera(self, tentativa: int, resposta=None) -> float:
+        retry_after = resposta.headers.get("retry-after") if resposta is not None else None
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), self.config.backoff_max)
+        atraso = min(self.config.backoff_base * (2 ** tentativa), self.config.backoff_max)
+        return atraso * (0.5 + random.random() / 2)
+
+    async def buscar(self, url: str) -> RespostaHttp:
+        """GET condicional com retentativas; levanta FalhaNaBuscaError ao esgotá-las."""
+        import httpx
+
+        client = self._get_client()
+        cache = self._ler_cache(url)
+        headers = {}
+        if cache:
+            if cache.get("etag"):
+                headers["If-None-Match"] = cache["etag"]
+            if cache.get("last_modified"):
+                headers["If-Modified-Since"] = cache["last_modified"]
+
+        ultimo_erro = None
+        for tentativa in range(self.config.tentativas):
+            resposta = None
+            try:
+                async with self._semaforo(url):
+                    self.requisicoes += 1
+                    resposta = await client.get(url, headers=headers)
+                if resposta.status_code == 304 and cache:
+                    try:
+                        corpo = self._ler_corpo(url)
+                    except OSError:
+                        # Corpo removido (ex.: janitor) depois da leitura do cache: busca completa
+                        print(f"[URL] Cache de {url} sumiu durante a revalidação; buscando de novo.")
+                        cache, headers = None, {}
+                        async with self._semaforo(url):
+                            self.requisicoes += 1
+                            resposta = await client.get(url)
+                    else:
+                        self.revalidadas += 1
+                        return RespostaHttp(url, corpo, cache.get("content_type", ""), do_cache=True)
+                if resposta.status_code not in STATUS_RETENTAVEIS:
+                    resposta.raise_for_status()
+                    self._gravar_cache(url, resposta, resposta.content)
+                    return RespostaHttp(url, resposta.content, resposta.headers.get("content-type", ""))
+                ultimo_erro = f"HTTP {resposta.status_code}"
+            except httpx.HTTPStatusError as e:
+                # 4xx (exceto 429): retentar não ajuda
+                raise FalhaNaBuscaError(f"Falha ao carregar site: HTTP {e.response.status_code}")
+            except httpx.TransportError as e:
+                ultimo_erro = f"{type(e).__name__}: {e}"
+            if tentativa < self.config.tentativas - 1:
+                await asyncio.sleep(self._espera(tentativa, resposta))
+        raise FalhaNaBuscaError(f"Falha ao carregar site após {self.config.tentativas} tentativas: {ultimo_erro}")
+
+    async def extrair_texto(self, url: str) -> str:
+        """Texto da página (mesma extração do WebBaseLoader: BeautifulSoup.get_text)."""
+        resposta = await self.buscar(url)
+        if "html" not in resposta.content_type and "xml" not in resposta.content_type:
+            return resposta.conteudo.decode('utf-8', errors='replace')
+
+        from bs4 import BeautifulSoup
+        # O parse não é I/O: roda em thread para não segurar o event loop
+        soup = await asyncio.to_thread(BeautifulSoup, resposta.conteudo, "html.parser")
+        return soup.get_text()
+
+    async def fechar(self):
+        with self._lock:
+            client, self._client, self._loop = self._client, None, None
+        if client is not None:
+            await client.aclose()
+
+
+# Instância compartilhada pelo processo
+URL_FETCHER = UrlFetcher()
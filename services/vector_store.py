@@ -0,0 +1,350 @@
+# services/vector_store.py
+"""Backends de armazenamento vetorial usados pelo RAGManager (ChromaDB ou índice flat)."""
+
+import os
+import json
+import uuid
+import shutil
+import threading
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+
+DEFAULT_FLAT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '.tmp', 'flat_index'))
+
+
+class ColecaoVetorial(ABC):
+    """
+    Operações de coleção que o RAGManager executa além da busca LangChain
+    (sincronização por hash, varredura para a busca agrupada e limpeza).
+    """
+
+    @abstractmethod
+    def metadatas(self) -> List[dict]:
+        """Metadados de todos os chunks (usado só na migração do manifesto)."""
+
+    def fontes(self) -> List[str]:
+        """Documentos (source) distintos presentes na coleção."""
+        return list(set(m.get('source') for m in self.metadatas() if m and m.get('source')))
+
+    @abstractmethod
+    def pontuar(self, query_vec) -> Optional[Tuple[Any, List[str], List[dict]]]:
+        """
+        Similaridade da query com todos os chunks em um único passo.
+        Retorna (scores, documentos, metadatas) ou None se os vetores não forem acessíveis.
+        """
+
+    @abstractmethod
+    def remover_hashes(self, hashes: Iterable[str]) -> None:
+        """Remove todos os chunks dos documentos informados."""
+
+    @abstractmethod
+    def apagar(self) -> None:
+        """Remove a coleção inteira."""
+
+
+class ColecaoChroma(ColecaoVetorial):
+    """Adaptador das operações de coleção para um cliente ChromaDB."""
+
+    def __init__(self, client, collection_name: str):
+        self.client = client
+        self.collection_name = collection_name
+
+    def metadatas(self) -> List[dict]:
+        collection = self.client.get_or_create_collection(self.collection_name)
+        return collection.get(include=['metadatas'])['metadatas']
+
+    def fontes(self) -> List[str]:
+        collection = self.client.get_collection(self.collection_name)
+        metadata = collection.get(include=['metadatas'])['metadatas']
+        return list(set(m.get('source') for m in metadata if m.get('source')))
+
+    def pontuar(self, query_vec):
+        import numpy as np
+
+        collection = self.client.get_collection(self.collection_name)
+        dados = collection.get(include=['embeddings', 'documents', 'metadatas'])
+        vetores = dados.get('embeddings')
+        if vetores is None or not isinstance(vetores, (list, np.ndarray)):
+            return None
+        if len(vetores) == 0:
+            return np.zeros(0, dtype=np.float32), [], []
+
+        matriz = np.asarray(vetores, dtype=np.float32)
+        # Embeddings normalizados: produto interno == similaridade de cosseno
+        scores = matriz @ np.asarray(query_vec, dtype=np.float32)
+        return scores, list(dados['documents']), [m or {} for m in dados['metadatas']]
+
+    def remover_hashes(self, hashes: Iterable[str]) -> None:
+        collection = self.client.get_or_create_collection(self.collection_name)
+        collection.delete(where={"hash": {"$in": list(hashes)}})
+
+    def apagar(self) -> None:
+        try:
+            self.client.delete_collection(self.collection_name)
+        except Exception:
+            pass  # Collection pode não existir
+
+
+class FlatVectorStore(VectorStore, ColecaoVetorial):
+    """
+    Índice vetorial exato em NumPy, sem HNSW.
+
+    Layout em disco (por coleção):
+        manifest.json          -> segmentos visíveis + dimensão (troca atômica via os.replace)
+        seg-<id>.f32           -> matriz float32 (linhas x dim), lida por memmap
+        seg-<id>.jsonl         -> [conteudo, metadata] de cada linha
+
+    Segmentos são imutáveis: inserções criam um segmento novo; remoções
+    reescrevem apenas os segmentos afetados. Em ambos os casos os arquivos
+    novos são gravados (fsync) antes da troca do manifesto, então uma queda
+    nunca deixa o índice visível em estado parcial — arquivos órfãos são
+    ignorados e removidos na próxima abertura.
+    """
+
+    def __init__(self, collection_name: str, embedding: Embeddings, base_dir: str = None):
+        self.collection_name = collection_name
+        self.embedding = embedding
+        self.dir = os.path.join(base_dir or DEFAULT_FLAT_DIR, collection_name)
+        self._manifest_path = os.path.join(self.dir, 'manifest.json')
+        self._lock = threading.RLock()
+        self.dim: Optional[int] = None
+        self._segmentos: List[dict] = []  # {id, linhas, matriz (memmap), documentos, metadatas}
+        os.makedirs(self.dir, exist_ok=True)
+        self._abrir()
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self.embedding
+
+    # ==================== PERSISTÊNCIA ====================
+
+    def _abrir(self):
+        manifest = {"dim": None, "segmentos": []}
+        if os.path.exists(self._manifest_path):
+            with open(self._manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        self.dim = manifest.get("dim")
+        self._segmentos = [self._carregar_segmento(s["id"], s["linhas"]) for s in manifest["segmentos"]]
+        self._remover_orfaos()
+
+    def _caminhos(self, seg_id: str) -> Tuple[str, str]:
+        return (
+            os.path.join(self.dir, f"seg-{seg_id}.f32"),
+            os.path.join(self.dir, f"seg-{seg_id}.jsonl"),
+        )
+
+    def _carregar_segmento(self, seg_id: str, linhas: int) -> dict:
+        import numpy as np
+
+        vetores_path, dados_path = self._caminhos(seg_id)
+        documentos, metadatas = [], []
+        with open(dados_path, 'r', encoding='utf-8') as f:
+            for linha in f:
+                conteudo, metadata = json.loads(linha)
+                documentos.append(conteudo)
+                metadatas.append(metadata)
+        matriz = np.memmap(vetores_path, dtype=np.float32, mode='r', shape=(linhas, self.dim))
+        return {"id": seg_id, "linhas": linhas, "matriz": matriz, "documentos": documentos, "metadatas": metadatas}
+
+    def _gravar_segmento(self, matriz, documentos: List[str], metadatas: List[dict]) -> dict:
+        import numpy as np
+
+        seg_id = uuid.uuid4().hex[:12]
+        vetores_path, dados_path = self._caminhos(seg_id)
+        with open(vetores_path, 'wb') as f:
+            np.ascontiguousarray(matriz, dtype=np.float32).tofile(f)
+            f.flush()
+            os.fsync(f.fileno())
+        with open(dados_path, 'w', encoding='utf-8') as f:
+            for conteudo, metadata in zip(documentos, metadatas):
+                f.write(json.dumps([conteudo, metadata], ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        return self._carregar_segmento(seg_id, len(documentos))
+
+    def _trocar_manifesto(self, segmentos: List[dict]):
+        """Publica a nova lista de segmentos atomicamente."""
+        tmp_path = f"{self._manifest_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                "dim": self.dim,
+                "segmentos": [{"id": s["id"], "linhas": s["linhas"]} for s in segmentos]
+            }, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self._manifest_path)
+        self._segmentos = segmentos
+        self._remover_orfaos()
+
+    def _remover_orfaos(self):
+        ativos = {s["id"] for s in self._segmentos}
+        for nome in os.listdir(self.dir):
+            if not nome.startswith("seg-"):
+                continue
+            seg_id = nome[4:].rsplit('.', 1)[0]
+            if seg_id not in ativos:
+                try:
+                    os.remove(os.path.join(self.dir, nome))
+                except OSError:
+                    pass  # Windows: arquivo ainda mapeado, removido na próxima abertura
+
+    # ==================== ESCRITA ====================
+
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[dict]] = None, **kwargs: Any) -> List[str]:
+        import numpy as np
+
+        texts = list(texts)
+        if not texts:
+            return []
+        metadatas = metadatas or [{} for _ in texts]
+        matriz = np.asarray(self.embedding.embed_documents(texts), dtype=np.float32)
+        with self._lock:
+            if self.dim is None:
+                self.dim = int(matriz.shape[1])
+            elif matriz.shape[1] != self.dim:
+                raise ValueError(f"Dimensão incompatível com o índice ({matriz.shape[1]} != {self.dim}).")
+            novo = self._gravar_segmento(matriz, texts, [dict(m) for m in metadatas])
+            self._trocar_manifesto(self._segmentos + [novo])
+        return [f"{novo['id']}:{i}" for i in range(len(texts))]
+
+    def remover_hashes(self, hashes: Iterable[str]) -> None:
+        import numpy as np
+
+        hashes = set(hashes)
+        with self._lock:
+            novos = []
+            for seg in self._segmentos:
+                manter = [i for i, m in enumerate(seg["metadatas"]) if m.get("hash") not in hashes]
+                if len(manter) == seg["linhas"]:
+                    novos.append(seg)
+                elif manter:
+                    novos.append(self._gravar_segmento(
+                        np.asarray(seg["matriz"][manter]),
+                        [seg["documentos"][i] for i in manter],
+                        [seg["metadatas"][i] for i in manter]
+                    ))
+            self._trocar_manifesto(novos)
+
+    def apagar(self) -> None:
+        with self._lock:
+            self._trocar_manifesto([])
+
+    # ==================== BUSCA ====================
+
+    def _pontuar_lote(self, consultas, filtro: Optional[dict] = None):
+        """
+        Scores (n_consultas x n_chunks) de todas as consultas contra todos os
+        segmentos, uma multiplicação matricial (BLAS) por segmento.
+        """
+        import numpy as np
+
+        consultas = np.atleast_2d(np.asarray(consultas, dtype=np.float32))
+        blocos, documentos, metadatas = [], [], []
+        for seg in self._segmentos:
+            if filtro:
+                linhas = [i for i, m in enumerate(seg["metadatas"]) if all(m.get(c) == v for c, v in filtro.items())]
+                if not linhas:
+                    continue
+                blocos.append(consultas @ np.asarray(seg["matriz"][linhas]).T)
+                documentos.extend(seg["documentos"][i] for i in linhas)
+                metadatas.extend(seg["metadatas"][i] for i in linhas)
+            else:
+                blocos.append(consultas @ seg["matriz"].T)
+                documentos.extend(seg["documentos"])
+                metadatas.extend(seg["metadatas"])
+        if not blocos:
+            return np.zeros((len(consultas), 0), dtype=np.float32), [], []
+        return np.hstack(blocos), documentos, metadatas
+
+    @staticmethod
+    def _top_k(scores, k: int):
+        """Índices dos k maiores scores de cada linha, em ordem decrescente."""
+        import numpy as np
+
+        n = scores.shape[1]
+        k = min(k, n)
+        if k == 0:
+            return np.zeros((scores.shape[0], 0), dtype=np.int64)
+        parte = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        ordem = np.argsort(-np.take_along_axis(scores, parte, axis=1), axis=1)
+        return np.take_along_axis(parte, ordem, axis=1)
+
+    def buscar_lote(self, queries: List[str], k: int = 4, filter: Optional[dict] = None) -> List[List[Tuple[Document, float]]]:
+        """Top-k exato para várias consultas em um único passo matricial."""
+        consultas = [self.embedding.embed_query(q) for q in queries]
+        with self._lock:
+            scores, documentos, metadatas = self._pontuar_lote(consultas, filter)
+        indices = self._top_k(scores, k)
+        return [
+            [
+                # Distância de cosseno (menor é melhor), como os scores de distância do Chroma
+                (Document(page_content=documentos[i], metadata=dict(metadatas[i])), float(1.0 - scores[linha, i]))
+                for i in indices[linha]
+            ]
+            for linha in range(len(queries))
+        ]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, filter: Optional[dict] = None, **kwargs: Any) -> List[Tuple[Document, float]]:
+        return self.buscar_lote([query], k=k, filter=filter)[0]
+
+    def similarity_search(self, query: str, k: int = 4, filter: Optional[dict] = None, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k=k, filter=filter)]
+
+    def metadatas(self) -> List[dict]:
+        with self._lock:
+            return [dict(m) for seg in self._segmentos for m in seg["metadatas"]]
+
+    def pontuar(self, query_vec):
+        with self._lock:
+            scores, documentos, metadatas = self._pontuar_lote(query_vec)
+        return scores[0], documentos, metadatas
+
+    def __len__(self) -> int:
+        return sum(s["linhas"] for s in self._segmentos)
+
+    @classmethod
+    def from_texts(cls, texts: List[str], embedding: Embeddings, metadatas: Optional[List[dict]] = None, collection_name: str = "oraculo_docs", **kwargs: Any) -> "FlatVectorStore":
+        store = cls(collection_name, embedding, base_dir=kwargs.get("base_dir"))
+        store.add_texts(texts, metadatas)
+        return store
+
+    @staticmethod
+    def apagar_todos(base_dir: str = None) -> None:
+        """Remove todos os índices flat (purga física)."""
+        base = base_dir or DEFAULT_FLAT_DIR
+        if os.path.exists(base):
+            shutil.rmtree(base, ignore_errors=True)
+
+
+_flat_stores: Dict[str, FlatVectorStore] = {}
+_flat_lock = threading.Lock()
+
+
+def get_flat_store(collection_name: str, embedding: Embeddings) -> FlatVectorStore:
+    """Instância compartilhada do índice flat da coleção (um escritor por processo)."""
+    with _flat_lock:
+        store = _flat_stores.get(collection_name)
+        if store is None:
+            store = FlatVectorStore(collection_name, embedding)
+            _flat_stores[collection_name] = store
+        return store
+
+
+def descartar_flat_stores() -> None:
+    """Esquece as instâncias abertas (após purga física)."""
+    with _flat_lock:
+        _flat_stores.clear()
+
+
+def descartar_flat_store(collection_name: str, apagar: bool = False) -> None:
+    """Esquece a instância aberta de uma coleção; com `apagar`, remove também seus arquivos."""
+    with _flat_lock:
+        store = _flat_stores.pop(collection_name, None)
+    if apagar:
+        diretorio = store.dir if store is not None else os.path.join(DEFAULT_FLAT_DIR, collection_name)
+        shutil.rmtree(diretorio, ignore_errors=True)
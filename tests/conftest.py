@@ -44,6 +44,16 @@ def global_mocks(session_mocker):
             except Exception:
                 pass
 
+@pytest.fixture(autouse=True)
+def indices_em_tmp_path(tmp_path, monkeypatch):
+    """
+    Índices lexicais e manifestos criados pelo RAGManager vão para tmp_path, não
+    para o .tmp/ do repositório (os demais armazéns recebem base_dir nos testes).
+    """
+    from services import index_manifest, lexical_index
+    monkeypatch.setattr(lexical_index, "DEFAULT_LEXICAL_DIR", str(tmp_path / "lexical"))
+    monkeypatch.setattr(index_manifest, "DEFAULT_MANIFEST_DIR", str(tmp_path / "manifests"))
+
 def pytest_collection_modifyitems(config, items):
     """
     Pula testes marcados como e2e por padrão, a menos que selecionados via -m e2e
@@ -8,6 +8,7 @@ Para executar:
 """
 
 import os
+import json
 import pytest
 from pathlib import Path
 from fastapi.testclient import TestClient
@@ -50,7 +51,15 @@ def _upload_pdf(client, session_id: str, pdf_path: Path):
             files={"file": (pdf_path.name, f, "application/pdf")},
         )
     assert response.status_code == 200, f"Upload falhou: {response.text}"
-    return response.json()
+    result = response.json()
+
+    # A indexação roda em background: aguarda o job terminar via stream de progresso
+    if result.get("job_id"):
+        stream = client.get(f"/api/v1/jobs/{result['job_id']}/stream")
+        ultimo = json.loads(stream.text.strip().splitlines()[-1])
+        assert ultimo["status"] == "concluido", f"Indexação falhou: {ultimo.get('erro')}"
+        result.update(ultimo.get("resultado") or {})
+    return result
 
 
 def _send_chat(client, session_id: str, message: str) -> str:
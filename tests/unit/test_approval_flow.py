@@ -221,9 +221,8 @@ class TestStateTransitions:
         # Simula: classificação como ESCRITA → ESTRUTURADOR
         llm_mock = MagicMock()
         llm_mock.invoke.return_value = MagicMock(content='ESCRITA')
-        type(orch).llm = PropertyMock(return_value=llm_mock)
-        
-        orch.classificar_e_atualizar_estado("Quero escrever um artigo")
+        with patch.object(OrchestratorAgent, 'llm', new_callable=PropertyMock, return_value=llm_mock):
+            orch.classificar_e_atualizar_estado("Quero escrever um artigo")
         assert mm.session_state['agente_ativo'] == 'ESTRUTURADOR'
 
     def test_no_duplicate_doc_creation(self):
@@ -247,11 +246,10 @@ class TestStateTransitions:
         
         llm_mock = MagicMock()
         llm_mock.invoke.return_value = MagicMock(content='APROVACAO')
-        type(orch).llm = PropertyMock(return_value=llm_mock)
-        
         # Quando já tem doc criado e input não é _is_approval,
         # não deve tentar criar outro
-        orch.classificar_e_atualizar_estado("continue escrevendo")
+        with patch.object(OrchestratorAgent, 'llm', new_callable=PropertyMock, return_value=llm_mock):
+            orch.classificar_e_atualizar_estado("continue escrevendo")
         
         # Não deve ter chamado _handle_approval_flow porque 
         # o estado não era AGUARDANDO_APROVACAO
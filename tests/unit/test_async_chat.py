@@ -0,0 +1,187 @@
+# tests/unit/test_async_chat.py
+"""Testes do caminho assíncrono do chat no Orquestrador (benchmarks de tempo sob o marker `benchmark`)."""
+
+import asyncio
+import threading
+import time
+from typing import List
+from unittest.mock import MagicMock
+
+import pytest
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from agents.orchestrator import OrchestratorAgent
+
+ATRASO_TOKEN = 0.05
+ATRASO_RECUPERACAO = 0.1
+
+
+class LLMLento(BaseChatModel):
+    """LLM falso: triagem responde `resposta_triagem`; o stream emite `tokens` com atraso."""
+
+    resposta_triagem: str = "CONSULTA"
+    tokens: List[str] = ["Resposta ", "com ", "base ", "nos ", "documentos."]
+
+    @property
+    def _llm_type(self) -> str:
+        return "lento"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(ATRASO_TOKEN)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.resposta_triagem))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(ATRASO_TOKEN)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.resposta_triagem))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        for token in self.tokens:
+            time.sleep(ATRASO_TOKEN)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        for token in self.tokens:
+            await asyncio.sleep(ATRASO_TOKEN)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+
+def _recuperacao_bloqueante(*args, **kwargs):
+    time.sleep(ATRASO_RECUPERACAO)  # Simula consulta síncrona ao Chroma
+    return "Trechos relevantes."
+
+
+def _orquestrador(session_state=None, docs_manager=None) -> OrchestratorAgent:
+    mm = MagicMock()
+    mm.session_state = {'llm': LLMLento(), 'agente_ativo': 'ORCHESTRATOR', **(session_state or {})}
+    mm.mensagens = []
+    mm.get_historico_langchain.return_value = []
+    mm.rag_manager.get_contexto_para_prompt.side_effect = _recuperacao_bloqueante
+    return OrchestratorAgent(mm, docs_manager=docs_manager)
+
+
+async def _consumir(agente: OrchestratorAgent, pergunta: str) -> str:
+    return "".join([parte async for parte in agente.aroute_request(pergunta)])
+
+
+def test_stream_assincrono_equivale_ao_sincrono():
+    sincrono = "".join(_orquestrador().route_request("Qual a conclusão?"))
+    agente = _orquestrador()
+    assincrono = asyncio.run(_consumir(agente, "Qual a conclusão?"))
+
+    assert assincrono == sincrono == "Resposta com base nos documentos."
+    assert agente.mm.session_state['agente_ativo'] == 'QA'
+
+def test_streams_de_sessoes_concorrentes_se_intercalam():
+    """Cada sessão cede o loop a cada token: os streams avançam juntos, não um após o outro."""
+    n_sessoes = 3
+    ordem = []
+
+    async def cenario():
+        todas_no_stream = asyncio.Barrier(n_sessoes)
+
+        class LLMSincronizado(LLMLento):
+            async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+                await todas_no_stream.wait()  # Nenhuma sessão emite antes de todas estarem no stream
+                for token in self.tokens:
+                    await asyncio.sleep(0)
+                    yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+        async def sessao(i):
+            agente = _orquestrador({'llm': LLMSincronizado()})
+            agente.mm.rag_manager.get_contexto_para_prompt.side_effect = lambda *a, **k: "Trechos."
+            async for evento in agente.aeventos(f"Pergunta {i}"):
+                if evento.tipo == "token":
+                    ordem.append(i)
+
+        await asyncio.gather(*[sessao(i) for i in range(n_sessoes)])
+
+    asyncio.run(cenario())
+
+    n_tokens = len(LLMLento().tokens)
+    assert sorted(ordem) == sorted(list(range(n_sessoes)) * n_tokens)
+    # Serializado, a primeira rodada de tokens seria toda da mesma sessão
+    assert set(ordem[:n_sessoes]) == set(range(n_sessoes))
+
+def test_recuperacao_bloqueante_roda_fora_do_event_loop():
+    threads = []
+
+    def recuperacao(*args, **kwargs):
+        threads.append(threading.get_ident())
+        return "Trechos relevantes."
+
+    agente = _orquestrador()
+    agente.mm.rag_manager.get_contexto_para_prompt.side_effect = recuperacao
+
+    async def cenario():
+        resposta = await _consumir(agente, "Qual a conclusão?")
+        return threading.get_ident(), resposta
+
+    thread_do_loop, resposta = asyncio.run(cenario())
+
+    assert resposta == "Resposta com base nos documentos."
+    assert threads and threads[0] != thread_do_loop
+
+@pytest.mark.benchmark
+def test_benchmark_sessoes_concorrentes_nao_serializam():
+    """Benchmark (fora da execução padrão): N streams simultâneos levam ~o tempo de um."""
+    n_sessoes = 8
+
+    async def cenario():
+        inicio = time.perf_counter()
+        await _consumir(_orquestrador(), "Pergunta isolada")
+        uma_sessao = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        respostas = await asyncio.gather(*[_consumir(_orquestrador(), f"Pergunta {i}") for i in range(n_sessoes)])
+        return uma_sessao, time.perf_counter() - inicio, respostas
+
+    uma_sessao, concorrentes, respostas = asyncio.run(cenario())
+
+    assert all(r == "Resposta com base nos documentos." for r in respostas)
+    assert concorrentes < uma_sessao * 2, f"{n_sessoes} sessões: {concorrentes:.2f}s vs {uma_sessao:.2f}s para uma"
+
+def test_aprovacao_de_conteudo_escreve_no_docs_fora_do_loop():
+    threads_escrita = []
+    docs = MagicMock()
+    docs.write_section.side_effect = lambda *a, **k: threads_escrita.append(threading.get_ident())
+    agente = _orquestrador({
+        'agente_ativo': 'AGUARDANDO_APROVACAO_CONTEUDO',
+        'active_doc_id': 'doc_1',
+        'pending_section': {'key': 'INTRODUCAO', 'titulo': 'Introdução', 'content': 'Texto acadêmico da introdução.'},
+        'completed_sections': [],
+        'sections_queue': [{'key': 'CONCLUSAO', 'titulo': 'Conclusão'}],
+        'current_structure': {'secoes': [{'key': 'INTRODUCAO', 'titulo': 'Introdução'},
+                                         {'key': 'CONCLUSAO', 'titulo': 'Conclusão'}]},
+    }, docs_manager=docs)
+
+    resposta = asyncio.run(_consumir(agente, "sim"))
+
+    assert resposta == "Resposta com base nos documentos."
+    assert threads_escrita and threads_escrita[0] != threading.get_ident()
+    ss = agente.mm.session_state
+    assert ss['completed_sections'] == ['INTRODUCAO']
+    assert ss['pending_section']['key'] == 'CONCLUSAO'
+    assert ss['agente_ativo'] == 'AGUARDANDO_APROVACAO_CONTEUDO'
+
+def test_falha_do_llm_gera_os_mesmos_eventos_nos_dois_caminhos():
+    class LLMQuebrado(LLMLento):
+        def _stream(self, *args, **kwargs):
+            yield ChatGenerationChunk(message=AIMessageChunk(content="Parcial"))
+            raise RuntimeError("provedor fora do ar")
+
+        async def _astream(self, *args, **kwargs):
+            yield ChatGenerationChunk(message=AIMessageChunk(content="Parcial"))
+            raise RuntimeError("provedor fora do ar")
+
+    async def coletar(agente):
+        return [e async for e in agente.aeventos("Qual a conclusão?")]
+
+    sincrono = list(_orquestrador({'llm': LLMQuebrado()}).eventos("Qual a conclusão?"))
+    assincrono = asyncio.run(coletar(_orquestrador({'llm': LLMQuebrado()})))
+
+    assert [(e.tipo, e.texto) for e in assincrono] == [(e.tipo, e.texto) for e in sincrono]
+    assert [e.tipo for e in sincrono][-2:] == ["token", "error"]
+    assert sincrono[-1].dados == {"codigo": "ERRO_LLM", "mensagem": "Erro na comunicação com a IA."}
@@ -0,0 +1,128 @@
+# tests/unit/test_chat_stream.py
+"""Testes do stream SSE do chat: coalescência de tokens, heartbeats e eventos do Orquestrador."""
+
+import asyncio
+import json
+from unittest.mock import AsyncMock, MagicMock, PropertyMock, patch
+
+from langchain_core.messages import AIMessage
+
+from agents.orchestrator import OrchestratorAgent
+from services.chat_stream import EventoChat, HEARTBEAT, MENSAGEM_ERRO_INTERNO, stream_sse
+
+
+async def _emitir(itens, atraso=0.0):
+    for item in itens:
+        if atraso:
+            await asyncio.sleep(atraso)
+        yield EventoChat.token(item) if isinstance(item, str) else item
+
+
+def _frames(eventos, **kwargs):
+    async def coletar():
+        return [frame async for frame in stream_sse(eventos, **kwargs)]
+    return asyncio.run(coletar())
+
+
+def _parse(frames):
+    """[(tipo, dados)] dos frames de evento; heartbeats viram ("ping", None)."""
+    resultado = []
+    for frame in frames:
+        if frame == HEARTBEAT:
+            resultado.append(("ping", None))
+            continue
+        tipo, dados = frame.strip().split("\n")
+        resultado.append((tipo[len("event: "):], json.loads(dados[len("data: "):])))
+    return resultado
+
+
+def test_tokens_sao_coalescidos_por_tamanho():
+    eventos = _parse(_frames(_emitir(["x"] * 200), max_chars=50, intervalo_flush=10, heartbeat=10))
+
+    tokens = [dados["texto"] for tipo, dados in eventos if tipo == "token"]
+    assert tokens == ["x" * 50] * 4
+    assert eventos[-1] == ("done", {"chars": 200})
+
+def test_tokens_lentos_saem_pelo_intervalo_de_flush():
+    eventos = _parse(_frames(_emitir(["a", "b", "c"], atraso=0.05), max_chars=1000, intervalo_flush=0.01, heartbeat=10))
+
+    assert [dados["texto"] for tipo, dados in eventos if tipo == "token"] == ["a", "b", "c"]
+
+def test_heartbeat_em_periodo_ocioso():
+    eventos = _parse(_frames(_emitir(["oi"], atraso=0.15), max_chars=1000, intervalo_flush=0.01, heartbeat=0.04))
+
+    assert ("ping", None) in eventos[:eventos.index(("token", {"texto": "oi"}))]
+
+def test_evento_tipado_descarrega_tokens_antes_e_preserva_ordem():
+    mudanca = EventoChat("agent_changed", {"de": "ORCHESTRATOR", "para": "QA"})
+    eventos = _parse(_frames(_emitir(["a", "b", mudanca, "c", "d"]), max_chars=1000, intervalo_flush=10, heartbeat=10))
+
+    assert eventos == [
+        ("token", {"texto": "ab"}),
+        ("agent_changed", {"de": "ORCHESTRATOR", "para": "QA"}),
+        ("token", {"texto": "cd"}),
+        ("done", {"chars": 4}),
+    ]
+
+def test_excecao_no_pipeline_vira_evento_de_erro():
+    async def quebrado():
+        yield EventoChat.token("parcial")
+        raise RuntimeError("provedor fora do ar")
+
+    eventos = _parse(_frames(quebrado(), max_chars=1000, intervalo_flush=10, heartbeat=10))
+
+    assert [tipo for tipo, _ in eventos] == ["token", "error", "done"]
+    assert eventos[1][1] == {"codigo": "ERRO_INTERNO", "mensagem": MENSAGEM_ERRO_INTERNO}
+    assert "provedor fora do ar" not in "".join(_frames(quebrado(), max_chars=1000, intervalo_flush=10, heartbeat=10))
+
+
+def _orquestrador(session_state, docs_manager=None):
+    mm = MagicMock()
+    mm.session_state = session_state
+    mm.mensagens = []
+    mm.get_historico_langchain.return_value = []
+    mm.rag_manager.get_contexto_para_prompt.return_value = "Trechos de teste."
+    return OrchestratorAgent(mm, docs_manager=docs_manager)
+
+
+def _coletar_eventos(agente, pergunta, triagem="CONSULTA", tokens=("Olá", " mundo")):
+    async def stream(_payload):
+        for token in tokens:
+            yield MagicMock(content=token)
+
+    llm = MagicMock()
+    llm.ainvoke = AsyncMock(return_value=AIMessage(content=triagem))
+    with patch.object(OrchestratorAgent, 'llm', new_callable=PropertyMock) as llm_prop, \
+            patch('agents.orchestrator.ChatPromptTemplate.from_messages') as template_factory:
+        llm_prop.return_value = llm
+        template_factory.return_value.__or__.return_value.astream.side_effect = stream
+
+        async def coletar():
+            return [evento async for evento in agente.aeventos(pergunta)]
+        return asyncio.run(coletar())
+
+
+def test_orquestrador_emite_troca_de_agente_recuperacao_e_tokens():
+    agente = _orquestrador({'agente_ativo': 'ORCHESTRATOR'})
+
+    eventos = _coletar_eventos(agente, "O que dizem os autores?")
+
+    assert [e.tipo for e in eventos] == ["agent_changed", "retrieval_done", "token", "token"]
+    assert eventos[0].dados == {"de": "ORCHESTRATOR", "para": "QA"}
+    assert eventos[1].dados["chars"] == len("Trechos de teste.")
+    # Eventos de estado não aparecem no stream em texto puro
+    assert "".join(e.texto for e in eventos) == "Olá mundo"
+
+def test_aprovacao_da_estrutura_emite_link_e_secao_pendente():
+    estrutura = {'titulo': 'Tese', 'secoes': [{'key': 'INTRO', 'titulo': 'Introdução'}]}
+    docs = MagicMock()
+    docs.create_academic_document.return_value = "doc_42"
+    agente = _orquestrador({'agente_ativo': 'AGUARDANDO_APROVACAO', 'current_structure': estrutura}, docs)
+
+    eventos = _coletar_eventos(agente, "aprovo", tokens=("### Introdução", "\nTexto."))
+
+    assert [e.tipo for e in eventos] == ["agent_changed", "doc_link", "token", "token", "agent_changed", "section_pending"]
+    assert eventos[1].dados == {"doc_id": "doc_42", "url": "https://docs.google.com/document/d/doc_42"}
+    assert "Estrutura Aprovada" in eventos[1].texto
+    assert eventos[-2].dados == {"de": "ORCHESTRATOR", "para": "AGUARDANDO_APROVACAO_CONTEUDO"}
+    assert eventos[-1].dados == {"key": "INTRO", "titulo": "Introdução", "acao": "gerada"}
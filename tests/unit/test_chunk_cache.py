@@ -0,0 +1,128 @@
+# tests/unit/test_chunk_cache.py
+"""Testes do cache incremental de chunks por documento."""
+
+from unittest.mock import MagicMock
+from services.chunk_cache import ChunkCache
+from services.text_processor import TextProcessor, ChunkConfig
+
+TEXTO = "Texto acadêmico com conteúdo suficiente para validação e divisão em chunks menores. " * 20
+
+
+def test_processar_e_reler_do_disco(tmp_path):
+    config = ChunkConfig(chunk_size=200, chunk_overlap=20)
+    cache = ChunkCache(config, base_dir=str(tmp_path))
+    entrada = cache.processar("h1", TEXTO, TextProcessor(config))
+    assert entrada["valido"]
+    assert len(entrada["chunks"]) > 1
+
+    # Nova instância (outro processo): lê do disco sem reprocessar
+    reaberto = ChunkCache(config, base_dir=str(tmp_path))
+    assert reaberto.get("h1") == entrada
+
+    chunks = ChunkCache.chunks_para(entrada, "artigo.pdf")
+    assert chunks[0].documento_origem == "artigo.pdf"
+    assert [c.indice for c in chunks] == list(range(len(chunks)))
+
+def test_config_diferente_nao_compartilha(tmp_path):
+    a = ChunkCache(ChunkConfig(chunk_size=200, chunk_overlap=20), base_dir=str(tmp_path))
+    b = ChunkCache(ChunkConfig(chunk_size=300, chunk_overlap=20), base_dir=str(tmp_path))
+    a.processar("h1", TEXTO, TextProcessor(a.config))
+    assert b.get("h1") is None
+
+def test_documento_em_cache_nao_e_relido(mocker, tmp_path):
+    """Um upload só lê e chunka o documento novo."""
+    from services.rag_manager import RAGManager
+    from services.index_manifest import IndexManifest
+    rm = RAGManager(session_state={'session_id': 's-chunks'})
+    rm.chroma_client = MagicMock()
+    rm.manifest = IndexManifest(rm.collection_name, base_dir=str(tmp_path))
+    rm.chunk_cache = ChunkCache(rm.text_processor.config, base_dir=str(tmp_path))
+
+    antigo = MagicMock(nome="antigo.pdf", hash="h-antigo")
+    antigo.get_conteudo.return_value = TEXTO
+    rm.indexar_documentos([antigo])
+
+    novo = MagicMock(nome="novo.pdf", hash="h-novo")
+    novo.get_conteudo.return_value = TEXTO + " extra"
+    stats = rm.indexar_documentos([antigo, novo])
+
+    antigo.get_conteudo.assert_called_once()
+    novo.get_conteudo.assert_called_once()
+    assert stats["total_chunks"] == len(rm.session_state["rag_chunks"])
+    assert set(stats["documentos"]) == {"antigo.pdf", "novo.pdf"}
+
+def test_somar_estatisticas_equivale_a_get_estatisticas():
+    tp = TextProcessor(ChunkConfig(chunk_size=200, chunk_overlap=20))
+    chunks = tp.criar_chunks(TEXTO, "a.pdf") + tp.criar_chunks(TEXTO[:500], "b.pdf")
+    por_doc = [
+        ("a.pdf", sum(1 for c in chunks if c.documento_origem == "a.pdf"), sum(c.total_chars for c in chunks if c.documento_origem == "a.pdf")),
+        ("b.pdf", sum(1 for c in chunks if c.documento_origem == "b.pdf"), sum(c.total_chars for c in chunks if c.documento_origem == "b.pdf")),
+    ]
+    esperado = tp.get_estatisticas(chunks)
+    obtido = tp.somar_estatisticas(por_doc)
+    assert obtido["total_chunks"] == esperado["total_chunks"]
+    assert obtido["total_chars"] == esperado["total_chars"]
+    assert sorted(obtido["documentos"]) == sorted(esperado["documentos"])
+
+def test_csv_chunks_por_registro_com_cabecalho(tmp_path):
+    import io
+    import types
+    linhas_lidas = []
+
+    def linhas():
+        yield "id,titulo,resumo\n"
+        for i in range(40):
+            linha = f'{i},Artigo {i},"Resumo, com vírgula, do artigo {i}"\n'
+            linhas_lidas.append(i)
+            yield linha
+
+    config = ChunkConfig(chunk_size=200, chunk_overlap=20)
+    gerador = TextProcessor(config).criar_chunks_csv(linhas(), "dados.csv")
+    assert isinstance(gerador, types.GeneratorType)
+    primeiro = next(gerador)
+    assert len(linhas_lidas) < 40  # Emitido antes de ler o arquivo inteiro
+
+    chunks = [primeiro] + list(gerador)
+    assert [c.indice for c in chunks] == list(range(len(chunks)))
+    registros = []
+    for c in chunks:
+        cabecalho, *corpo = c.conteudo.split("\n")
+        assert cabecalho == "id,titulo,resumo"
+        assert c.total_chars <= 200
+        registros += corpo
+    assert registros == [f'{i},Artigo {i},"Resumo, com vírgula, do artigo {i}"' for i in range(40)]
+
+    cache = ChunkCache(config, base_dir=str(tmp_path))
+    assert not cache.processar_csv("h-vazio", io.StringIO("so,cabecalho\n"), TextProcessor(config))["valido"]
+
+def test_csv_grava_chunks_no_cache_durante_a_leitura(tmp_path):
+    import io
+    import os
+    config = ChunkConfig(chunk_size=200, chunk_overlap=20)
+    cache = ChunkCache(config, base_dir=str(tmp_path))
+    tamanhos_parciais = []
+
+    def linhas(observar=False):
+        yield "id,titulo,resumo\n"
+        for i in range(400):
+            if observar and i == 300:
+                [parcial] = [n for n in os.listdir(cache.dir) if n.endswith(".tmp")]
+                tamanhos_parciais.append(os.path.getsize(os.path.join(cache.dir, parcial)))
+            yield f'{i},Artigo {i},"Resumo, com vírgula, do artigo {i}"\n'
+
+    entrada = cache.processar_csv("h-csv", linhas(observar=True), TextProcessor(config))
+
+    assert tamanhos_parciais[0] > 0  # Chunks já emitidos foram para o disco antes do fim da leitura
+    assert entrada["valido"] and entrada["mensagem"] == "Conteúdo válido"
+    esperado = list(TextProcessor(config).criar_chunks_csv(linhas(), ""))
+    assert entrada["chunks"] == [c.conteudo for c in esperado]
+    assert entrada["total_chars"] == sum(c.total_chars for c in esperado)
+    assert not [n for n in os.listdir(cache.dir) if n.endswith(".tmp")]
+    cache.limpar()
+    assert cache.get("h-csv") == entrada
+
+    # Mesma validação de conteúdo dos demais formatos
+    bloqueado = "pagina,aviso\n1,Just a moment enquanto verificamos o navegador e liberamos o acesso\n"
+    invalido = cache.processar_csv("h-js", io.StringIO(bloqueado), TextProcessor(config))
+    assert not invalido["valido"] and "JavaScript" in invalido["mensagem"]
+    assert invalido["chunks"] == []
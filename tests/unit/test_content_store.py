@@ -0,0 +1,60 @@
+# tests/unit/test_content_store.py
+"""Testes do armazém de textos comprimido em blocos."""
+
+import csv
+import hashlib
+import os
+import zlib
+
+import pytest
+from services.content_store import ContentStore, TextoComprimido
+
+TEXTO = "".join(f"Linha {i}: ação, reação e citação acadêmica.\n" for i in range(500))
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ContentStore(str(tmp_path), bloco_chars=1000)
+
+
+def test_gravar_em_partes_e_ler(store):
+    partes = [TEXTO[i:i + 333] for i in range(0, len(TEXTO), 333)]
+    content_hash = store.gravar(iter(partes))
+
+    assert content_hash == hashlib.md5(TEXTO.encode("utf-8")).hexdigest()
+    texto = store.abrir(content_hash)
+    assert texto.total_chars == len(TEXTO)
+    assert texto.ler() == TEXTO
+    # Comprimido e sem temporários no diretório
+    assert os.path.getsize(store.caminho(content_hash)) < len(TEXTO.encode("utf-8")) / 2
+    assert os.listdir(store.dir) == [f"{content_hash}.blk"]
+    # Regravar o mesmo conteúdo não duplica
+    assert store.gravar(TEXTO) == content_hash
+
+def test_leitura_por_intervalo_descomprime_so_os_blocos_necessarios(store, mocker):
+    texto = store.abrir(store.gravar(TEXTO))
+    descomprimir = mocker.spy(zlib, "decompress")
+
+    assert texto.ler_intervalo(2500, 2600) == TEXTO[2500:2600]
+    assert descomprimir.call_count == 1
+    assert texto.ler_intervalo(1990, 3010) == TEXTO[1990:3010]
+    assert descomprimir.call_count == 1 + 3
+    assert texto.ler_intervalo(len(TEXTO) - 5, len(TEXTO) + 100) == TEXTO[-5:]
+    assert texto.ler_intervalo(10, 10) == ""
+
+def test_linhas_em_streaming_alimentam_csv(store):
+    dados = "id,resumo\n" + "".join(f'{i},"texto, com\nquebra {i}"\n' for i in range(300))
+    texto = store.abrir(store.gravar(dados))
+
+    linhas = texto.linhas()
+    assert next(linhas) == "id,resumo\n"
+    registros = list(csv.reader(linhas))
+    assert len(registros) == 300
+    assert registros[-1] == ["299", "texto, com\nquebra 299"]
+
+def test_texto_vazio_e_arquivo_invalido(store, tmp_path):
+    assert store.abrir(store.gravar([])).ler() == ""
+    invalido = tmp_path / "x.blk"
+    invalido.write_bytes(b"texto puro, fora do formato do store")
+    with pytest.raises(ValueError):
+        TextoComprimido(str(invalido))
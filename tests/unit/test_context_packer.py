@@ -0,0 +1,59 @@
+# tests/unit/test_context_packer.py
+"""Testes da montagem de contexto com fusão de chunks e orçamento de tokens."""
+
+from langchain_core.documents import Document
+from services.context_packer import empacotar_contexto, fundir_trechos, sobreposicao
+from services.text_processor import TextProcessor, ChunkConfig
+
+TEXTO = " ".join(f"Frase número {i} do artigo sobre metodologia científica." for i in range(60))
+
+
+def _docs(chunks, source="a.pdf", hash_="h1"):
+    return [
+        Document(page_content=c.conteudo, metadata={"source": source, "hash": hash_, "chunk_index": c.indice, "tokens": c.tokens})
+        for c in chunks
+    ]
+
+def test_sobreposicao():
+    assert sobreposicao("abc def ghi", "def ghi jkl", 100) == 7
+    assert sobreposicao("abc", "xyz", 100) == 0
+
+def test_chunks_adjacentes_sao_fundidos_sem_repeticao():
+    tp = TextProcessor(ChunkConfig(chunk_size=300, chunk_overlap=80))
+    chunks = tp.criar_chunks(TEXTO, "a.pdf")
+    assert len(chunks) > 3
+
+    # Ranking fora de ordem, com duplicata (ex.: busca híbrida + global)
+    docs = _docs([chunks[2], chunks[1], chunks[3], chunks[2]])
+    trechos = fundir_trechos(docs, 80)
+
+    assert len(trechos) == 1
+    assert trechos[0].indices == [1, 2, 3]
+    # O texto fundido não repete o overlap
+    assert len(trechos[0].conteudo) < sum(len(c.conteudo) for c in chunks[1:4])
+    assert trechos[0].conteudo.count("Frase número 10 ") <= 1
+    assert trechos[0].conteudo.startswith(chunks[1].conteudo)
+    assert trechos[0].conteudo.endswith(chunks[3].conteudo)
+    assert trechos[0].tokens < sum(c.tokens for c in chunks[1:4])
+
+def test_documentos_diferentes_nao_se_fundem_e_mantem_ranking():
+    tp = TextProcessor(ChunkConfig(chunk_size=300, chunk_overlap=80))
+    a = tp.criar_chunks(TEXTO, "a.pdf")
+    b = tp.criar_chunks(TEXTO, "b.pdf")
+    docs = _docs([b[0]], source="b.pdf", hash_="h2") + _docs([a[0]])
+    trechos = fundir_trechos(docs, 80)
+    assert [t.source for t in trechos] == ["b.pdf", "a.pdf"]
+
+def test_orcamento_de_tokens():
+    docs = [
+        Document(page_content="alfa " * 200, metadata={"source": "a.pdf", "hash": "h1", "chunk_index": 0, "tokens": 200}),
+        Document(page_content="beta " * 50, metadata={"source": "b.pdf", "hash": "h2", "chunk_index": 0, "tokens": 50}),
+        Document(page_content="gama " * 50, metadata={"source": "c.pdf", "hash": "h3", "chunk_index": 0, "tokens": 50}),
+    ]
+    # O primeiro não cabe; os menores, mais abaixo, preenchem o orçamento
+    assert [t.source for t in empacotar_contexto(docs, 120)] == ["b.pdf", "c.pdf"]
+    assert len(empacotar_contexto(docs, 0)) == 3
+
+    # Nada cabe: o melhor trecho é truncado em vez de devolver contexto vazio
+    truncado = empacotar_contexto(docs[:1], 40)
+    assert len(truncado) == 1 and truncado[0].tokens <= 60
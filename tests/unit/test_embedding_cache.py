@@ -0,0 +1,70 @@
+# tests/unit/test_embedding_cache.py
+"""Testes do cache persistente de embeddings."""
+
+import pytest
+from unittest.mock import MagicMock
+from services.embedding_cache import EmbeddingCache, CachedEmbeddings, hash_texto
+
+np = pytest.importorskip("numpy")
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return EmbeddingCache("teste", base_dir=str(tmp_path))
+
+def test_put_e_get(cache):
+    cache.put_many(["a", "b"], [[1.0, 0.0], [0.0, 1.0]])
+    res = cache.get_many(["a", "b", "c"])
+    assert res["a"] == [1.0, 0.0]
+    assert res["b"] == [0.0, 1.0]
+    assert "c" not in res
+    assert cache.get_stats()["hits"] == 2
+    assert cache.get_stats()["misses"] == 1
+
+def test_persistencia_entre_instancias(cache, tmp_path):
+    cache.put_many(["a"], [[0.5, 0.25]])
+    reaberto = EmbeddingCache("teste", base_dir=str(tmp_path))
+    assert reaberto.get_many(["a"])["a"] == [0.5, 0.25]
+
+def test_namespace_depende_do_chunking():
+    assert EmbeddingCache.namespace_para("m", 1200, 300) != EmbeddingCache.namespace_para("m", 1000, 300)
+
+def test_cached_embeddings_so_calcula_faltantes(cache):
+    base = MagicMock()
+    base.embed_documents.side_effect = lambda textos: [[float(len(t)), 1.0] for t in textos]
+    emb = CachedEmbeddings(base, cache)
+
+    primeira = emb.embed_documents(["abc", "de"])
+    assert base.embed_documents.call_count == 1
+
+    # Reindexação do mesmo conteúdo: nenhuma inferência
+    segunda = emb.embed_documents(["de", "abc"])
+    assert base.embed_documents.call_count == 1
+    assert segunda == [primeira[1], primeira[0]]
+    assert hash_texto("abc") in cache
+
+def test_queda_no_meio_da_escrita_nao_desalinha_vetores(tmp_path):
+    cache = EmbeddingCache("teste", base_dir=str(tmp_path))
+    cache.put_many(["a", "b"], [[1.0, 2.0], [3.0, 4.0]])
+    # Simula queda: meia linha em vectors.bin e linha do índice truncada sem '\n' ("c\t1" de "c\t12")
+    with open(cache._vectors_path, 'ab') as f:
+        f.write(b'\x00\x3c')
+    with open(cache._index_path, 'a', encoding='utf-8') as f:
+        f.write("c\t1")
+
+    reaberto = EmbeddingCache("teste", base_dir=str(tmp_path))
+    assert "c" not in reaberto
+    reaberto.put_many(["d"], [[5.0, 6.0]])
+
+    final = EmbeddingCache("teste", base_dir=str(tmp_path))
+    assert final.get_many(["a", "b", "d"]) == {"a": [1.0, 2.0], "b": [3.0, 4.0], "d": [5.0, 6.0]}
+    assert "c" not in final
+
+def test_falta_e_acerto_retornam_o_mesmo_vetor(cache):
+    base = MagicMock()
+    base.embed_documents.side_effect = lambda textos: [[0.1234567, 1 / 3] for _ in textos]
+    emb = CachedEmbeddings(base, cache)
+
+    calculado = emb.embed_documents(["texto"])
+    assert emb.embed_documents(["texto"]) == calculado
+    assert base.embed_documents.call_count == 1
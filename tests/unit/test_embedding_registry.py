@@ -0,0 +1,38 @@
+# tests/unit/test_embedding_registry.py
+"""Testes do registro de modelos de embedding compartilhado."""
+
+import pytest
+from unittest.mock import MagicMock
+from services.embedding_registry import EmbeddingRegistry, EMBEDDING_REGISTRY
+from services.rag_manager import RAGManager
+
+
+@pytest.fixture
+def registry(mocker):
+    reg = EmbeddingRegistry()
+    mocker.patch.object(EmbeddingRegistry, "_carregar", side_effect=lambda nome, device: MagicMock(name=f"{nome}@{device}"))
+    return reg
+
+def test_get_reutiliza_instancia(registry):
+    """O mesmo (modelo, device) deve carregar uma única vez."""
+    a = registry.get("all-MiniLM-L6-v2", "cpu")
+    b = registry.get("all-MiniLM-L6-v2", "cpu")
+    assert a is b
+    assert EmbeddingRegistry._carregar.call_count == 1
+
+def test_get_chaves_distintas(registry):
+    """Devices diferentes geram instâncias diferentes."""
+    assert registry.get("m", "cpu") is not registry.get("m", "cuda")
+
+def test_warmup_sinaliza_prontidao(registry):
+    assert not registry.is_ready
+    registry.warmup("m")
+    assert registry.is_ready
+    assert registry.carregados() == ["m@cpu"]
+
+def test_sessoes_compartilham_modelo(mock_embeddings, mock_chroma):
+    """Dois RAGManagers de sessões distintas usam o mesmo objeto de embeddings."""
+    EMBEDDING_REGISTRY.limpar()
+    rm1 = RAGManager(session_state={})
+    rm2 = RAGManager(session_state={})
+    assert rm1.session_state["embedding_model"] is rm2.session_state["embedding_model"]
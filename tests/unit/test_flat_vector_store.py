@@ -0,0 +1,135 @@
+# tests/unit/test_flat_vector_store.py
+"""Testes do índice vetorial flat (NumPy memmap, segmentos append-only)."""
+
+import os
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from services.vector_store import FlatVectorStore
+
+
+class EmbeddingsFalsos(Embeddings):
+    """Vetores determinísticos: cada texto vira o eixo da sua primeira letra."""
+
+    def _vetor(self, texto):
+        v = np.zeros(4, dtype=np.float32)
+        v["abcd".index(texto[0])] = 1.0
+        return v.tolist()
+
+    def embed_documents(self, texts):
+        return [self._vetor(t) for t in texts]
+
+    def embed_query(self, text):
+        return self._vetor(text)
+
+
+def _docs(*textos, hash_="h1", source="a.pdf"):
+    return [Document(page_content=t, metadata={"source": source, "hash": hash_, "chunk_index": i}) for i, t in enumerate(textos)]
+
+
+def test_busca_exata_e_persistencia(tmp_path):
+    store = FlatVectorStore("col", EmbeddingsFalsos(), base_dir=str(tmp_path))
+    store.add_documents(_docs("a1", "b1"))
+    store.add_documents(_docs("c1", hash_="h2", source="b.pdf"))
+
+    assert [d.page_content for d in store.similarity_search("c?", k=1)] == ["c1"]
+    doc, distancia = store.similarity_search_with_score("b?", k=1)[0]
+    assert doc.page_content == "b1" and abs(distancia) < 1e-6
+
+    # Reabertura (outro processo): segmentos lidos via memmap
+    reaberto = FlatVectorStore("col", EmbeddingsFalsos(), base_dir=str(tmp_path))
+    assert len(reaberto) == 3
+    assert reaberto.similarity_search("a?", k=1, filter={"source": "a.pdf"})[0].page_content == "a1"
+    assert reaberto.similarity_search("c?", k=5, filter={"source": "a.pdf"})[0].metadata["source"] == "a.pdf"
+
+def test_busca_em_lote(tmp_path):
+    store = FlatVectorStore("col", EmbeddingsFalsos(), base_dir=str(tmp_path))
+    store.add_documents(_docs("a1", "b1", "c1", "d1"))
+    resultados = store.buscar_lote(["d?", "b?"], k=2)
+    assert [r[0][0].page_content for r in resultados] == ["d1", "b1"]
+    assert all(len(r) == 2 for r in resultados)
+
+def test_remocao_compacta_segmentos(tmp_path):
+    store = FlatVectorStore("col", EmbeddingsFalsos(), base_dir=str(tmp_path))
+    store.add_documents(_docs("a1", "b1") + _docs("c1", hash_="h2"))
+    store.remover_hashes({"h2"})
+
+    assert {m["hash"] for m in store.metadatas()} == {"h1"}
+    # Segmento antigo substituído; só arquivos referenciados pelo manifesto permanecem
+    segmentos = [f for f in os.listdir(store.dir) if f.startswith("seg-")]
+    assert len(segmentos) == 2
+
+    reaberto = FlatVectorStore("col", EmbeddingsFalsos(), base_dir=str(tmp_path))
+    assert len(reaberto) == 2
+
+def test_segmento_orfao_e_ignorado(tmp_path):
+    store = FlatVectorStore("col", EmbeddingsFalsos(), base_dir=str(tmp_path))
+    store.add_documents(_docs("a1"))
+    # Simula queda entre a gravação do segmento e a troca do manifesto
+    with open(os.path.join(store.dir, "seg-orfao.f32"), "wb") as f:
+        f.write(b"\0" * 16)
+
+    reaberto = FlatVectorStore("col", EmbeddingsFalsos(), base_dir=str(tmp_path))
+    assert len(reaberto) == 1
+    assert not os.path.exists(os.path.join(store.dir, "seg-orfao.f32"))
+
+def test_pontuar_para_busca_agrupada(tmp_path):
+    store = FlatVectorStore("col", EmbeddingsFalsos(), base_dir=str(tmp_path))
+    assert len(store.pontuar([1.0, 0.0, 0.0, 0.0])[1]) == 0
+    store.add_documents(_docs("a1", "b1"))
+    scores, documentos, metadatas = store.pontuar([1.0, 0.0, 0.0, 0.0])
+    assert documentos == ["a1", "b1"]
+    assert scores.tolist() == [1.0, 0.0]
+    store.apagar()
+    assert len(store) == 0
+
+def test_rag_manager_com_backend_flat(tmp_path, monkeypatch):
+    from dataclasses import replace
+    from config.settings import RAG_CONFIG
+    from services import vector_store
+    from services.rag_manager import RAGManager
+    from services.index_manifest import IndexManifest
+    from services.chunk_cache import ChunkCache
+
+    monkeypatch.setattr(vector_store, "DEFAULT_FLAT_DIR", str(tmp_path / "flat"))
+    rm = RAGManager(config=replace(RAG_CONFIG, vector_backend="flat", modo_busca="vetorial"), session_state={'session_id': 's-flat'})
+    rm.embeddings = EmbeddingsFalsos()
+    rm.manifest = IndexManifest(rm.collection_name, base_dir=str(tmp_path))
+    rm.chunk_cache = ChunkCache(rm.text_processor.config, base_dir=str(tmp_path))
+
+    texto = "abacate " * 40
+    rm.indexar_documentos([("a.pdf", texto, "h-a")])
+    assert isinstance(rm.vector_store, FlatVectorStore)
+    assert rm.buscar_relevantes("a", top_k=1)[0].metadata["source"] == "a.pdf"
+    assert [d.metadata["source"] for d in rm.buscar_em_todos_os_documentos("a", k_por_doc=1)] == ["a.pdf"]
+
+    rm.limpar_indice()
+    assert len(vector_store.get_flat_store(rm.collection_name, rm.embeddings)) == 0
+    vector_store.descartar_flat_stores()
+
+def test_liberar_colecao_da_sessao(tmp_path, monkeypatch):
+    """Expulsão solta o índice aberto; sessão removida apaga índices, manifesto e BM25."""
+    from dataclasses import replace
+    from config.settings import RAG_CONFIG
+    from services import vector_store
+    from services.index_manifest import IndexManifest
+    from services.lexical_index import LexicalIndex
+    from services.rag_manager import liberar_colecao, nome_colecao
+
+    monkeypatch.setattr(vector_store, "DEFAULT_FLAT_DIR", str(tmp_path / "flat"))
+    config = replace(RAG_CONFIG, vector_backend="flat")
+    nome = nome_colecao(config.collection_name, "s1")
+    store = vector_store.get_flat_store(nome, EmbeddingsFalsos())
+    store.add_documents(_docs("abacate"))
+    manifesto = IndexManifest(nome)
+    manifesto.adicionar("h1", "a.pdf", 1)
+    manifesto.salvar()
+    lexical = LexicalIndex(nome)
+
+    liberar_colecao("s1", config=config)
+    assert nome not in vector_store._flat_stores
+    assert os.path.exists(store.dir) and manifesto.existe
+
+    liberar_colecao("s1", apagar=True, config=config)
+    assert not os.path.exists(store.dir)
+    assert not os.path.exists(manifesto.path) and not os.path.exists(lexical.path)
@@ -0,0 +1,54 @@
+# tests/unit/test_index_manifest.py
+"""Testes do manifesto de hashes indexados e do isolamento de coleções."""
+
+from unittest.mock import MagicMock, patch
+from services.index_manifest import IndexManifest
+from services.rag_manager import RAGManager, nome_colecao
+from services.chunk_cache import ChunkCache
+
+
+def test_manifesto_persiste(tmp_path):
+    m = IndexManifest("colecao", base_dir=str(tmp_path))
+    assert not m.existe
+    m.adicionar("h1", "a.pdf", 3)
+    m.salvar()
+
+    reaberto = IndexManifest("colecao", base_dir=str(tmp_path))
+    assert reaberto.existe
+    assert reaberto.hashes == {"h1"}
+    assert reaberto.fontes == {"a.pdf"}
+
+def test_reconstruir_a_partir_de_metadados(tmp_path):
+    m = IndexManifest("colecao", base_dir=str(tmp_path))
+    m.reconstruir([{"hash": "h1", "source": "a.pdf"}, {"hash": "h1", "source": "a.pdf"}, {"source": "sem_hash"}])
+    assert m.hashes == {"h1"}
+
+def test_colecoes_isoladas_por_sessao():
+    assert nome_colecao("oraculo_docs", None) == "oraculo_docs"
+    assert nome_colecao("oraculo_docs", "s1") != nome_colecao("oraculo_docs", "s2")
+    with patch('chromadb.PersistentClient'), \
+         patch('langchain_huggingface.HuggingFaceEmbeddings'):
+        rm1 = RAGManager(session_state={'session_id': 's1'})
+        rm2 = RAGManager(session_state={'session_id': 's2'})
+    assert rm1.collection_name != rm2.collection_name
+    # Um único cliente Chroma para o processo
+    assert rm1.chroma_client is rm2.chroma_client
+
+def test_sincronizacao_usa_manifesto(tmp_path):
+    with patch('chromadb.PersistentClient'), \
+         patch('langchain_huggingface.HuggingFaceEmbeddings'):
+        rm = RAGManager(session_state={'session_id': 's-manifesto'})
+    rm.chroma_client = MagicMock()
+    rm.manifest = IndexManifest(rm.collection_name, base_dir=str(tmp_path))
+    rm.manifest.adicionar("antigo", "velho.pdf", 2)
+    rm.manifest.salvar()
+    rm.chunk_cache = ChunkCache(rm.text_processor.config, base_dir=str(tmp_path))
+    collection = rm.chroma_client.get_or_create_collection.return_value
+
+    texto = "Conteúdo acadêmico suficientemente longo para passar na validação do processador de texto. " * 3
+    rm.indexar_documentos([("novo.pdf", texto, "novo")])
+
+    # Sem varredura completa da coleção: apenas remoção do hash obsoleto
+    collection.get.assert_not_called()
+    collection.delete.assert_called_once_with(where={"hash": {"$in": ["antigo"]}})
+    assert rm.manifest.hashes == {"novo"}
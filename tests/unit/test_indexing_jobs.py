@@ -0,0 +1,85 @@
+# tests/unit/test_indexing_jobs.py
+"""Testes da fila de jobs de indexação em background."""
+
+import asyncio
+import threading
+import pytest
+from services.indexing_jobs import IndexingQueue, FilaCheiaError
+
+
+@pytest.fixture
+def fila():
+    q = IndexingQueue(max_workers=1, max_pendentes=2, max_historico=10)
+    yield q
+    q.shutdown()
+
+def _aguardar(job, timeout=5):
+    import time
+    limite = time.time() + timeout
+    while not job.finalizado and time.time() < limite:
+        time.sleep(0.01)
+
+def test_job_concluido_com_progresso(fila):
+    def tarefa(progress_callback):
+        progress_callback(0.5, "Metade")
+        return {"total_chunks": 3}
+
+    job = fila.submit("s1", tarefa, descricao="a.pdf")
+    _aguardar(job)
+    assert job.status == "concluido"
+    assert job.progresso == 1.0
+    assert job.snapshot()["resultado"] == {"total_chunks": 3}
+
+def test_job_com_erro(fila):
+    def tarefa(progress_callback):
+        raise RuntimeError("Documento sem conteúdo extraível.")
+
+    job = fila.submit("s1", tarefa)
+    _aguardar(job)
+    assert job.status == "erro"
+    assert "sem conteúdo" in job.erro
+
+def test_fila_cheia_recusa(fila):
+    liberar = threading.Event()
+    fila.submit("s1", lambda cb: liberar.wait(5))
+    fila.submit("s2", lambda cb: liberar.wait(5))
+    with pytest.raises(FilaCheiaError):
+        fila.submit("s3", lambda cb: None)
+    liberar.set()
+
+def test_acompanhar_emite_ate_finalizar(fila):
+    job = fila.submit("s1", lambda cb: (cb(0.3, "Processando"), {"ok": True})[1])
+
+    async def coletar():
+        return [e async for e in fila.acompanhar(job.id, intervalo=0.01)]
+
+    eventos = asyncio.run(coletar())
+    assert eventos[-1]["status"] == "concluido"
+    assert eventos[-1]["resultado"] == {"ok": True}
+
+def test_shutdown_cancela_fila_e_termina_job_em_execucao():
+    fila = IndexingQueue(max_workers=1, max_pendentes=5, max_historico=10)
+    iniciou, liberar = threading.Event(), threading.Event()
+
+    def lenta(progress_callback):
+        iniciou.set()
+        liberar.wait(5)
+        return {"ok": True}
+
+    executando = fila.submit("s1", lenta)
+    na_fila = [fila.submit("s1", lambda cb: {}), fila.submit("s2", lambda cb: {})]
+    assert iniciou.wait(5)
+
+    encerramento = threading.Thread(target=fila.shutdown)
+    encerramento.start()
+    _aguardar(na_fila[-1])
+    assert all(j.status == "erro" and "encerramento" in j.erro for j in na_fila)
+    with pytest.raises(FilaCheiaError, match="encerrada"):
+        fila.submit("s3", lambda cb: {})
+
+    liberar.set()
+    encerramento.join(5)
+    assert not encerramento.is_alive()
+    assert executando.status == "concluido" and executando.resultado == {"ok": True}
+    metricas = fila.fila.get_metricas()
+    assert (metricas["em_execucao"], metricas["na_fila"]) == (0, 0)
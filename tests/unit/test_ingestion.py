@@ -1,6 +1,6 @@
 import pytest
 import os
-from execution.document_ingestion import extract_from_url, extract_from_file
+from execution.document_ingestion import extract_from_url, extract_from_file, extrair_arquivo, detectar_encoding
 
 def test_extract_from_file_txt(tmp_path):
     """Testa extração de arquivo TXT."""
@@ -12,6 +12,48 @@ def test_extract_from_file_txt(tmp_path):
     content = extract_from_file(str(p), ".txt")
     assert "Hello World" in content
 
+@pytest.mark.parametrize("encoding, esperado", [
+    ("utf-8", "utf-8"),
+    ("utf-8-sig", "utf-8-sig"),
+    ("utf-16", "utf-16"),
+    ("utf-16-le", "utf-16-le"),
+    ("cp1252", "cp1252"),
+    ("latin-1", "latin-1"),
+])
+def test_txt_detecta_encoding(tmp_path, encoding, esperado):
+    texto = "Ação e reação — “citação”" if encoding != "latin-1" else "Ação e reação: ¿citação?"
+    p = tmp_path / "a.txt"
+    p.write_bytes(texto.encode(encoding))
+    conteudo, metadados = extrair_arquivo(str(p), ".txt")
+    assert conteudo == texto
+    assert metadados == {"encoding": esperado}
+
+def test_csv_latin1_lido_uma_vez(tmp_path, mocker):
+    p = tmp_path / "dados.csv"
+    p.write_bytes("nome,cidade\nJoão,São Paulo\n\"Maria, Jr\",Brasília\n".encode("latin-1"))
+    abrir = mocker.spy(__import__("builtins"), "open")
+    conteudo, metadados = extrair_arquivo(str(p), ".csv")
+    assert metadados["encoding"] == "latin-1"
+    assert conteudo == 'nome,cidade\nJoão,São Paulo\n"Maria, Jr",Brasília\n'
+    assert [c.args[0] for c in abrir.call_args_list].count(str(p)) == 1
+
+def test_csv_ponto_e_virgula_normalizado(tmp_path):
+    p = tmp_path / "dados.csv"
+    p.write_text("ano;valor\n\n2020; 1,5\n2021;2,0\n", encoding="utf-8")
+    assert extract_from_file(str(p), ".csv") == 'ano,valor\n2020,"1,5"\n2021,"2,0"\n'
+
+def test_utf8_invalido_apos_amostra(tmp_path, monkeypatch):
+    import execution.document_ingestion as ingestao
+    monkeypatch.setattr(ingestao, "AMOSTRA_ENCODING_BYTES", 16)
+    p = tmp_path / "a.txt"
+    p.write_bytes(b"inicio puro ascii " * 4 + "fim em cp1252: “ok”".encode("cp1252"))
+    conteudo, metadados = extrair_arquivo(str(p), ".txt")
+    assert metadados["encoding"] == "cp1252"
+    assert conteudo.endswith("“ok”")
+
+def test_amostra_cortada_no_meio_de_caractere():
+    assert detectar_encoding("ação".encode("utf-8")[:2]) == "utf-8"
+
 def test_extract_from_file_unsupported():
     """Testa erro para extensão não suportada."""
     with pytest.raises(ValueError, match="não suportada"):
@@ -25,3 +67,89 @@ def test_extract_from_url_mock(mocker):
     
     content = extract_from_url("http://example.com")
     assert "Conteúdo da Web" in content
+
+def _criar_pdf(caminho, paginas):
+    """PDF mínimo com uma linha de texto por página."""
+    from pypdf import PdfWriter
+    from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject
+    writer = PdfWriter()
+    fonte = writer._add_object(DictionaryObject({
+        NameObject("/Type"): NameObject("/Font"),
+        NameObject("/Subtype"): NameObject("/Type1"),
+        NameObject("/BaseFont"): NameObject("/Helvetica"),
+    }))
+    for i in range(paginas):
+        page = writer.add_blank_page(300, 200)
+        page[NameObject("/Resources")] = DictionaryObject({NameObject("/Font"): DictionaryObject({NameObject("/F1"): fonte})})
+        conteudo = DecodedStreamObject()
+        conteudo.set_data(f"BT /F1 12 Tf 20 100 Td (Pagina {i + 1}) Tj ET".encode())
+        page[NameObject("/Contents")] = writer._add_object(conteudo)
+    with open(caminho, "wb") as f:
+        writer.write(f)
+
+def test_pdf_paralelo_por_pagina_com_cache(tmp_path, mocker):
+    from execution import document_ingestion
+    pdf = tmp_path / "tese.pdf"
+    _criar_pdf(pdf, 5)
+    cache = tmp_path / "paginas"
+
+    texto = document_ingestion.extract_pdf_paginas(str(pdf), workers=2, paginas_por_faixa=2, cache_dir=str(cache))
+    assert [linha for linha in texto.split("\n\n")] == [f"Pagina {i}" for i in range(1, 6)]
+
+    # Segunda extração: todas as páginas vêm do cache, sem pool nem parser
+    extrair = mocker.patch.object(document_ingestion, "_extrair_faixa")
+    assert document_ingestion.extract_pdf_paginas(str(pdf), workers=2, paginas_por_faixa=2, cache_dir=str(cache)) == texto
+    extrair.assert_not_called()
+
+def test_pdf_pagina_com_erro_e_pulada(tmp_path, mocker, capsys):
+    import pypdf
+    from execution import document_ingestion
+    pdf = tmp_path / "tese.pdf"
+    _criar_pdf(pdf, 3)
+
+    original = pypdf.PageObject.extract_text
+    def extract_text(self, *args, **kwargs):
+        if "Pagina 2" in original(self):
+            raise TimeoutError("excedeu 20s")
+        return original(self, *args, **kwargs)
+    mocker.patch.object(pypdf.PageObject, "extract_text", extract_text)
+
+    texto = document_ingestion.extract_pdf_paginas(str(pdf), workers=1, cache_dir=str(tmp_path / "paginas"))
+    assert texto == "Pagina 1\n\nPagina 3"
+    assert "página 2 ignorada" in capsys.readouterr().err
+
+def test_lote_diretorio_retomavel(tmp_path):
+    import json
+    from execution.document_ingestion import processar_lote
+    from services.content_store import TextoComprimido
+    corpus = tmp_path / "corpus"
+    (corpus / "sub").mkdir(parents=True)
+    (corpus / "a.txt").write_bytes("Introdução — método".encode("cp1252"))
+    (corpus / "sub" / "b.csv").write_text("x,y\n1,2\n", encoding="utf-8")
+    (corpus / "notas.md").write_text("ignorado", encoding="utf-8")
+    saida = tmp_path / "resultados.jsonl"
+    content_dir = str(tmp_path / "content")
+
+    resumo = processar_lote(str(corpus), str(saida), workers=2, content_dir=content_dir)
+    assert resumo == {"total": 2, "puladas": 0, "extraidas": 2, "do_cache": 0, "erros": 0}
+    registros = {os.path.basename(r["entrada"]): r for r in map(json.loads, saida.read_text(encoding="utf-8").splitlines())}
+    assert registros["a.txt"]["encoding"] == "cp1252"
+    assert TextoComprimido(registros["a.txt"]["caminho_texto"]).ler() == "Introdução — método"
+    assert registros["b.csv"]["segundos"] >= 0 and registros["b.csv"]["erro"] is None
+
+    # Retomada: nada é refeito; em outro arquivo de saída, os bytes vêm do cache de extração
+    assert processar_lote(str(corpus), str(saida), content_dir=content_dir)["puladas"] == 2
+    resumo = processar_lote(str(corpus), str(tmp_path / "outro.jsonl"), content_dir=content_dir)
+    assert resumo["do_cache"] == 2
+    # As referências do cache de extração ficam ao lado do content_dir, não no .tmp/ do repositório
+    assert len(list((tmp_path / "extraction").glob("*.ref"))) == 2
+
+def test_lote_manifesto_com_erro(tmp_path):
+    from execution.document_ingestion import processar_lote, entradas_lote
+    (tmp_path / "a.txt").write_text("Texto válido do manifesto", encoding="utf-8")
+    manifesto = tmp_path / "lote.jsonl"
+    manifesto.write_text('{"file": "a.txt"}\n\n{"file": "falta.txt"}\n', encoding="utf-8")
+
+    assert [e["file"] for e in entradas_lote(str(manifesto))] == [str(tmp_path / "a.txt"), str(tmp_path / "falta.txt")]
+    resumo = processar_lote(str(manifesto), str(tmp_path / "r.jsonl"), workers=1, content_dir=str(tmp_path / "content"))
+    assert (resumo["extraidas"], resumo["erros"]) == (1, 1)
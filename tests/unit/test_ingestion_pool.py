@@ -0,0 +1,109 @@
+# tests/unit/test_ingestion_pool.py
+"""Testes do pool de workers persistentes de extração."""
+
+import sys
+
+import pytest
+from services.ingestion_pool import IngestionPool, IngestionTimeoutError
+
+
+@pytest.fixture
+def pool():
+    p = IngestionPool(tamanho=1, timeout=60, max_jobs_por_worker=2)
+    yield p
+    p.encerrar()
+
+
+def test_extrai_e_reaproveita_worker(pool, tmp_path):
+    arquivo = tmp_path / "a.txt"
+    arquivo.write_text("Olá mundo acadêmico", encoding="utf-8")
+
+    assert "Olá mundo" in pool.extrair({"file": str(arquivo), "suffix": ".txt"})
+    pid = pool._todos[0].processo.pid
+    assert "Olá mundo" in pool.extrair({"file": str(arquivo), "suffix": ".txt"})
+    assert pool._todos[0].processo.pid != pid  # Reciclado após max_jobs_por_worker
+    assert pool.reciclados == 1
+
+def test_erro_de_extracao_mantem_worker(pool, tmp_path):
+    pool.max_jobs_por_worker = 10
+    with pytest.raises(RuntimeError, match="não suportada"):
+        pool.extrair({"file": __file__, "suffix": ".exe"})
+    pid = pool._todos[0].processo.pid
+    with pytest.raises(RuntimeError, match="não encontrado"):
+        pool.extrair({"file": str(tmp_path / "inexistente.txt"), "suffix": ".txt"})
+    assert pool._todos[0].processo.pid == pid
+
+def test_timeout_substitui_worker(pool, tmp_path):
+    pool.iniciar()
+    pid = pool._todos[0].processo.pid
+    arquivo = tmp_path / "a.txt"
+    arquivo.write_text("conteúdo", encoding="utf-8")
+    # Worker recém-criado ainda está aquecendo: não responde em 1ms
+    with pytest.raises(IngestionTimeoutError):
+        pool.extrair({"file": str(arquivo), "suffix": ".txt"}, timeout=0.001)
+    assert pool._todos[0].processo.pid != pid
+    assert "conteúdo" in pool.extrair({"file": str(arquivo), "suffix": ".txt"})
+
+def test_encerrar_acorda_quem_espera_worker(pool, tmp_path):
+    import threading
+    import time
+
+    pool.iniciar()
+    ocupado = pool._livres.get()  # Único worker em uso: os próximos pedidos esperam
+    erros = []
+
+    def pedir():
+        try:
+            pool.extrair({"file": str(tmp_path / "a.txt"), "suffix": ".txt"})
+        except RuntimeError as e:
+            erros.append(str(e))
+
+    threads = [threading.Thread(target=pedir) for _ in range(2)]
+    for t in threads:
+        t.start()
+    time.sleep(0.2)  # Ambos bloqueados na fila de workers livres
+    pool.encerrar()
+    for t in threads:
+        t.join(timeout=5)
+
+    assert not any(t.is_alive() for t in threads)
+    assert erros == ["Pool de ingestão encerrado."] * 2
+    ocupado.encerrar()
+
+def test_pool_encerrado_nao_volta_a_subir(pool, tmp_path):
+    pool.iniciar()
+    pool.encerrar()
+    with pytest.raises(RuntimeError, match="encerrado"):
+        pool.extrair({"file": str(tmp_path / "a.txt"), "suffix": ".txt"})
+    pool.iniciar()
+    assert pool._todos == []
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="Estado dos processos lido de /proc")
+def test_matar_worker_alcanca_os_processos_filhos(tmp_path, monkeypatch):
+    import time
+    from services import ingestion_pool
+
+    script = tmp_path / "worker.py"
+    script.write_text(
+        "import subprocess, sys, time\n"
+        "neto = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(60)'])\n"
+        "print(neto.pid, flush=True)\n"
+        "time.sleep(60)\n"
+    )
+    monkeypatch.setattr(ingestion_pool, "SCRIPT_PATH", str(script))
+    worker = ingestion_pool._Worker()
+    neto = int(worker._respostas.get(timeout=10))
+
+    worker.matar()
+
+    def vivo(pid):
+        try:
+            with open(f"/proc/{pid}/stat") as f:
+                return f.read().rsplit(")", 1)[1].split()[0] != "Z"
+        except FileNotFoundError:
+            return False
+
+    limite = time.time() + 5
+    while vivo(neto) and time.time() < limite:
+        time.sleep(0.05)
+    assert not vivo(neto)
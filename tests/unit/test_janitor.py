@@ -0,0 +1,70 @@
+# tests/unit/test_janitor.py
+"""Testes do janitor de fundo e das limpezas de .tmp/."""
+
+import os
+import time
+import threading
+
+from services.janitor import Janitor, remover_antigos, remover_subdiretorios_antigos
+
+
+def test_remover_antigos(tmp_path):
+    velho, novo = tmp_path / "velho.blk", tmp_path / "novo.blk"
+    velho.write_text("a")
+    novo.write_text("b")
+    (tmp_path / "sub").mkdir()
+    duas_horas = time.time() - 7200
+    os.utime(velho, (duas_horas, duas_horas))
+
+    assert remover_antigos(str(tmp_path), 3600) == 1
+    assert sorted(os.listdir(tmp_path)) == ["novo.blk", "sub"]
+    assert remover_antigos(str(tmp_path / "inexistente"), 3600) == 0
+
+def test_janitor_roda_em_fundo_e_isola_falhas():
+    janitor = Janitor(intervalo_segundos=0.01)
+    execucoes = threading.Event()
+    janitor.registrar("falha", lambda: 1 / 0)
+    janitor.registrar("ok", lambda: execucoes.set() or 3)
+    janitor.registrar("ok", lambda: execucoes.set() or 7)  # Substitui pelo nome
+
+    janitor.iniciar()
+    try:
+        assert execucoes.wait(2)
+    finally:
+        janitor.parar()
+    assert janitor.ultimos_resultados["ok"] == 7
+    assert janitor.ultimos_resultados["falha"].startswith("erro:")
+
+def test_remover_subdiretorios_antigos(tmp_path):
+    velha, nova = tmp_path / "v1_aaa", tmp_path / "v1_bbb"
+    for pasta in (velha, nova):
+        pasta.mkdir()
+        (pasta / "p00000.txt").write_text("página")
+    (tmp_path / "solto.txt").write_text("x")
+    duas_horas = time.time() - 7200
+    os.utime(velha, (duas_horas, duas_horas))
+
+    assert remover_subdiretorios_antigos(str(tmp_path), 3600) == 1
+    assert sorted(os.listdir(tmp_path)) == ["solto.txt", "v1_bbb"]
+
+def test_limitar_embedding_cache(tmp_path, monkeypatch):
+    from services import embedding_cache
+    from services.embedding_cache import EmbeddingCache, limitar_embedding_cache
+
+    aberto = EmbeddingCache("aberto", base_dir=str(tmp_path))
+    aberto.put_many(["a", "b"], [[0.1] * 64, [0.2] * 64])
+    monkeypatch.setitem(embedding_cache._caches, "aberto", aberto)
+    antigo = EmbeddingCache("antigo", base_dir=str(tmp_path))
+    antigo.put_many(["a"], [[0.1] * 4])
+    duas_horas = time.time() - 7200
+    for nome in os.listdir(antigo.dir):
+        os.utime(os.path.join(antigo.dir, nome), (duas_horas, duas_horas))
+    pequeno = EmbeddingCache("pequeno", base_dir=str(tmp_path))
+    pequeno.put_many(["a"], [[0.1] * 4])
+
+    assert limitar_embedding_cache(max_bytes=200, max_idade_segundos=3600, base_dir=str(tmp_path)) == 2
+    # Antigo e fechado: apagado; aberto acima do limite: zerado no lugar; pequeno e recente: mantido
+    assert sorted(os.listdir(tmp_path)) == ["aberto", "pequeno"]
+    assert len(aberto) == 0 and aberto.get_many(["a"]) == {}
+    aberto.put_many(["c"], [[0.3] * 8])
+    assert EmbeddingCache("aberto", base_dir=str(tmp_path)).get_many(["c"])["c"][0] == aberto.get_many(["c"])["c"][0]
@@ -0,0 +1,79 @@
+# tests/unit/test_lexical_index.py
+"""Testes do índice lexical FTS5 e da busca híbrida."""
+
+import pytest
+from dataclasses import replace
+from unittest.mock import MagicMock, patch
+from langchain_core.documents import Document
+from services.lexical_index import LexicalIndex, fusao_rrf
+from services.text_processor import TextChunk
+from services.rag_manager import RAGManager
+from config.settings import RAG_CONFIG
+
+
+def _chunks(nome, textos):
+    return [TextChunk(conteudo=t, indice=i, documento_origem=nome, total_chars=len(t)) for i, t in enumerate(textos)]
+
+@pytest.fixture
+def indice(tmp_path):
+    idx = LexicalIndex("colecao", base_dir=str(tmp_path))
+    idx.adicionar("h1", _chunks("a.pdf", ["A METODOLOGIA adotada foi qualitativa.", "Resultados de Vaswani et al."]))
+    idx.adicionar("h2", _chunks("b.pdf", ["Introdução ao tema de LLMs.", "Metodologia quantitativa e amostragem."]))
+    return idx
+
+def test_busca_bm25_ignora_acentos_e_caixa(indice):
+    res = indice.buscar("metodologia", 5)
+    assert {m["source"] for _, m, _ in res} == {"a.pdf", "b.pdf"}
+    assert indice.buscar("introducao", 5)[0][1]["hash"] == "h2"
+
+def test_busca_exata_por_frase(indice):
+    res = indice.buscar_exata("Vaswani et al", 5)
+    assert len(res) == 1
+    assert res[0][1] == {"source": "a.pdf", "hash": "h1", "chunk_index": 1}
+
+def test_remover_e_hashes(indice):
+    assert indice.hashes() == {"h1", "h2"}
+    indice.remover(["h1"])
+    assert indice.hashes() == {"h2"}
+    assert indice.buscar("Vaswani", 5) == []
+
+def test_consulta_com_operadores_nao_quebra(indice):
+    assert indice.buscar('NEAR( "AND OR * metodologia', 5)
+
+def test_fusao_rrf_favorece_consenso():
+    fundido = fusao_rrf([["a", "b", "c"], ["c", "b", "d"]], chave=lambda x: x)
+    assert fundido[0] == "b" or fundido[0] == "c"
+    assert set(fundido) == {"a", "b", "c", "d"}
+
+def _rag_com_indices(tmp_path, config=None):
+    with patch('chromadb.PersistentClient'), \
+         patch('langchain_huggingface.HuggingFaceEmbeddings'):
+        rm = RAGManager(config=config, session_state={})
+    rm.lexical_index = LexicalIndex("hibrida", base_dir=str(tmp_path))
+    rm.lexical_index.adicionar("h1", _chunks("a.pdf", ["METODOLOGIA um", "METODOLOGIA dois"]))
+    rm.vector_store = MagicMock()
+    rm.vector_store.similarity_search.return_value = [
+        Document(page_content="vetorial", metadata={"source": "b.pdf", "hash": "h2", "chunk_index": 0})
+    ]
+    rm.session_state['rag_initialized'] = True
+    return rm
+
+def test_busca_padrao_e_so_vetorial(tmp_path):
+    rm = _rag_com_indices(tmp_path)
+
+    docs = rm.buscar_relevantes("METODOLOGIA", top_k=2)
+
+    assert [d.page_content for d in docs] == ["vetorial"]
+    rm.vector_store.similarity_search.assert_called_once_with("METODOLOGIA", k=2)
+
+def test_busca_hibrida_com_atalho_lexical(tmp_path):
+    rm = _rag_com_indices(tmp_path, replace(RAG_CONFIG, modo_busca="hibrida", atalho_lexical=True))
+
+    # k acertos exatos: sem embedding / busca vetorial
+    docs = rm.buscar_relevantes("METODOLOGIA", top_k=2)
+    assert len(docs) == 2
+    rm.vector_store.similarity_search.assert_not_called()
+
+    # Poucos acertos exatos: funde vetorial + BM25
+    docs = rm.buscar_relevantes("METODOLOGIA", top_k=3)
+    assert {d.page_content for d in docs} == {"METODOLOGIA um", "METODOLOGIA dois", "vetorial"}
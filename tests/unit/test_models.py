@@ -1,3 +1,5 @@
+import threading
+
 import pytest
 from services.model_manager import ModelManager
 
@@ -24,3 +26,17 @@ def test_limpar_memoria(mock_model_manager):
     mock_model_manager.adicionar_mensagem("human", "Ola")
     mock_model_manager.limpar_memoria()
     assert len(mock_model_manager.session_state['mensagens']) == 0
+
+def test_model_manager_construido_uma_vez_por_sessao(mocker, mock_langchain_openai, mock_embeddings, mock_chroma):
+    construir = mocker.spy(ModelManager, "__init__")
+    state = {}
+    instancias = []
+    threads = [threading.Thread(target=lambda: instancias.append(ModelManager.da_sessao(state))) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert construir.call_count == 1
+    assert all(mm is instancias[0] for mm in instancias)
+    assert ModelManager.da_sessao({}) is not instancias[0]
@@ -19,3 +19,28 @@ def test_indexar_documentos_vazio(mock_rag_manager):
 def test_buscar_relevantes_vazio(mock_rag_manager):
     """Testa busca sem inicialização."""
     assert mock_rag_manager.buscar_relevantes("pergunta") == []
+
+def test_purga_fisica_so_afeta_a_propria_sessao(tmp_path, monkeypatch, mock_embeddings, mock_chroma):
+    """Purge & retry de uma sessão não apaga coleções nem textos das demais."""
+    from services import index_manifest, content_store
+    from services.content_store import get_content_store
+
+    monkeypatch.setattr(content_store, "DEFAULT_CONTENT_DIR", str(tmp_path / "content"))
+    store = get_content_store()
+    h_a, h_a_mantido, h_b = (store.gravar(t) for t in ("texto A", "texto A mantido", "texto B"))
+
+    sessao_a = RAGManager(session_state={'session_id': 'A'})
+    sessao_b = RAGManager(session_state={'session_id': 'B'})
+    for rm, hashes in ((sessao_a, (h_a, h_a_mantido)), (sessao_b, (h_b,))):
+        for h in hashes:
+            rm.manifest.adicionar(h, f"{h}.txt", 1)
+        rm.manifest.salvar()
+
+    ok, _ = sessao_a.purgar_fisicamente(manter_conteudo=[h_a_mantido])
+
+    assert ok
+    sessao_a.chroma_client.reset.assert_not_called()
+    sessao_a.chroma_client.delete_collection.assert_called_with(sessao_a.collection_name)
+    assert not sessao_a.manifest.existe and not store.existe(h_a)
+    assert store.existe(h_a_mantido) and store.existe(h_b)
+    assert index_manifest.IndexManifest(sessao_b.collection_name).hashes == {h_b}
@@ -32,7 +32,7 @@ def test_buscar_em_todos_os_documentos(rag_manager):
     ]
     
     rag_manager.session_state['rag_initialized'] = True
-    res = rag_manager.buscar_em_todos_os_documentos("query", k_por_doc=1)
+    res = rag_manager.buscar_em_todos_os_documentos("query", k_por_doc=1, modo="por_fonte")
     
     assert len(res) == 2
     assert res[0].page_content == "c1"
@@ -44,6 +44,25 @@ def test_buscar_em_todos_os_documentos(rag_manager):
     assert {"source": "doc1.pdf"} in filters
     assert {"source": "doc2.pdf"} in filters
 
+def test_buscar_em_todos_os_documentos_agrupada(rag_manager):
+    """Modo agrupado: query embutida uma vez e top-k por documento sem buscas filtradas."""
+    mock_collection = MagicMock()
+    mock_collection.get.return_value = {
+        'embeddings': [[1.0, 0.0], [0.0, 1.0], [0.8, 0.6], [0.6, 0.8]],
+        'documents': ["a1", "b1", "a2", "b2"],
+        'metadatas': [{'source': 'a.pdf'}, {'source': 'b.pdf'}, {'source': 'a.pdf'}, {'source': 'b.pdf'}]
+    }
+    rag_manager.chroma_client.get_collection.return_value = mock_collection
+    rag_manager.embeddings = MagicMock()
+    rag_manager.embeddings.embed_query.return_value = [1.0, 0.0]
+    rag_manager.session_state['rag_initialized'] = True
+
+    res = rag_manager.buscar_em_todos_os_documentos("query", k_por_doc=1, modo="agrupada")
+
+    assert [d.page_content for d in res] == ["a1", "b2"]
+    rag_manager.embeddings.embed_query.assert_called_once_with("query")
+    rag_manager.vector_store.similarity_search.assert_not_called()
+
 def test_get_contexto_para_prompt_with_cobertura(rag_manager):
     """Verifica se o contexto usa a busca global quando solicitado."""
     with patch.object(RAGManager, 'buscar_em_todos_os_documentos') as mock_global:
@@ -0,0 +1,74 @@
+# tests/unit/test_retrieval_cache.py
+"""Testes dos caches LRU de consulta e de resultados de busca."""
+
+import pytest
+from unittest.mock import MagicMock, patch
+from langchain_core.documents import Document
+from services.retrieval_cache import LRUCache
+from services.rag_manager import RAGManager
+
+
+def test_lru_evicta_menos_recente():
+    cache = LRUCache(maxsize=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+    assert "b" not in cache
+    assert cache.get("a") == 1
+    stats = cache.get_stats()
+    assert stats["evictions"] == 1
+    assert stats["hits"] == 2
+
+@pytest.fixture
+def rag_manager():
+    with patch('chromadb.PersistentClient'), \
+         patch('langchain_huggingface.HuggingFaceEmbeddings'):
+        rm = RAGManager(session_state={})
+        rm.chroma_client = MagicMock()
+        rm.vector_store = MagicMock()
+        rm.vector_store.similarity_search.return_value = [
+            Document(page_content="c1", metadata={"source": "doc1.pdf"})
+        ]
+        rm.session_state['rag_initialized'] = True
+        return rm
+
+def test_busca_repetida_usa_cache(rag_manager):
+    rag_manager.buscar_relevantes("Introdução", top_k=3)
+    rag_manager.buscar_relevantes("Introdução", top_k=3)
+    assert rag_manager.vector_store.similarity_search.call_count == 1
+    assert rag_manager.get_cache_stats()["resultados"]["hits"] == 1
+
+def test_limpar_indice_invalida_cache(rag_manager):
+    rag_manager.buscar_relevantes("Introdução", top_k=3)
+    versao = rag_manager.versao
+    rag_manager.limpar_indice()
+    assert rag_manager.versao == versao + 1
+
+    rag_manager.vector_store = MagicMock()
+    rag_manager.vector_store.similarity_search.return_value = []
+    rag_manager.session_state['rag_initialized'] = True
+    rag_manager.buscar_relevantes("Introdução", top_k=3)
+    rag_manager.vector_store.similarity_search.assert_called_once()
+
+def test_embedding_de_consulta_em_cache(rag_manager):
+    base = MagicMock()
+    base.embed_query.return_value = [0.1, 0.2]
+    rag_manager.embeddings.base = base
+    rag_manager.query_cache.limpar()
+
+    rag_manager.embeddings.embed_query("Metodologia")
+    rag_manager.embeddings.embed_query("Metodologia")
+    base.embed_query.assert_called_once_with("Metodologia")
+
+def test_busca_durante_indexacao_nao_fica_em_cache(rag_manager):
+    """Resultado parcial cacheado no meio da escrita é invalidado quando ela termina."""
+    parciais = []
+    rag_manager.vector_store.add_documents.side_effect = \
+        lambda docs: parciais.append(rag_manager.buscar_relevantes("Introdução", top_k=3))
+
+    rag_manager.indexar_documentos([("doc1.pdf", "Conteúdo da introdução. " * 20, "h1")])
+    assert len(parciais) == 1
+
+    rag_manager.buscar_relevantes("Introdução", top_k=3)
+    assert rag_manager.vector_store.similarity_search.call_count == 2
@@ -0,0 +1,138 @@
+# tests/unit/test_session_store.py
+"""Testes do armazenamento de sessões (LRU + TTL, backends memória e SQLite)."""
+
+import pytest
+from config.settings import TipoArquivo
+from services.session_store import MemorySessionStore, SqliteSessionStore, tamanho_aproximado
+from services.upload_manager import DocumentoCarregado
+
+
+class Relogio:
+    def __init__(self):
+        self.agora = 0.0
+
+    def __call__(self):
+        return self.agora
+
+
+def nova(session_id):
+    return {'session_id': session_id, 'mensagens': [], 'documentos': [], 'llm': None}
+
+
+@pytest.fixture
+def relogio():
+    return Relogio()
+
+
+def test_lru_expulsa_menos_recente_e_chama_hooks(relogio):
+    store = MemorySessionStore(max_sessoes=2, ttl_segundos=100, relogio=relogio)
+    expulsas = []
+    store.ao_expulsar(lambda sid, state, motivo: expulsas.append((sid, motivo, state['llm'])))
+
+    store.obter("a", nova)['llm'] = "cliente-a"
+    store.obter("b", nova)
+    store.obter("a", nova)  # "a" volta a ser a mais recente
+    store.obter("c", nova)
+
+    assert "b" not in store and "a" in store and len(store) == 2
+    assert expulsas == [("b", "lru", None)]
+
+def test_ttl_e_sessao_protegida(relogio):
+    store = MemorySessionStore(max_sessoes=10, ttl_segundos=60, relogio=relogio)
+    store.protegida = lambda sid: sid == "ocupada"
+    for sid in ("velha", "ocupada"):
+        store.obter(sid, nova)['mensagens'].append({'role': 'human', 'content': sid})
+    relogio.agora = 30
+    store.obter("nova", nova)
+
+    relogio.agora = 61
+    assert store.expirar() == 1
+    assert "velha" not in store and "ocupada" in store and "nova" in store
+    # Backend em memória: a sessão expirada volta vazia
+    assert store.obter("velha", nova)['mensagens'] == []
+    assert store.get_metricas()["expulsas"]["ttl"] == 1
+
+def test_sqlite_reidrata_partes_serializaveis(tmp_path, relogio):
+    caminho = str(tmp_path / "sessoes.db")
+    store = SqliteSessionStore(caminho, max_sessoes=1, ttl_segundos=60, relogio=relogio)
+    liberadas = []
+    store.ao_expulsar(lambda sid, state, motivo: liberadas.append(sid))
+
+    state = store.obter("s1", nova)
+    state['llm'] = object()
+    state['mensagens'].append({'role': 'human', 'content': 'Olá'})
+    state['documentos'].append(DocumentoCarregado(
+        id="d1", nome="artigo.pdf", tipo=TipoArquivo.PDF, caminho_cache="/tmp/x.blk",
+        hash="h1", tamanho_bytes=10, tamanho_chars=20, encoding=None
+    ))
+    store.obter("s2", nova)  # Expulsa s1 (persistida antes do hook)
+    assert liberadas == ["s1"]
+
+    # Outro processo (nova instância) reidrata pelo SQLite
+    reaberto = SqliteSessionStore(caminho, max_sessoes=5, ttl_segundos=60, relogio=relogio)
+    s1 = reaberto.obter("s1", nova)
+    assert s1['mensagens'] == [{'role': 'human', 'content': 'Olá'}]
+    assert s1['llm'] is None
+    doc = s1['documentos'][0]
+    assert isinstance(doc, DocumentoCarregado) and doc.tipo is TipoArquivo.PDF and doc.nome == "artigo.pdf"
+    assert reaberto.reidratadas == 1
+
+    assert reaberto.remover("s1")
+    assert SqliteSessionStore(caminho, 5, 60).obter("s1", nova)['mensagens'] == []
+
+def test_sqlite_fecha_conexoes(tmp_path, relogio, monkeypatch):
+    import sqlite3
+    import services.session_store as modulo
+    abertas = []
+    conectar = sqlite3.connect
+
+    def conectar_registrando(*args, **kwargs):
+        conn = conectar(*args, **kwargs)
+        abertas.append(conn)
+        return conn
+
+    monkeypatch.setattr(modulo.sqlite3, "connect", conectar_registrando)
+    store = SqliteSessionStore(str(tmp_path / "sessoes.db"), max_sessoes=1, ttl_segundos=60, relogio=relogio)
+    store.obter("s1", nova)['mensagens'].append({'role': 'human', 'content': 'Olá'})
+    store.obter("s2", nova)  # Persiste s1
+    relogio.agora = 61
+    store.expirar()
+
+    assert abertas
+    for conn in abertas:
+        with pytest.raises(sqlite3.ProgrammingError):
+            conn.execute("SELECT 1")
+
+def test_metricas_bytes_por_sessao(relogio):
+    store = MemorySessionStore(max_sessoes=5, ttl_segundos=60, relogio=relogio)
+    store.obter("pequena", nova)
+    store.obter("grande", nova)['mensagens'].extend({'role': 'ai', 'content': f'{i}' + 'x' * 1000} for i in range(50))
+
+    metricas = store.get_metricas()
+    assert metricas["sessoes_ativas"] == 2
+    assert metricas["bytes_por_sessao"]["grande"] > 50_000 > metricas["bytes_por_sessao"]["pequena"]
+    compartilhada = ['y' * 1000]
+    assert tamanho_aproximado([compartilhada, compartilhada]) < 2 * tamanho_aproximado(compartilhada)
+
+def test_metricas_com_sessao_sendo_alterada(relogio):
+    """get_metricas não quebra enquanto outra thread altera o estado da sessão."""
+    import threading
+    store = MemorySessionStore(max_sessoes=5, ttl_segundos=60, relogio=relogio)
+    state = store.obter("s1", nova)
+    parar = threading.Event()
+
+    def alterar():
+        i = 0
+        while not parar.is_set():
+            state[f"chave_{i % 50}"] = {"valores": list(range(i % 20))}
+            state.pop(f"chave_{(i + 25) % 50}", None)
+            i += 1
+
+    escritor = threading.Thread(target=alterar)
+    escritor.start()
+    try:
+        for _ in range(200):
+            assert store.get_metricas()["sessoes_ativas"] == 1
+    finally:
+        parar.set()
+        escritor.join()
@@ -0,0 +1,172 @@
+# tests/unit/test_upload_stream.py
+"""Testes do recebimento de uploads multipart em streaming para o spool."""
+
+import asyncio
+import hashlib
+import os
+import pytest
+from services.upload_manager import UploadManager, ArquivoGrandeDemaisError, MARGEM_MULTIPART_BYTES
+from services.extraction_cache import ExtractionCache
+from config.settings import TipoArquivo
+
+
+@pytest.fixture
+def manager(tmp_path):
+    um = UploadManager(external_state=[])
+    um.spool_dir = str(tmp_path)
+    um.content_dir = str(tmp_path / "content")
+    os.makedirs(um.content_dir)
+    um.extraction_cache = ExtractionCache(um.content_dir, base_dir=str(tmp_path / "extraction"))
+    return um
+
+
+FRONTEIRA = "----fronteira"
+
+
+def _multipart(campos: dict, arquivos: list) -> bytes:
+    partes = []
+    for nome, valor in campos.items():
+        partes.append(f'--{FRONTEIRA}\r\nContent-Disposition: form-data; name="{nome}"\r\n\r\n{valor}\r\n'.encode())
+    for nome_arquivo, dados in arquivos:
+        partes.append(
+            f'--{FRONTEIRA}\r\nContent-Disposition: form-data; name="files"; filename="{nome_arquivo}"\r\n'
+            f'Content-Type: application/octet-stream\r\n\r\n'.encode() + dados + b"\r\n"
+        )
+    return b"".join(partes) + f"--{FRONTEIRA}--\r\n".encode()
+
+
+def _receber(manager, corpo: bytes, lidos: list = None, **kwargs):
+    async def stream():
+        for i in range(0, len(corpo), 700):  # Pedaços que não coincidem com as partes
+            if lidos is not None:
+                lidos.append(i)
+            yield corpo[i:i + 700]
+
+    content_type = f"multipart/form-data; boundary={FRONTEIRA}"
+    return asyncio.run(manager.receber_multipart(stream(), content_type, **kwargs))
+
+
+def _arquivo(manager, nome: str, dados: bytes):
+    [recebido] = _receber(manager, _multipart({"session_id": "s1"}, [(nome, dados)])).arquivos
+    return recebido
+
+
+def test_reenvio_identico_nao_reextrai(manager, mocker):
+    extrair = mocker.patch.object(manager, "_carregar_do_arquivo", return_value=("Conteúdo do documento de teste.", {}))
+    for _ in range(2):
+        recebido = _arquivo(manager, "a.txt", b"mesmos bytes")
+        ok, _ = manager.carregar_documento_recebido(TipoArquivo.TXT, recebido)
+        assert ok
+        assert not os.path.exists(recebido.caminho)
+    extrair.assert_called_once()
+    assert manager.total_documentos == 1
+
+def test_cache_de_extracao_por_bytes(manager, mocker, tmp_path):
+    """O mesmo arquivo em outra sessão reaproveita o texto sem passar pela ingestão."""
+    extrair = mocker.patch.object(manager, "_carregar_do_arquivo", return_value=("Conteúdo do documento de teste.", {}))
+    arquivo = tmp_path / "artigo.pdf"
+    arquivo.write_bytes(b"%PDF bytes")
+
+    assert manager.carregar_documento_de_caminho(TipoArquivo.PDF, str(arquivo))[0]
+    manager.limpar_documentos()
+    ok, msg = manager.carregar_documento_de_caminho(TipoArquivo.PDF, str(arquivo), "copia.pdf")
+
+    assert ok and "reutilizado do cache" in msg
+    extrair.assert_called_once()
+    assert manager.documentos[0].nome == "copia.pdf"
+    stats = manager.extraction_cache.get_stats()
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+
+def test_referencia_orfa_conta_como_miss(tmp_path):
+    cache = ExtractionCache(str(tmp_path), base_dir=str(tmp_path / "refs"))
+    cache.put("abc", ".pdf", "texto-purgado")
+    assert cache.get("abc", ".pdf") is None
+    assert cache.get_stats()["misses"] == 1
+
+def test_lote_extrai_em_paralelo_e_preserva_ordem(manager, mocker):
+    import threading
+    import time
+    ativos, pico = [0], [0]
+    trava = threading.Lock()
+
+    def extrair(caminho, suffix):
+        with trava:
+            ativos[0] += 1
+            pico[0] = max(pico[0], ativos[0])
+        time.sleep(0.05)
+        with trava:
+            ativos[0] -= 1
+        with open(caminho, "rb") as f:
+            return f"Texto extraído de {f.read().decode()} com tamanho suficiente.", {}
+
+    mocker.patch.object(UploadManager, "_carregar_do_arquivo", side_effect=extrair)
+    itens = [
+        (TipoArquivo.TXT, _arquivo(manager, nome, dados))
+        for nome, dados in [("a.txt", b"A"), ("b.txt", b"B"), ("a-copia.txt", b"A"), ("c.txt", b"C")]
+    ]
+    resultados = manager.carregar_lote(itens, max_paralelo=4)
+
+    assert [r["arquivo"] for r in resultados] == ["a.txt", "b.txt", "a-copia.txt", "c.txt"]
+    assert all(r["success"] for r in resultados)
+    assert "já está na lista" in resultados[2]["message"]
+    assert [d.nome for d in manager.documentos] == ["a.txt", "b.txt", "c.txt"]
+    assert pico[0] > 1
+    # Arquivos do spool removidos após a extração
+    assert not [f for f in os.listdir(manager.spool_dir) if f.endswith(".txt")]
+
+
+def test_multipart_grava_arquivo_direto_no_spool(manager):
+    dados = os.urandom(5000)
+    form = _receber(manager, _multipart({"session_id": "s1"}, [("artigo.pdf", dados)]))
+
+    assert form.campos == {"session_id": "s1"}
+    [recebido] = form.arquivos
+    assert (recebido.nome, recebido.tamanho_bytes) == ("artigo.pdf", 5000)
+    assert recebido.hash_bytes == hashlib.sha256(dados).hexdigest()
+    with open(recebido.caminho, "rb") as f:
+        assert f.read() == dados
+    form.descartar()
+    assert not os.path.exists(recebido.caminho)
+
+def test_multipart_interrompe_a_leitura_no_limite(manager, tmp_path, monkeypatch):
+    """Sem Content-Length (chunked): o corpo para de ser lido assim que o arquivo passa do limite."""
+    monkeypatch.setattr(manager.config, "MAX_SIZE_BYTES", 2048)
+    corpo = _multipart({"session_id": "s1"}, [("a.txt", b"x" * 50_000)])
+    lidos = []
+    with pytest.raises(ArquivoGrandeDemaisError):
+        _receber(manager, corpo, lidos)
+
+    assert len(lidos) * 700 < 5000
+    assert not [f for f in os.listdir(tmp_path) if os.path.isfile(tmp_path / f)]
+
+def test_multipart_recusa_pelo_tamanho_declarado(manager, tmp_path, monkeypatch):
+    monkeypatch.setattr(manager.config, "MAX_SIZE_BYTES", 2048)
+    corpo = _multipart({"session_id": "s1"}, [("a.txt", b"x" * 10)])
+    lidos = []
+    with pytest.raises(ArquivoGrandeDemaisError, match="Envio muito grande"):
+        _receber(manager, corpo, lidos, tamanho_declarado=2048 + MARGEM_MULTIPART_BYTES + 1)
+
+    assert lidos == []
+    assert not [f for f in os.listdir(tmp_path) if os.path.isfile(tmp_path / f)]
+    assert _receber(manager, corpo, tamanho_declarado=len(corpo)).arquivos[0].tamanho_bytes == 10
+
+def test_multipart_lote_recusa_arquivos_um_a_um(manager, monkeypatch):
+    monkeypatch.setattr(manager.config, "MAX_SIZE_BYTES", 2048)
+    corpo = _multipart({"session_id": "s1"}, [
+        ("a.txt", b"A" * 100), ("virus.exe", b"MZ"), ("grande.txt", b"x" * 3000), ("b.txt", b"B" * 100), ("c.txt", b"C"),
+    ])
+    form = _receber(manager, corpo, max_arquivos=2, recusar_excedente=True)
+
+    assert [a.nome for a in form.arquivos] == ["a.txt", "b.txt"]
+    assert [r["arquivo"] for r in form.recusados] == ["virus.exe", "grande.txt", "c.txt"]
+    assert "não suportado" in form.recusados[0]["message"]
+    assert sorted(os.listdir(manager.spool_dir)) == sorted(
+        [os.path.basename(a.caminho) for a in form.arquivos] + ["content", "extraction"]
+    )
+    form.descartar()
+
+def test_multipart_limita_campos_e_tipo_do_corpo(manager):
+    with pytest.raises(ValueError, match="multipart"):
+        asyncio.run(manager.receber_multipart(iter(()), "application/json"))
+    with pytest.raises(ValueError, match="Campos"):
+        _receber(manager, _multipart({"nota": "x" * (MARGEM_MULTIPART_BYTES + 1)}, []))
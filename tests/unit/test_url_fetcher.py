@@ -0,0 +1,167 @@
+# tests/unit/test_url_fetcher.py
+"""Testes da ingestão de URLs contra um servidor HTTP local."""
+
+import asyncio
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from config.settings import UrlFetchConfig
+from services.url_fetcher import UrlFetcher, FalhaNaBuscaError
+
+HTML = "<html><body><h1>Metodologia</h1><p>Texto do artigo.</p></body></html>".encode("utf-8")
+
+
+class Handler(BaseHTTPRequestHandler):
+    pedidos = []
+    falhas_restantes = {}
+    ativos, pico = 0, 0
+    trava = threading.Lock()
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        Handler.pedidos.append((self.path, self.headers.get("If-None-Match")))
+        if self.path.startswith("/lento"):
+            with Handler.trava:
+                Handler.ativos += 1
+                Handler.pico = max(Handler.pico, Handler.ativos)
+            time.sleep(0.05)
+            with Handler.trava:
+                Handler.ativos -= 1
+        if Handler.falhas_restantes.get(self.path, 0) > 0:
+            Handler.falhas_restantes[self.path] -= 1
+            self.send_response(503)
+            self.end_headers()
+            return
+        if self.path == "/404":
+            self.send_response(404)
+            self.end_headers()
+            return
+        if self.headers.get("If-None-Match") == '"v1"':
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("ETag", '"v1"')
+        self.send_header("Content-Length", str(len(HTML)))
+        self.end_headers()
+        self.wfile.write(HTML)
+
+
+@pytest.fixture
+def servidor():
+    Handler.pedidos = []
+    Handler.falhas_restantes = {}
+    Handler.ativos, Handler.pico = 0, 0
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+
+
+@pytest.fixture
+def fetcher(tmp_path):
+    return UrlFetcher(UrlFetchConfig(tentativas=3, backoff_base=0.01, backoff_max=0.05), cache_dir=str(tmp_path))
+
+
+def test_revalidacao_com_etag(servidor, fetcher):
+    async def cenario():
+        primeira = await fetcher.buscar(f"{servidor}/artigo")
+        segunda = await fetcher.buscar(f"{servidor}/artigo")
+        texto = await fetcher.extrair_texto(f"{servidor}/artigo")
+        await fetcher.fechar()
+        return primeira, segunda, texto
+
+    primeira, segunda, texto = asyncio.run(cenario())
+    assert not primeira.do_cache
+    assert segunda.do_cache and segunda.conteudo == HTML
+    assert "Metodologia" in texto and "<h1>" not in texto
+    assert [inm for _, inm in Handler.pedidos] == [None, '"v1"', '"v1"']
+    assert fetcher.revalidadas == 2
+
+def test_corpo_removido_durante_a_revalidacao(servidor, fetcher):
+    url = f"{servidor}/artigo"
+    asyncio.run(fetcher.buscar(url))
+    ler_cache = fetcher._ler_cache
+
+    def ler_e_remover_corpo(u):
+        meta = ler_cache(u)
+        os.unlink(fetcher._caminhos(u)[1])  # Janitor apaga o .body entre a leitura e o 304
+        return meta
+
+    fetcher._ler_cache = ler_e_remover_corpo
+    resposta = asyncio.run(fetcher.buscar(url))
+
+    assert resposta.conteudo == HTML and not resposta.do_cache
+    assert [inm for _, inm in Handler.pedidos] == [None, '"v1"', None]
+    assert os.path.exists(fetcher._caminhos(url)[1])  # Cache regravado pela busca completa
+
+def test_temporarios_do_cache_sao_unicos(fetcher, monkeypatch):
+    from services import url_fetcher
+    origens = []
+    substituir = os.replace
+    monkeypatch.setattr(url_fetcher.os, "replace", lambda src, dst: (origens.append(src), substituir(src, dst)))
+    resposta = type("Resposta", (), {"headers": {"etag": '"v1"', "content-type": "text/html"}})()
+
+    for _ in range(2):
+        fetcher._gravar_cache("http://exemplo/a", resposta, b"corpo")
+
+    assert len(set(origens)) == 4
+    assert not [n for n in os.listdir(fetcher.cache_dir) if n.endswith(".tmp")]
+
+def test_retentativa_com_backoff(servidor, fetcher):
+    Handler.falhas_restantes["/instavel"] = 2
+    resposta = asyncio.run(fetcher.buscar(f"{servidor}/instavel"))
+    assert resposta.conteudo == HTML
+    assert len(Handler.pedidos) == 3
+
+def test_erros_definitivos(servidor, fetcher):
+    with pytest.raises(FalhaNaBuscaError, match="404"):
+        asyncio.run(fetcher.buscar(f"{servidor}/404"))
+    assert len(Handler.pedidos) == 1
+
+    Handler.falhas_restantes["/fora"] = 10
+    with pytest.raises(FalhaNaBuscaError, match="3 tentativas"):
+        asyncio.run(fetcher.buscar(f"{servidor}/fora"))
+
+def test_limite_por_host(servidor, tmp_path):
+    fetcher = UrlFetcher(UrlFetchConfig(limite_por_host=2), cache_dir=str(tmp_path))
+
+    async def cenario():
+        await asyncio.gather(*(fetcher.buscar(f"{servidor}/lento{i}") for i in range(6)))
+        await fetcher.fechar()
+
+    asyncio.run(cenario())
+    assert len(Handler.pedidos) == 6
+    assert Handler.pico == 2
+
+def test_caminho_sincrono_fecha_o_proprio_cliente(servidor, tmp_path, monkeypatch):
+    """Cada asyncio.run usa e fecha um cliente próprio; o compartilhado não é tocado."""
+    import httpx
+    from services import url_fetcher
+    from services.upload_manager import UploadManager
+
+    monkeypatch.setattr(url_fetcher, "DEFAULT_HTTP_CACHE_DIR", str(tmp_path / "http"))
+    fechados = []
+    aclose = httpx.AsyncClient.aclose
+
+    async def registrar_aclose(client):
+        fechados.append(client)
+        await aclose(client)
+
+    monkeypatch.setattr(httpx.AsyncClient, "aclose", registrar_aclose)
+    um = UploadManager(external_state=[])
+    um.content_dir = str(tmp_path / "content")
+
+    for pagina in ("a", "b"):
+        ok, msg = um.carregar_documento_url(f"{servidor}/{pagina}", nome=f"Página {pagina}")
+        assert ok, msg
+
+    assert len(fechados) == 2 and fechados[0] is not fechados[1]
+    assert url_fetcher.URL_FETCHER._client is None
+    assert um.total_documentos == 1  # O servidor devolve o mesmo HTML: deduplicado pelo conteúdo